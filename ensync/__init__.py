@@ -9,9 +9,11 @@ PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
 from .sync import EnClientSync
 from .evernote_from_oxtask import EvernoteFromOxTask
 from .evernote_from_toodledo import EvernoteFromToodledo
+from .evernote_from_file import EvernoteFromFile
 
 __all__ = [
     'EnClientSync',
     'EvernoteFromOxTask',
-    'EvernoteFromToodledo'
+    'EvernoteFromToodledo',
+    'EvernoteFromFile'
 ]
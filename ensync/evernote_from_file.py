@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, sys, time, re, logging
+from pyutils import strflocal, utf8
+from pysync import ThisFromThat
+
+
+class EvernoteFromFile(ThisFromThat):
+
+    def __init__(self, engine, other):
+        ThisFromThat.__init__(self, engine, other, 'en <- fs')
+
+    def update(self, other, that=None, this=None, sid=None):
+
+        from enapi import ENMLOfPlainText
+
+        item, note = ThisFromThat.update(self, other, that, this, sid)
+
+        update = self._update
+
+        note = note.load()
+        tags = list(note.tags or [])
+        self.assign(note, 'title', item.title)
+
+        if note.resources:
+            self.logger.debug(u'%s: Found resources - preserving existing note content', self.class_name)
+        elif self.assign(note, 'content', ENMLOfPlainText((item.note or u'').rstrip())):
+            self.logger.debug(u'%s: Updating note content', self.class_name)
+
+        if not update and item.url and self.options.get('file_sourceURL', True):
+            if note.attributes.sourceURL is None:
+                note.attributes.sourceURL = item.url
+
+        # reminder from the item attribute (default: due), done time from the status
+        attribute = self.options.get('file_reminderTime', 'due')
+        if item.status == 'Done':
+            self.assign(note.attributes, 'reminderDoneTime', item.completed or long(time.time() * 1000))
+            self.assign(note.attributes, 'reminderTime', None)
+            self.assign(note.attributes, 'reminderOrder', None)
+        else:
+            self.assign(note.attributes, 'reminderDoneTime', None)
+            self.assign(note.attributes, 'reminderTime', item[attribute])
+            if not item[attribute]:
+                self.assign(note.attributes, 'reminderOrder', None)
+        self.logger.debug(u'%s: Updating note reminderTime from %s [%s]',
+                          self.class_name, attribute, strflocal(note.attributes.reminderTime, None))
+
+        note.tagGuids = []
+        note.tagNames = list(item.tags)
+
+        if self.options.get('file_tag_status') and item.status:
+            note.tagNames.append(self.options['file_tag_status'] + item.status)
+
+        if self.options.get('file_tag_priority') and item.priority:
+            note.tagNames.append(self.options['file_tag_priority'] + item.priority)
+
+        if not self.same(note.tagNames, tags):
+            self.touch('tagNames')
+
+        if self.skip():
+            return note
+
+        note = self._engine._book.update_note(note)
+        self.logger.debug(u'%s: Updating completed with timestamp %s', self.class_name, strflocal(note.updated))
+        return note
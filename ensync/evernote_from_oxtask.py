@@ -25,13 +25,14 @@ class EvernoteFromOxTask(ThisFromThat):
         ox_task_sync = self._other
 
         note = note.load()
-        note.title = task.title
+        tags = list(note.tags or [])
+        self.assign(note, 'title', task.title)
 
         # set evernote content for new or empty notes
         if not update:
-            self.logger.debug(u'%s: Updating note content' % (self.class_name))
+            self.logger.debug(u'%s: Updating note content', self.class_name)
             if task.note is not None:
-                note.content = ENMLOfPlainText(task.note.rstrip())
+                self.assign(note, 'content', ENMLOfPlainText(task.note.rstrip()))
             if self.options.get('ox_sourceURL', True):
                 if note.attributes.sourceURL is None:
                     note.attributes.sourceURL = task.get_url()
@@ -52,26 +53,26 @@ class EvernoteFromOxTask(ThisFromThat):
                     if re.sub('\s', '', PlainTextOfENML(note.content), re.MULTILINE):
                         preserve = 'content'
             if preserve:
-                self.logger.debug(u'%s: Found %s - preserving existing note content' % (self.class_name, preserve))
+                self.logger.debug(u'%s: Found %s - preserving existing note content', self.class_name, preserve)
             else:
                 content = task.note
                 if oxsync.options.get('evernote_iframe', 'False'):
                     content = ensync.remove_evernote_link(content, oxsync.options.get('evernote_iframe_tag', 'IFRAME'))
                 if oxsync.options.get('evernote_link', 'False'):
                     content = ensync.remove_evernote_link(content, oxsync.options.get('evernote_link_tag', 'EVERNOTE'))
-                note.content = ENMLOfPlainText(content.rstrip())
-                self.logger.debug(u'%s: Updating note content' % (self.class_name))
+                if self.assign(note, 'content', ENMLOfPlainText(content.rstrip())):
+                    self.logger.debug(u'%s: Updating note content', self.class_name)
 
         # always update reminderTime
         attribute = self.options.get('ox_reminderTime','end_time')
         if task._data.get(attribute):
-            note.attributes.reminderTime = task._data.get(attribute)
+            self.assign(note.attributes, 'reminderTime', task._data.get(attribute))
             reminderTime = strflocal(task._data.get(attribute))
         else:
-            note.attributes.reminderTime = None
-            note.attributes.reminderOrder = None
+            self.assign(note.attributes, 'reminderTime', None)
+            self.assign(note.attributes, 'reminderOrder', None)
             reminderTime = 'None'
-        self.logger.debug(u'%s: Updating note reminderTime from %s [%s]' % (self.class_name, attribute, reminderTime))
+        self.logger.debug(u'%s: Updating note reminderTime from %s [%s]', self.class_name, attribute, reminderTime)
 
         # update note reminder status from task status
         if OxTask.get_status(task.status) == 'Done':
@@ -82,33 +83,33 @@ class EvernoteFromOxTask(ThisFromThat):
             else:
                 completed = task.date_completed
 
-            note.attributes.reminderDoneTime = completed
-            note.attributes.reminderTime = None
-            note.attributes.reminderOrder = None
+            self.assign(note.attributes, 'reminderDoneTime', completed)
+            self.assign(note.attributes, 'reminderTime', None)
+            self.assign(note.attributes, 'reminderOrder', None)
 
-            self.logger.debug(u'%s: Updating reminder status from done task [%s]' %
-                             (self.class_name, strflocal(completed)))
+            self.logger.debug(u'%s: Updating reminder status from done task [%s]',
+                             self.class_name, strflocal(completed))
 
         # process categories and tags
         if task.categories:
-            self.logger.debug(u'%s: Updating tags from categories %s' % (self.class_name, task.categories))
+            self.logger.debug(u'%s: Updating tags from categories %s', self.class_name, task.categories)
             note.tagGuids = []
             note.tagNames = task.tagNames
         else:
-            self.logger.debug(u'%s: Removing tags from note' % (self.class_name))
+            self.logger.debug(u'%s: Removing tags from note', self.class_name)
             note.tagGuids = []
             note.tagNames = []
 
         if self.options.get('ox_status_tag'):
             if task.status:
                 tag = self.options['ox_status_tag'] + OxTask.get_status(int(task.status))
-                self.logger.debug(u'%s: Add status tag %s to note' % (self.class_name, tag))
+                self.logger.debug(u'%s: Add status tag %s to note', self.class_name, tag)
                 note.tagNames.append(tag)
 
         if self.options.get('ox_priority_tag'):
             if task.priority:
                 tag = self.options['ox_priority_tag'] + OxTask.get_priority(int(task.priority))
-                self.logger.debug(u'%s: Add priority tag %s to note' % (self.class_name, tag))
+                self.logger.debug(u'%s: Add priority tag %s to note', self.class_name, tag)
                 note.tagNames.append(tag)
 
         if self.options.get('ox_private_tag'):
@@ -120,12 +121,18 @@ class EvernoteFromOxTask(ThisFromThat):
             if task.private_flag:
                 note.tagNames.append(private_tag)
                 if not note_private_tag:
-                    self.logger.debug(u'%s: Add private tag %s to note' % (self.class_name, private_tag))
+                    self.logger.debug(u'%s: Add private tag %s to note', self.class_name, private_tag)
             else:
                 if note_private_tag:
-                    self.logger.debug(u'%s: Remove private tag %s from note' % (self.class_name, private_tag))
+                    self.logger.debug(u'%s: Remove private tag %s from note', self.class_name, private_tag)
+
+        if not self.same(note.tagNames, tags):
+            self.touch('tagNames')
+
+        if self.skip():
+            return note
 
         # perform the update
         note = self._engine._book.update_note(note)
-        self.logger.debug(u'%s: Updating completed with timestamp %s' % (self.class_name, strflocal(note.updated)))
+        self.logger.debug(u'%s: Updating completed with timestamp %s', self.class_name, strflocal(note.updated))
         return note
\ No newline at end of file
@@ -35,14 +35,15 @@ class EvernoteFromToodledo(ThisFromThat):
         maxsize = self.options.get('maxsize', 2048)
 
         note = note.load()
-        note.title = string(todo.title)
+        tags = list(note.tags or [])
+        self.assign(note, 'title', string(todo.title))
 
         ###############################################
         # set evernote content for new or empty notes #
         ###############################################
         if not update:
-            self.logger.debug(u'%s: Updating note content' % (self.class_name))
-            note.content = ENMLOfPlainText(todo.note.rstrip())
+            self.logger.debug(u'%s: Updating note content', self.class_name)
+            self.assign(note, 'content', ENMLOfPlainText(todo.note.rstrip()))
             if self.options.get('toodledo_sourceURL', True):
                 if note.attributes.sourceURL is None:
                     note.attributes.sourceURL = todo.get_url(tdsync.options.get('permalink_id'))
@@ -64,15 +65,15 @@ class EvernoteFromToodledo(ThisFromThat):
                     if re.sub('\s', '', PlainTextOfENML(note.content), re.MULTILINE):
                         preserve = 'content'
             if preserve:
-                self.logger.debug(u'%s: Found %s - preserving existing note content' % (self.class_name, preserve))
+                self.logger.debug(u'%s: Found %s - preserving existing note content', self.class_name, preserve)
             else:
                 content = todo.note
                 if tdsync.options.get('evernote_iframe', 'False'):
                     content = ensync.remove_evernote_link(content, tdsync.options.get('evernote_iframe_tag', 'IFRAME'))
                 if tdsync.options.get('evernote_link', 'False'):
                     content = ensync.remove_evernote_link(content, tdsync.options.get('evernote_link_tag', 'EVERNOTE'))
-                note.content = ENMLOfPlainText(content.rstrip())
-                self.logger.debug(u'%s: Updating note content' % (self.class_name))
+                if self.assign(note, 'content', ENMLOfPlainText(content.rstrip())):
+                    self.logger.debug(u'%s: Updating note content', self.class_name)
 
         ##############################
         # always update reminderTime #
@@ -80,24 +81,24 @@ class EvernoteFromToodledo(ThisFromThat):
         
         attribute = self.options.get('toodledo_reminderTime','duedate')
         if todo[attribute]:
-            note.attributes.reminderTime = todo[attribute] * 1000
+            self.assign(note.attributes, 'reminderTime', todo[attribute] * 1000)
         else:
-            note.attributes.reminderTime = None
-            note.attributes.reminderOrder = None
-        self.logger.debug(u'%s: Updating note reminderTime from %s [%s]' % (self.class_name, attribute,
-                                                                          strflocal(note.attributes.reminderTime, None)))        
+            self.assign(note.attributes, 'reminderTime', None)
+            self.assign(note.attributes, 'reminderOrder', None)
+        self.logger.debug(u'%s: Updating note reminderTime from %s [%s]', self.class_name, attribute,
+                                                                          strflocal(note.attributes.reminderTime, None))        
         ###########################
         # update reminderDoneTime #
         ###########################
         
         if todo.completed:
-            note.attributes.reminderDoneTime = todo.completed * 1000
-            note.attributes.reminderTime = None
-            note.attributes.reminderOrder = None
+            self.assign(note.attributes, 'reminderDoneTime', todo.completed * 1000)
+            self.assign(note.attributes, 'reminderTime', None)
+            self.assign(note.attributes, 'reminderOrder', None)
         else:
-            note.attributes.reminderDoneTime = None
+            self.assign(note.attributes, 'reminderDoneTime', None)
             
-        self.logger.debug(u'Update reminderDoneTime from [%s]' % (strflocal(todo.completed, None)))
+        self.logger.debug(u'Update reminderDoneTime from [%s]', strflocal(todo.completed, None))
         
         ##########################
         # process lists and tags #
@@ -109,42 +110,48 @@ class EvernoteFromToodledo(ThisFromThat):
         if tdsync.options.get('evernote_tag_status'):
             tag = tdsync.options.get('evernote_tag_status') + ToodledoTask.STATUS[todo.status]
             note.tagNames.append(tag)
-            self.logger.debug(u'Create status tag [%s]' % (tag))
+            self.logger.debug(u'Create status tag [%s]', tag)
         
         if tdsync.options.get('evernote_tag_priority'):
             tag = tdsync.options.get('evernote_tag_priority') + self.priority_map[todo.priority]
             note.tagNames.append(tag)
-            self.logger.debug(u'Create priority tag [%s]' % (tag))
+            self.logger.debug(u'Create priority tag [%s]', tag)
                 
         if tdsync.options.get('evernote_tag_star'):
             if todo.star:
                 tag = tdsync.options.get('evernote_tag_star')
                 note.tagNames.append(tag)
-                self.logger.debug(u'Create star tag [%s]' % (tag))
+                self.logger.debug(u'Create star tag [%s]', tag)
 
         if tdsync.options.get('evernote_tag_context'):
             if todo.context:
                 tag = tdsync.options.get('evernote_tag_context') + tdapi.contexts[todo.context]['name']
                 note.tagNames.append(tag)
-                self.logger.debug(u'Create context tag [%s]' % (tag))
+                self.logger.debug(u'Create context tag [%s]', tag)
 
         if tdsync.options.get('evernote_tag_goal'):
             if todo.goal:
                 tag = tdsync.options.get('evernote_tag_goal') + tdapi.goals[todo.goal]['name']
                 note.tagNames.append(tag)
-                self.logger.debug(u'Create goal tag [%s]' % (tag))
+                self.logger.debug(u'Create goal tag [%s]', tag)
 
         if tdsync.options.get('evernote_tag_location'):
             if todo.location:
                 tag = tdsync.options.get('evernote_tag_location') + tdapi.locations[todo.location]['name']
                 note.tagNames.append(tag)
-                self.logger.debug(u'Create location tag [%s]' % (tag))
+                self.logger.debug(u'Create location tag [%s]', tag)
             
         for tag in todo.tag_names():
             note.tagNames.append(tag)
-            self.logger.debug(u'Create category tag [%s]' % (tag))
+            self.logger.debug(u'Create category tag [%s]', tag)
+
+        if not self.same(note.tagNames, tags):
+            self.touch('tagNames')
+
+        if self.skip():
+            return note
 
         # perform the update (including the necessary encoding)
         note = self._engine._book.update_note(note)
-        self.logger.debug(u'%s: Updating completed with timestamp %s' % (self.class_name, strflocal(note.updated)))
+        self.logger.debug(u'%s: Updating completed with timestamp %s', self.class_name, strflocal(note.updated))
         return note
@@ -1,15 +1,27 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import os, sys, time, json, re, requests, logging
+import os, sys, time, json, re, requests, logging, binascii
 from pyutils import LogAdapter, strflocal, get_logger, utf8
 
 from pysync import Sync, SyncSessionError, SyncInitError, SyncError
+from pysync.records import SyncItem
 from enapi import *
 
 
 class EnClientSync(Sync):
 
+    # create + load + update, get + load + update
+    api_calls = {'get': 1, 'create': 3, 'update': 3, 'delete': 1}
+    api_latency = 0.4
+
+    # filters were ignored by earlier releases
+    filter_opt_in = True
+
+    supports_digests = True
+
+    session_services = ['note_store']
+
     @staticmethod
     def compare_tags(sync, map):
 
@@ -57,6 +69,10 @@ class EnClientSync(Sync):
         self._key_attribute = options.get('key','title')
         self._book = None
         self._maxsize = None
+        self._tags = None
+        self._page_size = int(options.get('page_size', 250))
+        self._retries = int(options.get('rate_limit_retries', 3))
+        self._listing_retries = int(options.get('listing_retries', 2))
 
         if isinstance(client, EnClient):
             self._client = client
@@ -130,10 +146,114 @@ class EnClientSync(Sync):
     @property
     def need_last_map(self): return False
 
-    def _check_filter(self, item):
-        return True
+    @property
+    def supports_since(self): return self._key_attribute == 'title'
+
+    def tag_names(self):
+        if self._tags is None:
+            self._tags = {}
+            for tag in self._client.note_store.listTags():
+                self._tags[tag.guid] = tag.name
+        return self._tags
+
+    def _find_page(self, filter, offset, spec):
+        """
+        One page of a metadata query, waits and retries up to
+        [rate_limit_retries] times if the rate limit is reached
+        """
+        from evernote.edam.error.ttypes import EDAMSystemException, EDAMErrorCode
+
+        attempt = 0
+        while True:
+            try:
+                return self._client.note_store.findNotesMetadata(filter, offset, self._page_size, spec)
+            except EDAMSystemException as e:
+                if e.errorCode != EDAMErrorCode.RATE_LIMIT_REACHED or attempt >= self._retries:
+                    raise
+                attempt += 1
+                duration = e.rateLimitDuration or 60
+                self.logger.warning(u'%s: Rate limit reached, retrying page at %d in %ds',
+                                    self.class_name, offset, duration)
+                time.sleep(duration)
+
+    def find_notes(self, words=None, inactive=False):
+        """
+        Paged metadata query for notes in the notebook, only the fields of
+        the sync map items are requested. Pages are loaded one after the
+        other in creation order: the note store client of the session is
+        shared. Notes missing in a full listing are taken for deletions,
+        so the query is repeated up to [listing_retries] times if the
+        notebook changed while listing.
+        """
+        from evernote.edam.notestore.ttypes import NoteFilter, NotesMetadataResultSpec
+        from evernote.edam.type.ttypes import NoteSortOrder
+
+        filter = NoteFilter(notebookGuid=self.guid, words=words, inactive=inactive,
+                            order=NoteSortOrder.CREATED, ascending=True)
+        spec = NotesMetadataResultSpec(includeTitle=True, includeUpdated=True,
+                                       includeCreated=self._key_attribute == 'created',
+                                       includeTagGuids=True, includeAttributes=True)
+
+        attempt = 0
+        while True:
+            notes, seen, totals, offset = [], set(), set(), 0
+            while True:
+                result = self._find_page(filter, offset, spec)
+                totals.add(result.totalNotes)
+                for nmd in result.notes:
+                    if nmd.guid not in seen:
+                        seen.add(nmd.guid)
+                        notes.append(nmd)
+                offset += len(result.notes)
+                if not result.notes or offset >= result.totalNotes:
+                    break
+            if len(totals) == 1 and len(notes) == result.totalNotes:
+                return notes
+            if attempt >= self._listing_retries:
+                error = u'%s: Notebook changed while listing, %d notes listed of %s' % \
+                        (self.class_name, len(notes), u'/'.join(str(total) for total in sorted(totals)))
+                self.logger.error(error)
+                raise SyncError(error)
+            attempt += 1
+            self.logger.warning(u'%s: Notebook changed while listing, %d notes listed of %s, listing again',
+                                self.class_name, len(notes), u'/'.join(str(total) for total in sorted(totals)))
+
+    def metadata_item(self, nmd):
+        tags = self.tag_names()
+        attributes = nmd.attributes
+        extra = {'tags': [tags.get(guid) for guid in nmd.tagGuids] if nmd.tagGuids else None,
+                 'reminderDoneTime': attributes.reminderDoneTime if attributes else None,
+                 'reminderTime': attributes.reminderTime if attributes else None}
+        key = getattr(nmd, self._key_attribute)
+        if isinstance(key, str):
+            key = key.decode('utf-8')
+        return SyncItem(nmd.guid, key, nmd.updated, extra)
+
+    def sync_map(self, last=None, since=None):
+
+        if since is not None and self.supports_since:
+            # notes updated or moved to trash since the last run
+            self._reset_items()
+            words = 'updated:%s' % (time.strftime('%Y%m%dT%H%M%SZ', time.gmtime(since / 1000)))
+            for nmd in self.find_notes(words):
+                if self._check_filter(nmd):
+                    self._add_item(nmd.guid, self.metadata_item(nmd))
+            for nmd in self.find_notes(words, inactive=True):
+                self._tombstones.add(nmd.guid)
+            self._since = since
+            self.logger.debug(u'%s: Listed %d notes and %d deletions since %s',
+                              self.class_name, len(self._items), len(self._tombstones), strflocal(since))
+            return {'items': self.items, 'name': self.name, 'id': self.guid}
+
+        if self._key_attribute in ['title', 'created', 'updated', 'guid']:
+            # key and extra attributes from the note metadata, no call per note
+            self._reset_items()
+            for nmd in self.find_notes():
+                if self._check_filter(nmd):
+                    self._add_item(nmd.guid, self.metadata_item(nmd))
+            self.logger.debug(u'%s: Listed %d notes', self.class_name, len(self._items))
+            return {'items': self.items, 'name': self.name, 'id': self.guid}
 
-    def sync_map(self, last=None):
         # from enapi import EnBook
         if self.guid:
             self._book = EnBook.initialize(self._client.note_store.getNotebook(self.guid))
@@ -142,27 +262,41 @@ class EnClientSync(Sync):
             self._book = self._client.notebook(self._name)
             #self._guid = self._book.guid
 
-        self._items = {}
+        self._reset_items()
         for key in self._book:
             nmd = self._book.get_note(key)
             #key = eval('nmd.' + self._key_attribute)
             key = nmd[self._key_attribute].decode('utf-8')
             if self._check_filter(nmd):
-                item = {'id': nmd.guid, 'time': nmd.updated, 'key': key, 'extra': EnClientSync.extra(nmd)}
+                item = SyncItem(nmd.guid, key, nmd.updated, EnClientSync.extra(nmd))
                 self._add_item(nmd.guid, item)
 
         return {'items': self.items, 'name': self.name, 'id': self.guid}
 
+    def projection(self, ref):
+        if isinstance(ref, EnNote):
+            content = getattr(ref, 'contentHash', None)
+            if content is None:
+                # note content not loaded: no reliable fingerprint
+                return None
+            return {'title': ref.title,
+                    'content': binascii.hexlify(content),
+                    'tags': sorted(ref.tags or []),
+                    'reminderTime': ref.attributes.reminderTime,
+                    'reminderDoneTime': ref.attributes.reminderDoneTime,
+                    'sourceURL': ref.attributes.sourceURL}
+        return None
+
     def map_item(self, ref=None):
         if isinstance(ref, EnNote):
             #key = eval('ref.' + self._key_attribute)
             key = ref[self._key_attribute].decode('utf-8')
-            return {'id': ref.guid, 'key': key, 'time': ref.updated, 'extra': EnClientSync.extra(ref)}
+            return self._with_digest(SyncItem(ref.guid, key, ref.updated, EnClientSync.extra(ref)), ref)
 
         key = ref if ref is not None else self._key
         item = self._items.get(key)
         if item:
-            return {'id': item['id'], 'key': item['key'], 'time': item['time'], 'extra': item.get('extra')}
+            return self._with_digest(SyncItem(item['id'], item['key'], item['time'], item.get('extra')))
         else:
             return None
 
@@ -175,7 +309,7 @@ class EnClientSync(Sync):
 
             item = self._items.get(self._key)
             item_extra = item.get('extra')
-            self.logger.debug(u'%s: Checking extra attributes %s' % (self.class_name, item_extra))
+            self.logger.debug(u'%s: Checking extra attributes %s', self.class_name, item_extra)
 
             if sync_extra is not None and item_extra is not None:
                 if sync_extra.get('reminderTime') == item_extra.get('reminderTime'):
@@ -183,16 +317,19 @@ class EnClientSync(Sync):
                         if EnClientSync.compare_tags(sync_extra.get('tags'), item_extra.get('tags')):
                             return False
                         else:
-                            self.logger.debug(u'%s: Tags changed' % (self.class_name))
+                            self.logger.debug(u'%s: Tags changed', self.class_name)
                     else:
-                        self.logger.debug(u'%s: Reminder done time changed' % (self.class_name))
+                        self.logger.debug(u'%s: Reminder done time changed', self.class_name)
                 else:
-                    self.logger.debug(u'%s: Reminder time changed' % (self.class_name))
+                    self.logger.debug(u'%s: Reminder time changed', self.class_name)
         return True
 
     def get(self):
         # note = self._client.note_store.getNote(guid, True, True, True, True)
         # nmd = self._client.get_note(self._key, self._name)
+        nmd = self._prefetched()
+        if nmd is not None:
+            return nmd
         try:
             nmd = self._book.get_note(self.key)
         except Exception as e:
@@ -214,7 +351,7 @@ class EnClientSync(Sync):
         that = other.get()
         if that:
             note = EnNote(title=that.title)
-            self.logger.debug(u'%s: Creating note [%s] from %s' % (self.class_name, that.title, other.class_name))
+            self.logger.debug(u'%s: Creating note [%s] from %s', self.class_name, that.title, other.class_name)
             try:
                 note = self._book.create_note(note)
             except Exception as e:
@@ -0,0 +1,23 @@
+import os
+
+__version__ = '1.0.0'
+__license__ = 'GPL2'
+__author__ = 'Bernd Strebel'
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+from .store import FileItem, DirectoryStore, DatabaseStore, open_store
+from .sync import FileSync
+from .file_from_file import FileFromFile
+from .file_from_oxtask import FileFromOxTask
+from .file_from_toodledo import FileFromToodledo
+from .file_from_evernote import FileFromEvernote
+
+__all__ = [
+
+    'FileSync', 'FileItem', 'DirectoryStore', 'DatabaseStore', 'open_store',
+    'FileFromFile',
+    'FileFromOxTask',
+    'FileFromToodledo',
+    'FileFromEvernote'
+]
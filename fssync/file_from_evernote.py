@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, sys, time, logging
+from pyutils import strflocal, utf8
+from pysync import ThisFromThat
+
+
+class FileFromEvernote(ThisFromThat):
+
+    def __init__(self, engine, other):
+        ThisFromThat.__init__(self, engine, other, 'fs <- en')
+
+    def update(self, other, that=None, this=None, sid=None):
+
+        note, item = ThisFromThat.update(self, other, that, this, sid)
+
+        fssync = self._engine
+        ensync = self._other
+        maxsize = ensync.maxsize
+
+        note = note.load()
+
+        if self.assign(item, 'title', utf8(note.title)):
+            self.logger.debug(u'Title changed to [%s]', item.title)
+
+        if note.contentLength > maxsize:
+            self.logger.debug(u'%s: Evernote content exceeds limit of %d KB!', self.class_name, maxsize/1024)
+            content = u'Evernote content exceeds limit of %d KB!' % (maxsize/1024)
+        else:
+            content = utf8(note.plain) or u''
+        self.assign(item, 'note', content)
+
+        # always update the reminder times from Evernote
+        attribute = self.options.get('evernote_reminderTime', 'due')
+        self.assign(item, attribute, note.attributes.reminderTime)
+        self.logger.debug(u'%s: Updating %s from note reminderTime [%s]',
+                          self.class_name, attribute, strflocal(note.attributes.reminderTime, None))
+
+        completed = note.attributes.reminderDoneTime
+        self.assign(item, 'completed', completed)
+
+        status = item.status
+        if completed:
+            status = 'Done'
+        elif status == 'Done':
+            status = 'In progress'
+        priority = item.priority
+
+        status_prefix = self.options.get('evernote_tag_status')
+        priority_prefix = self.options.get('evernote_tag_priority')
+
+        tags = []
+        for tag in note.tags or []:
+            tag = utf8(tag)
+            if status_prefix and tag.startswith(status_prefix):
+                if not completed:
+                    status = tag[len(status_prefix):]
+            elif priority_prefix and tag.startswith(priority_prefix):
+                priority = tag[len(priority_prefix):]
+            else:
+                tags.append(tag)
+
+        if self.assign(item, 'status', status):
+            self.logger.debug(u'Status changed to [%s]', status)
+        if self.assign(item, 'priority', priority):
+            self.logger.debug(u'Priority changed to [%s]', priority)
+        self.assign(item, 'tags', tags)
+
+        if item.url is None and self.options.get('evernote_url', True):
+            self.assign(item, 'url', note.attributes.sourceURL or note.edit_url)
+
+        if self.skip():
+            return item
+
+        item = fssync.store.write(item)
+        self.logger.debug(u'%s: Updating completed with timestamp %s', self.class_name, item.time)
+        return item
@@ -0,0 +1,21 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from pysync import ThisFromThat
+
+
+class FileFromFile(ThisFromThat):
+
+    def __init__(self, engine, other):
+        ThisFromThat.__init__(self, engine, other, 'fs <- fs')
+
+    def update(self, other, that=None, this=None, sid=None):
+
+        that, item = ThisFromThat.update(self, other, that, this, sid)
+
+        for field, value in that.projection().items():
+            self.assign(item, field, value)
+
+        if self.skip():
+            return item
+
+        return self._engine.store.write(item)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, sys, time, logging
+from pyutils import strflocal, utf8
+from pysync import ThisFromThat
+
+
+class FileFromOxTask(ThisFromThat):
+
+    def __init__(self, engine, other):
+        ThisFromThat.__init__(self, engine, other, 'fs <- ox')
+
+    def update(self, other, that=None, this=None, sid=None):
+
+        from oxapi import OxTask
+
+        task, item = ThisFromThat.update(self, other, that, this, sid)
+
+        fssync = self._engine
+
+        if self.assign(item, 'title', utf8(task.title)):
+            self.logger.debug(u'Title changed to [%s]', item.title)
+
+        self.assign(item, 'note', utf8(task.note) or u'')
+
+        # OX dates and times are UTC ms like the item attributes
+        self.assign(item, 'start', task._data.get('start_date'))
+        self.assign(item, 'due', task._data.get('end_date'))
+        if self.assign(item, 'reminder', task._data.get('alarm')):
+            self.logger.debug(u'Reminder changed to [%s]', strflocal(item.reminder, None))
+
+        status = OxTask.get_status(int(task.status)) if task.status else None
+        if self.assign(item, 'status', status):
+            self.logger.debug(u'Status changed to [%s]', status)
+
+        priority = None
+        if task.priority and task.priority != 'null':
+            priority = OxTask.get_priority(int(task.priority))
+            if priority == 'None':
+                priority = None
+        if self.assign(item, 'priority', priority):
+            self.logger.debug(u'Priority changed to [%s]', priority)
+
+        completed = None
+        if status == 'Done':
+            # returned only once if status changes to 'Done'
+            completed = task._data.get('date_completed') or item.completed or long(time.time() * 1000)
+        self.assign(item, 'completed', completed)
+
+        self.assign(item, 'tags', [tag for tag in (task.categories or u'').split(',') if tag])
+
+        if item.url is None and self.options.get('ox_url', True):
+            self.assign(item, 'url', task.get_url())
+
+        if self.skip():
+            return item
+
+        item = fssync.store.write(item)
+        self.logger.debug(u'%s: Updating completed with timestamp %s', self.class_name, item.time)
+        return item
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, sys, time, logging
+from pyutils import strflocal, utf8
+from pysync import ThisFromThat
+
+
+class FileFromToodledo(ThisFromThat):
+
+    # Toodledo status names to the status names of the item (Open-Xchange)
+    status_map = {
+        'None': 'Not started',
+        'Next': 'Not started',
+        'Active': 'In progress',
+        'Planning': 'Not started',
+        'Delegated': 'Waiting',
+        'Waiting': 'Waiting',
+        'Hold': 'Deferred',
+        'Postponed': 'Deferred',
+        'Someday': 'Deferred',
+        'Canceled': 'Deferred',
+        'Reference': 'Deferred'
+    }
+
+    priority_map = {-1: None, 0: 'Low', 1: 'Medium', 2: 'High', 3: 'High'}
+
+    def __init__(self, engine, other):
+        ThisFromThat.__init__(self, engine, other, 'fs <- td')
+
+    def update(self, other, that=None, this=None, sid=None):
+
+        from tdapi import ToodledoTask
+
+        todo, item = ThisFromThat.update(self, other, that, this, sid)
+
+        fssync = self._engine
+        tdsync = self._other
+
+        if self.assign(item, 'title', utf8(todo.title)):
+            self.logger.debug(u'Title changed to [%s]', item.title)
+
+        self.assign(item, 'note', utf8(todo.note) or u'')
+
+        # Toodledo dates and times are seconds, the time replaces the date
+        start = (todo.starttime or todo.startdate or 0) * 1000 or None
+        if self.assign(item, 'start', start):
+            self.logger.debug(u'Start date changed to [%s]', strflocal(start, None))
+
+        due = (todo.duetime or todo.duedate or 0) * 1000 or None
+        if self.assign(item, 'due', due):
+            self.logger.debug(u'Due date changed to [%s]', strflocal(due, None))
+
+        reminder = None
+        if due and todo.remind:
+            reminder = due - todo.remind * 60000
+        self.assign(item, 'reminder', reminder)
+
+        completed = todo.completed * 1000 if todo.completed else None
+        self.assign(item, 'completed', completed)
+
+        if completed:
+            status = 'Done'
+        else:
+            status = self.status_map.get(ToodledoTask.STATUS[todo.status or 0])
+        if self.assign(item, 'status', status):
+            self.logger.debug(u'Status changed to [%s]', status)
+
+        priority = self.priority_map.get(todo.priority)
+        if self.assign(item, 'priority', priority):
+            self.logger.debug(u'Priority changed to [%s]', priority)
+
+        self.assign(item, 'tags', [utf8(tag) for tag in todo.tag_names()])
+
+        if item.url is None and self.options.get('toodledo_url', True):
+            self.assign(item, 'url', todo.get_url(tdsync.options.get('permalink_id')))
+
+        if self.skip():
+            return item
+
+        item = fssync.store.write(item)
+        self.logger.debug(u'%s: Updating completed with timestamp %s', self.class_name, item.time)
+        return item
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Local backends of the FileSync engine. A DirectoryStore keeps one JSON or
+Markdown file per item named by the item id, the modification time of the
+file (ms) is the item time. A DatabaseStore keeps the items in a single
+SQLite file, the item time is a sequence counter incremented by every
+write and the wall clock time of the write is kept for incremental
+listings.
+"""
+
+import os, sys, time, json, uuid, errno, sqlite3, threading
+
+from pysync.mapfile import replace
+
+FORMATS = ['json', 'markdown', 'sqlite']
+
+
+class FileItem(object):
+    """
+    Task or note with the attributes shared by the translators, times
+    are ms since the epoch
+    """
+    FIELDS = ('title', 'note', 'tags', 'status', 'priority', 'start', 'due', 'reminder', 'completed', 'url')
+
+    __slots__ = ('id', 'time') + FIELDS
+
+    def __init__(self, id=None, title=u'', time=0L, **fields):
+        self.id = id
+        self.time = time
+        self.title = title
+        self.note = fields.get('note', u'')
+        self.tags = list(fields.get('tags') or [])
+        for field in FileItem.FIELDS[3:]:
+            setattr(self, field, fields.get(field))
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def copy(self):
+        return FileItem.of(self.projection(), self.id, self.time)
+
+    def projection(self):
+        return dict((field, getattr(self, field)) for field in FileItem.FIELDS)
+
+    def to_dict(self):
+        return dict(self.projection(), id=self.id)
+
+    @classmethod
+    def of(cls, data, id=None, time=0L):
+        fields = dict((field, data.get(field)) for field in FileItem.FIELDS[1:])
+        return cls(id or data.get('id'), data.get('title') or u'', time, **fields)
+
+
+def to_markdown(item):
+    """
+    Markdown file with the attributes as front matter (JSON values), the
+    title as heading and the note as body
+    """
+    lines = [u'---']
+    if u'\n' in item.title:
+        lines.append(u'title: %s' % (json.dumps(item.title, ensure_ascii=False)))
+    for field in FileItem.FIELDS[2:]:
+        value = getattr(item, field)
+        if value is not None and value != []:
+            lines.append(u'%s: %s' % (field, json.dumps(value, ensure_ascii=False)))
+    lines.append(u'---')
+    lines.append(u'# %s' % (u' '.join(item.title.splitlines())))
+    content = u'\n'.join(lines) + u'\n'
+    if item.note:
+        content += u'\n' + item.note
+    return content
+
+
+def from_markdown(content, id=None, time=0L):
+    data = {}
+    if content.startswith(u'---\n'):
+        header, sep, content = content[4:].partition(u'---\n')
+        for line in header.splitlines():
+            name, sep, value = line.partition(u':')
+            if sep and name.strip() in FileItem.FIELDS:
+                data[name.strip()] = json.loads(value)
+    heading, sep, note = content.partition(u'\n')
+    if heading.startswith(u'# '):
+        data.setdefault('title', heading[2:])
+        data['note'] = note[1:] if note.startswith(u'\n') else note
+    else:
+        data['note'] = content
+    return FileItem.of(data, id, time)
+
+
+class DirectoryStore(object):
+    """
+    One file per item in directory path, format json or markdown
+    """
+    EXTENSIONS = {'json': '.json', 'markdown': '.md'}
+
+    def __init__(self, path, format='json'):
+        self._path = os.path.abspath(os.path.expanduser(path))
+        self._format = format
+        self._extension = DirectoryStore.EXTENSIONS[format]
+        if not os.path.isdir(self._path):
+            os.makedirs(self._path)
+
+    @property
+    def path(self): return self._path
+
+    @property
+    def format(self): return self._format
+
+    def _file(self, id):
+        return os.path.join(self._path, id + self._extension)
+
+    @staticmethod
+    def _mtime(name):
+        return long(round(os.stat(name).st_mtime * 1000))
+
+    def ids(self):
+        return [name[:-len(self._extension)] for name in os.listdir(self._path) if name.endswith(self._extension)]
+
+    def _load(self, id, time):
+        with open(self._file(id), 'rb') as fp:
+            content = fp.read().decode('utf-8')
+        if self._format == 'markdown':
+            return from_markdown(content, id, time)
+        return FileItem.of(json.loads(content), id, time)
+
+    def scan(self, since=None, present=None):
+        """
+        Items modified since (all items if None), the ids of all items
+        are added to present
+        """
+        for id in self.ids():
+            if present is not None:
+                present.add(id)
+            try:
+                time = DirectoryStore._mtime(self._file(id))
+                if since is None or time >= since:
+                    yield self._load(id, time)
+            except (IOError, OSError) as e:
+                # removed while listing
+                if e.errno != errno.ENOENT:
+                    raise
+
+    def read(self, id):
+        try:
+            return self._load(id, DirectoryStore._mtime(self._file(id)))
+        except (IOError, OSError) as e:
+            if e.errno == errno.ENOENT:
+                return None
+            raise
+
+    def write(self, item):
+        """
+        Store a copy of item (with a new id if item.id is None) and return
+        it with the modification time of the file
+        """
+        item = item.copy()
+        if item.id is None:
+            item.id = uuid.uuid4().hex
+        name = self._file(item.id)
+        previous = DirectoryStore._mtime(name) if os.path.exists(name) else 0L
+
+        if self._format == 'markdown':
+            content = to_markdown(item)
+        else:
+            content = json.dumps(item.to_dict(), ensure_ascii=False, indent=2, sort_keys=True)
+        with open(name + '.tmp', 'wb') as fp:
+            fp.write(content.encode('utf-8'))
+        replace(name + '.tmp', name)
+
+        item.time = DirectoryStore._mtime(name)
+        if item.time <= previous:
+            # two writes within the mtime resolution: time must increase
+            item.time = previous + 1
+            os.utime(name, (item.time / 1000.0, item.time / 1000.0))
+        return item
+
+    def delete(self, id):
+        try:
+            os.remove(self._file(id))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+
+class DatabaseStore(object):
+    """
+    Items in the SQLite database file path, the item time is a sequence
+    counter
+    """
+    SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS items (id TEXT PRIMARY KEY, seq INTEGER NOT NULL, '
+        'modified INTEGER NOT NULL, data TEXT NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS items_modified ON items (modified)',
+        'CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)'
+    ]
+
+    def __init__(self, path):
+        self._path = os.path.abspath(os.path.expanduser(path))
+        self._lock = threading.RLock()
+        # shared with executor threads, access is serialized by _lock
+        self._db = sqlite3.connect(self._path, check_same_thread=False)
+        self._db.text_factory = unicode
+        self._db.execute('PRAGMA synchronous = NORMAL')
+        for sql in DatabaseStore.SCHEMA:
+            self._db.execute(sql)
+        self._db.commit()
+
+    @property
+    def path(self): return self._path
+
+    @property
+    def format(self): return 'sqlite'
+
+    @staticmethod
+    def _item(row):
+        return FileItem.of(json.loads(row[2]), row[0], row[1])
+
+    def ids(self):
+        with self._lock:
+            return [row[0] for row in self._db.execute('SELECT id FROM items')]
+
+    def scan(self, since=None, present=None):
+        with self._lock:
+            if present is not None:
+                present.update(row[0] for row in self._db.execute('SELECT id FROM items'))
+            if since is None:
+                rows = self._db.execute('SELECT id, seq, data FROM items').fetchall()
+            else:
+                rows = self._db.execute('SELECT id, seq, data FROM items WHERE modified >= ?', (since,)).fetchall()
+        for row in rows:
+            yield DatabaseStore._item(row)
+
+    def read(self, id):
+        with self._lock:
+            row = self._db.execute('SELECT id, seq, data FROM items WHERE id = ?', (id,)).fetchone()
+        return DatabaseStore._item(row) if row is not None else None
+
+    def write(self, item):
+        item = item.copy()
+        if item.id is None:
+            item.id = uuid.uuid4().hex
+        data = json.dumps(item.projection(), ensure_ascii=False)
+        with self._lock:
+            row = self._db.execute('SELECT value FROM meta WHERE name = ?', ('sequence',)).fetchone()
+            item.time = (row[0] if row is not None else 0L) + 1
+            self._db.execute('INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)', ('sequence', item.time))
+            self._db.execute('INSERT OR REPLACE INTO items (id, seq, modified, data) VALUES (?, ?, ?, ?)',
+                             (item.id, item.time, long(time.time() * 1000), data))
+            self._db.commit()
+        return item
+
+    def delete(self, id):
+        with self._lock:
+            self._db.execute('DELETE FROM items WHERE id = ?', (id,))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def open_store(path, format=None):
+    """
+    DirectoryStore or DatabaseStore for path, the default format is
+    sqlite for .db and .sqlite files and json otherwise
+    """
+    if format is None:
+        format = 'sqlite' if os.path.splitext(path)[1].lower() in ['.db', '.sqlite'] else 'json'
+    if format not in FORMATS:
+        raise ValueError(u'Invalid file engine format [%s]' % (format))
+    if format == 'sqlite':
+        return DatabaseStore(path)
+    return DirectoryStore(path, format)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, sys, time, logging
+from pyutils import LogAdapter, utf8
+
+from pysync import Sync, SyncSessionError, SyncInitError
+from pysync.records import SyncItem
+
+from .store import FileItem, open_store
+
+
+class FileSync(Sync):
+    """
+    Sync engine on a local directory with one JSON or Markdown file per
+    item or on a single SQLite database file. Options: path, format (json,
+    markdown or sqlite, default: sqlite for .db and .sqlite files, json
+    otherwise), key (default: title) and the options of Sync
+    """
+    # local reads and writes, no remote calls
+    api_calls = {'get': 1, 'create': 1, 'update': 1, 'delete': 1}
+    api_latency = 0.001
+
+    supports_digests = True
+
+    @staticmethod
+    def session(options, _logger):
+        if options and options.get('path'):
+            try:
+                return open_store(options['path'], options.get('format'))
+            except (ValueError, IOError, OSError) as e:
+                error = u'Error opening [%s]: %s' % (options['path'], e)
+        else:
+            error = u'Missing path in file engine options'
+
+        LogAdapter(_logger, {'package': 'fssync'}).error(error)
+        raise SyncSessionError(error)
+        return None
+
+    def __init__(self, store, options, logger=None):
+
+        self._key_attribute = options.get('key', 'title')
+        Sync.__init__(self, options, logger, 'fssync')
+        self._store = store
+        # ids of all items in the store during an incremental listing
+        self._present = None
+
+        if self.signature is None:
+            self.options.update({'signature': {'label': options.get('label'),
+                                               'path': store.path, 'format': store.format}})
+        elif self.signature.get('format') not in [None, store.format]:
+            error = u'Format [%s] differs from [%s] in map file!' % (store.format, self.signature['format'])
+            raise SyncInitError(error)
+
+    @property
+    def store(self): return self._store
+
+    @property
+    def need_last_map(self): return False
+
+    @property
+    def supports_since(self): return True
+
+    def sync_map(self, last=None, since=None):
+
+        self._reset_items()
+        self._present = set() if since is not None else None
+        for item in self._store.scan(since, self._present):
+            if self._check_filter(item):
+                self._add_item(item.id, self.map_item(item))
+        if since is not None:
+            self._since = since
+        return {'items': self.items}
+
+    def restore(self, items):
+        # items removed from the store since the last run are deleted
+        if self._present is not None:
+            items = list(items)
+            self._tombstones.update(item['id'] for item in items if item['id'] not in self._present)
+        Sync.restore(self, items)
+
+    def map_item(self, ref=None):
+        if isinstance(ref, FileItem):
+            return self._with_digest(SyncItem(ref.id, ref[self._key_attribute], ref.time), ref)
+        return Sync.map_item(self, ref)
+
+    def projection(self, ref):
+        if isinstance(ref, FileItem):
+            return ref.projection()
+        return None
+
+    def get(self):
+        item = self._prefetched()
+        if item is not None:
+            return item
+        try:
+            item = self._store.read(self.key)
+        except Exception as e:
+            self.logger.exception(u'Error reading item [%s]: %s' % (self.key, self.title))
+            return None
+        return item
+
+    def create(self, other, sid=None):
+        that = other.get()
+        if that:
+            title = that.title if isinstance(that.title, unicode) else utf8(that.title)
+            self.logger.debug(u'%s: Creating item [%s] from %s', self.class_name, title, other.class_name)
+            # written by the translator
+            item = FileItem(None, title)
+            if sid is not None:
+                self._created[sid] = item
+            return self.update(other, that, item, sid=sid)
+        return None
+
+    def delete(self, sid=None):
+        try:
+            self._store.delete(self.key)
+        except Exception as e:
+            self.logger.exception(u'Error deleting item [%s]: %s' % (self.key, self.title))
+            return None
+        if sid is not None:
+            self._deleted[sid] = self._items[self.key]
+        Sync.delete(self, sid)
+
+    def changed(self, sync):
+        return Sync.changed(self, sync)
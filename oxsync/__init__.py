@@ -9,10 +9,12 @@ PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
 from .sync import OxTaskSync
 from .oxtask_from_evernote import OxTaskFromEvernote
 from .oxtask_from_toodledo import OxTaskFromToodldo
+from .oxtask_from_file import OxTaskFromFile
 
 __all__ = [
 
     'OxTaskSync',
     'OxTaskFromEvernote',
-    'OxTaskFromToodldo'
+    'OxTaskFromToodldo',
+    'OxTaskFromFile'
 ]
@@ -13,7 +13,7 @@ class OxTaskFromEvernote(ThisFromThat):
 
         note, task = ThisFromThat.update(self, other, that, this, sid)
 
-        ox = self._engine._ox
+        ox = self._engine._ox; ox_sync = self._engine
         ensync = self._other
         maxsize = self._engine.maxsize
         update = self._update
@@ -48,11 +48,11 @@ class OxTaskFromEvernote(ThisFromThat):
         if self.options.get('evernote_sourceURL', True):
             if note.attributes.sourceURL:
                 if not note.attributes.sourceURL.startswith(ox.server):
-                    self.logger.debug(u'%s: Updating content with source URL %s' % (self.class_name, note.attributes.sourceURL))
+                    self.logger.debug(u'%s: Updating content with source URL %s', self.class_name, note.attributes.sourceURL)
                     content += 'SOURCE: %s\n' % (note.attributes.sourceURL)
 
         if note.contentLength > maxsize:
-            self.logger.debug(u'%s: Evernote content exceeds limit of %d KB!' % (self.class_name, maxsize/1024))
+            self.logger.debug(u'%s: Evernote content exceeds limit of %d KB!', self.class_name, maxsize/1024)
             content += 'Evernote content exceeds limit of %d KB!' % (maxsize/1024)
         else:
             content += note.plain
@@ -65,7 +65,7 @@ class OxTaskFromEvernote(ThisFromThat):
             tag = self.options.get('evernote_iframe_tag', 'IFRAME')
             content = ensync.add_evernote_link(content, note.view_url, tag)
 
-        task._data['note'] = content
+        self.assign(task._data, 'note', content)
 
         ############################
         # process other attributes #
@@ -74,9 +74,9 @@ class OxTaskFromEvernote(ThisFromThat):
         # always update reminderTime from Evernote
         newtime = strflocal(note.attributes.reminderTime) if note.attributes.reminderTime is not None else 'None'
         attribute = self.options.get('evernote_reminderTime', 'end_date')
-        task._data[attribute] = note.attributes.reminderTime
-        self.logger.debug(u'%s: Updating %s from note reminderTime [%s]' %
-                         (self.class_name, attribute, newtime))
+        self.assign(task._data, attribute, note.attributes.reminderTime)
+        self.logger.debug(u'%s: Updating %s from note reminderTime [%s]',
+                         self.class_name, attribute, newtime)
 
         # always update reminderDoneTime and task status
         oldstatus = int(task._data.get('status', 0))
@@ -93,21 +93,21 @@ class OxTaskFromEvernote(ThisFromThat):
                 newstatus = int(task._data.get('status', 0))
 
         attribute = self.options.get('evernote_reminderDoneTime', 'date_completed')
-        task._data[attribute] = note.attributes.reminderDoneTime
-        self.logger.debug(u'%s: Updating task %s from note reminderDoneTime [%s]' %
-                         (self.class_name, attribute, newtime))
+        self.assign(task._data, attribute, note.attributes.reminderDoneTime)
+        self.logger.debug(u'%s: Updating task %s from note reminderDoneTime [%s]',
+                         self.class_name, attribute, newtime)
 
         task._data['status'] = newstatus
 
         if newstatus != oldstatus:
-            self.logger.debug(u'%s: Updating task status from [%s] to [%s]' %
-                             (self.class_name, OxTask.get_status(oldstatus), OxTask.get_status(newstatus)))
+            self.logger.debug(u'%s: Updating task status from [%s] to [%s]',
+                             self.class_name, OxTask.get_status(oldstatus), OxTask.get_status(newstatus))
 
         ######################
         # process categories #
         ######################
 
-        self.logger.debug(u'%s: Updating categories from tags %s' % (self.class_name, note.categories))
+        self.logger.debug(u'%s: Updating categories from tags %s', self.class_name, note.categories)
 
         status_prefix = None
         status_now = task.status
@@ -137,41 +137,49 @@ class OxTaskFromEvernote(ThisFromThat):
 
                 status_new = OxTask.get_status(tag[1:].lower())
                 if status_now != status_new:
-                    self.logger.debug(u'%s: Updating task status to [%s]' % (self.class_name, OxTask.get_status(status_new)))
+                    self.logger.debug(u'%s: Updating task status to [%s]', self.class_name, OxTask.get_status(status_new))
 
             elif priority_prefix and tag.startswith(priority_prefix):
 
                 priority_new = OxTask.get_priority(tag[1:].lower())
                 if priority_now != priority_new:
-                    self.logger.debug(u'%s: Updating task priority to [%s]' % (self.class_name, OxTask.get_priority(priority_new)))
+                    self.logger.debug(u'%s: Updating task priority to [%s]', self.class_name, OxTask.get_priority(priority_new))
 
             elif private_tag and tag == private_tag:
 
                     private_new = True
                     if private_now != private_new:
-                        self.logger.debug(u'%s: Updating private flag to [%s]' % (self.class_name, private_new))
+                        self.logger.debug(u'%s: Updating private flag to [%s]', self.class_name, private_new)
             else:
                 categories.append(tag)
 
         task._data['status'] = status_new
+        if not self.same(status_new, oldstatus):
+            self.touch('status')
 
         if priority_new == 0:
             # undocumented OX magic
-            task._data['priority'] = 'null'
+            self.assign(task._data, 'priority', 'null')
         else:
-            task._data['priority'] = str(priority_new)
+            self.assign(task._data, 'priority', str(priority_new))
 
-        task._data['private_flag'] = private_new
+        self.assign(task._data, 'private_flag', private_new)
 
         # OxTask @categories.setter
+        if not self.same(categories, [tag for tag in (task.categories or u'').split(',') if tag]):
+            self.touch('categories')
         task.categories = categories
 
-        task._data['title'] = note.title
+        self.assign(task._data, 'title', note.title)
+
+        if self.skip():
+            return task
+
         task._data['full_time'] = True
         task._data['notification'] = True
-        task = task.update()
+        task = ox_sync.update_task(task, self.dirty)
         task.load()
         # timestamp from api request is UTC: don't add self._utc_offset
-        self.logger.debug(u'%s: Updating completed with timestamp %s' % (self.class_name, strflocal(task.timestamp)))
+        self.logger.debug(u'%s: Updating completed with timestamp %s', self.class_name, strflocal(task.timestamp))
         return task
 
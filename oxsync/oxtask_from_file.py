@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from pyutils import strflocal, utf8
+from pysync import ThisFromThat
+
+
+class OxTaskFromFile(ThisFromThat):
+
+    def __init__(self, engine, other):
+        ThisFromThat.__init__(self, engine, other, 'ox <- fs')
+
+    def update(self, other, that=None, this=None, sid=None):
+
+        from oxapi import OxTask
+
+        item, task = ThisFromThat.update(self, other, that, this, sid)
+
+        ox_sync = self._engine
+
+        if self.assign(task._data, 'title', utf8(item.title)):
+            self.logger.debug(u'Title changed to [%s]', item.title)
+
+        self.assign(task._data, 'note', item.note or u'')
+
+        # item dates and times are UTC ms like the OX attributes
+        self.assign(task._data, 'start_date', item.start)
+        self.assign(task._data, 'end_date', item.due)
+        if self.assign(task._data, 'alarm', item.reminder):
+            self.logger.debug(u'Reminder changed to [%s]', strflocal(item.reminder, None))
+
+        status = OxTask.get_status(item.status) if item.status else OxTask.get_status('Not started')
+        if not self.same(status, task._data.get('status')):
+            self.logger.debug(u'Status changed to [%s]', item.status)
+        self.assign(task._data, 'status', status)
+
+        if item.status == 'Done':
+            self.assign(task._data, 'date_completed', item.completed)
+
+        if item.priority:
+            self.assign(task._data, 'priority', str(OxTask.get_priority(item.priority)))
+        else:
+            # undocumented OX magic
+            self.assign(task._data, 'priority', 'null')
+
+        # OxTask @categories.setter
+        if not self.same(item.tags, [tag for tag in (task.categories or u'').split(',') if tag]):
+            self.touch('categories')
+        task.categories = item.tags
+
+        if self.skip():
+            return task
+
+        task._data['full_time'] = True
+        task._data['notification'] = True
+        task = ox_sync.update_task(task, self.dirty)
+        task.load()
+        self.logger.debug(u'%s: Updating completed with timestamp %s', self.class_name, strflocal(task.timestamp))
+        return task
@@ -66,13 +66,11 @@ class OxTaskFromToodldo(ThisFromThat):
 # endregion
 
         title = utf8(todo.title)
-        if title != task.title:
-            task.title = title
-            self.logger.debug(u'Title changed to [%s]' % (title))
-            
+        if self.assign(task, 'title', title):
+            self.logger.debug(u'Title changed to [%s]', title)
+
         note = utf8(todo.note)
-        if note != task.note:
-            task.note = note
+        self.assign(task, 'note', note)
 
         DAY = 60*60 * 24
         OX_UTC_TIME = 0
@@ -87,18 +85,18 @@ class OxTaskFromToodldo(ThisFromThat):
             full_time = False 
             start_time = todo._start_time + (ox.utc_offset/1000)
             if start_time != task.start_time:
-                self.logger.debug(u'Start time changed from [%s] to [%s]' % (strflocal(task.start_time, None),
-                                                                           strflocal(start_time, None)))
+                self.logger.debug(u'Start time changed from [%s] to [%s]', strflocal(task.start_time, None),
+                                                                           strflocal(start_time, None))
         else:
             if todo._start_date:
                 full_time = True
                 start_date = todo._start_date - TD_UTC_TIME
             if start_date != task.start_date:
-                self.logger.debug(u'Start date changed from [%s] to [%s]' % (strflocal(task.start_date, None),
-                                                                           strflocal(start_date, None)))
+                self.logger.debug(u'Start date changed from [%s] to [%s]', strflocal(task.start_date, None),
+                                                                           strflocal(start_date, None))
                 
-        task.start_time = start_time
-        task.start_date = start_date
+        self.assign(task, 'start_time', start_time)
+        self.assign(task, 'start_date', start_date)
         
         end_time = None
         end_date = None
@@ -107,28 +105,29 @@ class OxTaskFromToodldo(ThisFromThat):
             full_time = False 
             end_time = todo._due_time + (ox.utc_offset/1000)
             if end_time != task.end_time:
-                self.logger.debug(u'end time changed from [%s] to [%s]' % (strflocal(task.end_time, None),
-                                                                         strflocal(end_time, None)))
+                self.logger.debug(u'end time changed from [%s] to [%s]', strflocal(task.end_time, None),
+                                                                         strflocal(end_time, None))
         else:
             if todo._due_date:
                 full_time = True
                 end_date = todo._due_date - TD_UTC_TIME
             if end_date != task.end_date:
-                self.logger.debug(u'end date changed from [%s] to [%s]' % (strflocal(task.end_date, None),
-                                                                         strflocal(end_date, None)))
+                self.logger.debug(u'end date changed from [%s] to [%s]', strflocal(task.end_date, None),
+                                                                         strflocal(end_date, None))
                 
-        task.end_time = end_time
-        task.end_date = end_date
-        
+        self.assign(task, 'end_time', end_time)
+        self.assign(task, 'end_date', end_date)
+
+        # not tracked: always reset before the write below
         task.full_time = full_time
 
         alarm = None
         if todo._remind_date:
             alarm = todo._remind_date
         if alarm != task.alarm:
-            self.logger.debug(u'Reminder changed from [%s] to [%s]' % (strflocal(task.alarm, None),
-                                                                     strflocal(alarm, None)))
-        task.alarm = alarm
+            self.logger.debug(u'Reminder changed from [%s] to [%s]', strflocal(task.alarm, None),
+                                                                     strflocal(alarm, None))
+        self.assign(task, 'alarm', alarm)
 
         tags = []
         prefix_used = []
@@ -145,14 +144,14 @@ class OxTaskFromToodldo(ThisFromThat):
                         tag = prefix + ToodledoTask.STATUS[todo.status]
                         tags.append(tag)
                         prefix_used.append(prefix)
-                        self.logger.debug(u'Create extended status tag [%]' % (tag))
+                        self.logger.debug(u'Create extended status tag [%s]', tag)
         else:
             status = OxTask.get_status('Done')
             # task.date_completed = todo._date_completed
             
         if status != task.status:
-            self.logger.debug(u'Status changed from [%s] to [%s]' % (task.status, status))
-        task.status = status
+            self.logger.debug(u'Status changed from [%s] to [%s]', task.status, status)
+        self.assign(task, 'status', status)
 
         priority = None
         if todo.priority is not None:
@@ -163,42 +162,42 @@ class OxTaskFromToodldo(ThisFromThat):
                     tag = utf8(prefix + 'Negative')
                     tags.append(tag)
                     prefix_used.append(prefix)
-                    self.logger.debug(u'Create extendend priority tag [%s]' % (tag))
+                    self.logger.debug(u'Create extendend priority tag [%s]', tag)
                 elif todo.priority == 3:
                     tag = utf8(prefix + 'Top')
                     tags.append(tag)
                     prefix_used.append(prefix)
-                    self.logger.debug(u'Create extendend priority tag [%s]' % (tag))
+                    self.logger.debug(u'Create extendend priority tag [%s]', tag)
                 else:
                     pass
 
         if priority != task.priority:
-            self.logger.debug(u'Priority changed from [%s] to [%s]' % (task.priority, priority))
-        task.priority = priority
+            self.logger.debug(u'Priority changed from [%s] to [%s]', task.priority, priority)
+        self.assign(task, 'priority', priority)
 
         if tdsync.options.get('ox_tag_star'):
             if todo.star:
                 tag = tdsync.options.get('ox_tag_star')
                 tags.append(tag)
-                self.logger.debug(u'Create star tag [%s]' % (tag))
+                self.logger.debug(u'Create star tag [%s]', tag)
 
         if tdsync.options.get('ox_tag_context'):
             if todo.context:
                 tag = tdsync.options.get('ox_tag_context') + tdapi.contexts[todo.context]['name']
                 tags.append(tag)
-                self.logger.debug(u'Create context tag [%s]' % (tag))
+                self.logger.debug(u'Create context tag [%s]', tag)
 
         if tdsync.options.get('ox_tag_goal'):
             if todo.goal:
                 tag = tdsync.options.get('ox_tag_goal') + tdapi.goals[todo.goal]['name']
                 tags.append(tag)
-                self.logger.debug(u'Create goal tag [%s]' % (tag))
+                self.logger.debug(u'Create goal tag [%s]', tag)
 
         if tdsync.options.get('ox_tag_location'):
             if todo.location:
                 tag = tdsync.options.get('ox_tag_location') + tdapi.locations[todo.location]['name']
                 tags.append(tag)
-                self.logger.debug(u'Create location tag [%s]' % (tag))
+                self.logger.debug(u'Create location tag [%s]', tag)
 
         for tag in todo.tag_names():
             if tag == tdsync.options.get('ox_tag_star', ','):
@@ -215,18 +214,21 @@ class OxTaskFromToodldo(ThisFromThat):
                 continue
             else:
                 tags.append(tag)
-                self.logger.debug(u'Create category tag [%s]' % (tag))
+                self.logger.debug(u'Create category tag [%s]', tag)
 
         if len(tags) > 0:
             categories = u','.join(tags)
         if categories != task.categories:
-            self.logger.debug(u'Categories changed from [%s] to [%s]' % (task.categories, categories))
-        task.categories = categories
+            self.logger.debug(u'Categories changed from [%s] to [%s]', task.categories, categories)
+        self.assign(task, 'categories', categories)
+
+        if self.skip():
+            return task
 
         task.notification = True
         task._data['full_time'] = False
 
-        task = task.update()
+        task = oxsync.update_task(task, self.dirty)
         task.load()
-        self.logger.debug(u'%s: Updating completed with timestamp %s' % (self.class_name, strflocal(task.timestamp)))
+        self.logger.debug(u'%s: Updating completed with timestamp %s', self.class_name, strflocal(task.timestamp))
         return task
@@ -5,10 +5,20 @@ import os, sys, time, re, logging
 from pyutils import LogAdapter, strflocal, get_logger, utf8
 
 from pysync import Sync, SyncSessionError, SyncInitError, SyncError
+from pysync.records import SyncItem
 from oxapi import *
 
 class OxTaskSync(Sync, OxTasks):
 
+    # create + update + reload, get + update + reload, get + delete
+    api_calls = {'get': 1, 'create': 3, 'update': 3, 'delete': 2}
+    api_latency = 0.2
+
+    # filters were ignored by earlier releases
+    filter_opt_in = True
+
+    supports_digests = True
+
     @staticmethod
     def session(options, _logger):
         if options:
@@ -35,6 +45,19 @@ class OxTaskSync(Sync, OxTasks):
 
         self._key_attribute = options.get('key','title')
         self._maxsize = options.get('maxsize', 2048)
+
+        # listing columns: [columns] = full or a list of task attributes
+        columns = options.get('columns') or []
+        if columns == 'full':
+            columns = self.detail_columns
+        elif isinstance(columns, basestring):
+            columns = [column.strip() for column in columns.split(',') if column.strip()]
+        self._columns = ['id', 'last_modified', self._key_attribute] + \
+                        [column for column in columns if column not in ['id', 'last_modified', self._key_attribute]]
+        # tasks of a listing with the detail columns serve get() and delete()
+        self._listed = None
+        # tasks in the folder at the last listing (bulk loads of get_many)
+        self._folder_size = None
         self._folder = None
         self._archive = None
 
@@ -45,13 +68,13 @@ class OxTaskSync(Sync, OxTasks):
             signature = {'label': options.get('label')}
             if options.get('folder') is not None:
                 self._folder = self._ox.get_folder('tasks', utf8(options['folder']))
-                self.logger.debug(u'Using folder [%s]: %s' % (self._folder.id, utf8(self._folder.title)))
+                self.logger.debug(u'Using folder [%s]: %s', self._folder.id, utf8(self._folder.title))
                 if self._folder is not None:
                     signature['folder'] = self._folder.title
                     signature['id'] = self._folder.id
                     if options.get('archive'):
                         self._archive = self._ox.get_folder('tasks', utf8(options['archive']))
-                        self.logger.debug(u'Using archive folder [%s]: %s' % (self._archive.id, utf8(self._archive.title)))
+                        self.logger.debug(u'Using archive folder [%s]: %s', self._archive.id, utf8(self._archive.title))
                         if self._archive is not None:
                             signature['archive'] = self._archive.id
                         else:
@@ -71,7 +94,7 @@ class OxTaskSync(Sync, OxTasks):
             if self.signature.get('id'):
                 self._folder = self._ox.get_folder('tasks', self.signature['id'])
                 if self._folder is not None:
-                    self.logger.debug(u'Using folder [%s]: %s' % (self._folder.id, utf8(self._folder.title)))
+                    self.logger.debug(u'Using folder [%s]: %s', self._folder.id, utf8(self._folder.title))
                 else:
                     error = u'Folder [%s] from map file not found!' % (self.signature['id'])
                     # self.logger.error(error)
@@ -80,7 +103,7 @@ class OxTaskSync(Sync, OxTasks):
             if self.signature.get('archive'):
                 self._archive = self._ox.get_folder('tasks', self.signature['archive'])
                 if self._folder is not None:
-                    self.logger.debug(u'Using folder [%s]: %s' % (self._archive.id, utf8(self._archive.title)))
+                    self.logger.debug(u'Using folder [%s]: %s', self._archive.id, utf8(self._archive.title))
                 else:
                     error = u'Archive folder [%s] from map file not found!' % (self.signature['archive'])
                     # self.logger.error()
@@ -125,25 +148,51 @@ class OxTaskSync(Sync, OxTasks):
             logger.exception('Unknown error in end_session!')
         OxHttpAPI.set_session(None)
 
-    def _check_filter(self, item):
-        return True
+    # task attributes synchronized by the translators
+    projection_columns = ['title', 'note', 'start_date', 'end_date', 'full_time', 'alarm',
+                          'status', 'priority', 'date_completed', 'categories', 'private_flag']
+
+    # task attributes used by the translators, without start_time and
+    # end_time (not supported by older servers and the default task folder)
+    detail_columns = ['id', 'folder_id', 'last_modified', 'title', 'note', 'start_date', 'end_date',
+                      'full_time', 'alarm', 'status', 'priority', 'date_completed',
+                      'percent_completed', 'categories', 'private_flag', 'number_of_attachments']
+
+    @property
+    def columns(self): return self._columns
+
+    @property
+    def listing_details(self):
+        return set(self.detail_columns) <= set(self._columns)
+
+    def projection(self, ref):
+        if isinstance(ref, OxTask):
+            return dict((column, ref._data.get(column)) for column in self.projection_columns)
+        return None
 
     def map_item(self, ref=None):
         if isinstance(ref, OxTask):
-            return {'id': ref.id, 'key': ref[self._key_attribute], 'time': ref.timestamp}
+            return self._with_digest(SyncItem(ref.id, ref[self._key_attribute], ref.timestamp), ref)
         else:
             return Sync.map_item(self, ref)
 
-    def sync_map(self, last=None):
+    def sync_map(self, last=None, since=None):
 
         if self.folder:
 
-            self._data = []; self._items = {}
+            self._data = []; self._reset_items()
+            self._listed = {} if self.listing_details else None
+            self._folder_size = 0
 
-            for task in self._ox.get_tasks(self.folder.id, ['id', 'last_modified', self._key_attribute]):
+            for task in self._ox.get_tasks(self.folder.id, self._columns):
+                self._folder_size += 1
                 if self._check_filter(task):
                     self._data.append(task)
-                    item = {'id': task.id, 'time': task.last_modified + self._ox.utc_offset, 'key': task[self._key_attribute]}
+                    item = SyncItem(task.id, task[self._key_attribute], task.last_modified + self._ox.utc_offset)
+                    if self._listed is not None:
+                        # fingerprint and get() from the listed task
+                        self._listed[task.id] = task
+                        item = self._with_digest(item, task)
                     self._add_item(task.id, item)
 
             return {'items': self.items}
@@ -156,14 +205,16 @@ class OxTaskSync(Sync, OxTasks):
     def delete(self, sid=None):
 
         try:
-            task = self._ox.get_task(self.folder.id, self.key)
+            task = self._listed.get(self.key) if self._listed is not None else None
+            if task is None:
+                task = self._ox.get_task(self.folder.id, self.key)
         except Exception as e:
             self.logger.exception('Error loading task details for task [%s]: %s' % (self.key, self.title))
             return None
 
         if task.status and task.status == OxTask.get_status('Done'):
             if self._archive is not None:
-                self.logger.debug(u'Moving completed task [%s] to archive [%s]' % (task.title, self._archive.title))
+                self.logger.debug(u'Moving completed task [%s] to archive [%s]', task.title, self._archive.title)
                 try:
                     self._ox.move_task(self.folder.id, self.key, self._archive)
                 except Exception as e:
@@ -172,7 +223,7 @@ class OxTaskSync(Sync, OxTasks):
                 Sync.delete(self, sid)
                 return
 
-        self.logger.debug(u'Deleting task [%s]: %s' % (task.id, task.title))
+        self.logger.debug(u'Deleting task [%s]: %s', task.id, task.title)
         try:
             self._ox.delete_task(self.folder.id, self.key)
         except Exception as e:
@@ -182,6 +233,11 @@ class OxTaskSync(Sync, OxTasks):
         Sync.delete(self, sid)
 
     def get(self):
+        task = self._prefetched()
+        if task is not None:
+            return task
+        if self._listed is not None and self.key in self._listed:
+            return self._listed[self.key]
         try:
             task = self._ox.get_task(self.folder.id, self._key)
         except Exception as e:
@@ -189,6 +245,51 @@ class OxTaskSync(Sync, OxTasks):
             return None
         return task
 
+    def get_many(self, ids):
+        """
+        Tasks of the listing with detail columns. Without them the first
+        batch of at least [bulk_threshold] ids loads the folder once with
+        the detail columns and the listed tasks serve the rest of the run,
+        unless the folder holds more than [bulk_ratio] (default 4) times
+        as many tasks as the batch requests.
+        """
+        if self._listed is None and len(ids) >= int(self.options.get('bulk_threshold', 20)) and \
+                (self._folder_size is None or self._folder_size <= float(self.options.get('bulk_ratio', 4)) * len(ids)):
+            try:
+                tasks = self._ox.get_tasks(self.folder.id, self.detail_columns)
+            except Exception as e:
+                self.logger.exception(u'Error loading task details of folder [%s]' % (self.folder.id))
+                return Sync.get_many(self, ids)
+            self._listed = dict((task.id, task) for task in tasks)
+            self.logger.debug(u'%s: Loaded details of %d tasks', self.class_name, len(self._listed))
+        if self._listed is not None:
+            found = dict((id, self._listed[id]) for id in ids if id in self._listed)
+            # tasks updated by this run are loaded again
+            missing = [id for id in ids if id not in found]
+            if missing:
+                found.update(Sync.get_many(self, missing))
+            return found
+        return Sync.get_many(self, ids)
+
+    def update_task(self, task, fields=None):
+        """
+        Write a task updated by a translator. With the [partial_update]
+        option only the changed fields are sent, columns omitted from an
+        update request are left untouched by the server.
+        """
+        if self._listed is not None:
+            # reloaded by later get() calls
+            self._listed.pop(task.id, None)
+        if fields and self.flag('partial_update'):
+            data = {'id': task.id, 'folder_id': task._data.get('folder_id', self.folder.id)}
+            for field in list(fields) + ['last_modified', 'full_time', 'notification']:
+                if field in task._data:
+                    data[field] = task._data[field]
+            self.logger.debug(u'Partial update of task [%s]: %s', task.id, sorted(fields))
+            OxTask(data, self._ox).update()
+            return task
+        return task.update()
+
     def create(self, other, sid=None):
         that = other.get()
         # other must provide 'title'
@@ -196,7 +297,7 @@ class OxTaskSync(Sync, OxTasks):
             title = utf8(that.title)
             data = {'folder_id': self.folder.id, 'title': title}
             task = OxTask(data, self._ox)
-            self.logger.debug(u'%s: Creating task [%s] from %s' % (self.class_name, title, other.class_name))
+            self.logger.debug(u'%s: Creating task [%s] from %s', self.class_name, title, other.class_name)
             try:
                 task = task.create()
             except Exception as e:
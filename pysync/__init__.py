@@ -9,15 +9,22 @@ PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
 from .core import PySync
 from .sync import Sync, SyncError, SyncSessionError, SyncInitError
 from .update import ThisFromThat
+from .aio import AsyncSync, AsyncPySync, SyncLoop
+from .memory import MemorySync, MemoryStore
+from .registry import register_translator, unregister_translator
 
-from ensync import EnClientSync, EvernoteFromOxTask, EvernoteFromToodledo
-from oxsync import OxTaskSync, OxTaskFromEvernote, OxTaskFromToodldo
-from tdsync import ToodledoSync, ToodledoFromOxTask, ToodledoFromEvernote
+from ensync import EnClientSync, EvernoteFromOxTask, EvernoteFromToodledo, EvernoteFromFile
+from oxsync import OxTaskSync, OxTaskFromEvernote, OxTaskFromToodldo, OxTaskFromFile
+from tdsync import ToodledoSync, ToodledoFromOxTask, ToodledoFromEvernote, ToodledoFromFile
+from fssync import FileSync, FileFromFile, FileFromOxTask, FileFromToodledo, FileFromEvernote
 
 __all__ = [
 
     'PySync', 'Sync', 'ThisFromThat', 'SyncError', 'SyncSessionError', 'SyncInitError',
-    'OxTaskSync', 'OxTaskFromEvernote', 'OxTaskFromToodldo',
-    'EnClientSync', 'EvernoteFromOxTask', 'EvernoteFromToodledo',
-    'ToodledoSync', 'ToodledoFromOxTask', 'ToodledoFromEvernote'
+    'AsyncSync', 'AsyncPySync', 'SyncLoop', 'MemorySync', 'MemoryStore',
+    'register_translator', 'unregister_translator',
+    'OxTaskSync', 'OxTaskFromEvernote', 'OxTaskFromToodldo', 'OxTaskFromFile',
+    'EnClientSync', 'EvernoteFromOxTask', 'EvernoteFromToodledo', 'EvernoteFromFile',
+    'ToodledoSync', 'ToodledoFromOxTask', 'ToodledoFromEvernote', 'ToodledoFromFile',
+    'FileSync', 'FileFromFile', 'FileFromOxTask', 'FileFromToodledo', 'FileFromEvernote'
 ]
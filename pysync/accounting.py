@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Remote call accounting for the engine sessions. With the relation option
+call_accounting (or --accounting) the objects returned by the session()
+methods of the engines are wrapped in a SessionProxy, which counts the
+calls of every public method and records their latency and approximate
+payload size (bytes of the strings in arguments and results). Objects
+returned by the session which keep a reference to it (e.g. an OxTask
+or EnBook) are rebound to the proxy, so that their calls are counted
+as well.
+
+Calls are attributed to the sid of the executing SyncTask. The report at
+the end of a run lists the calls per method and the sids with the most
+calls, and warns about sids exceeding sid_call_budget and runs exceeding
+call_budget. Lots of get calls for a single sid point to N+1 fetches.
+"""
+
+import os, sys, time, threading
+from contextlib import contextmanager
+
+_context = threading.local()
+
+
+def current_sid():
+    return getattr(_context, 'sid', None)
+
+
+@contextmanager
+def sid_scope(sid):
+    """
+    Attribute the calls of the current thread to sid
+    """
+    previous = getattr(_context, 'sid', None)
+    _context.sid = sid
+    try:
+        yield
+    finally:
+        _context.sid = previous
+
+
+def payload_size(value, depth=4, seen=None):
+    """
+    Approximate payload size: bytes of the strings in value
+    """
+    if isinstance(value, basestring):
+        return len(value)
+    if value is None or depth == 0 or isinstance(value, (bool, int, long, float, SessionProxy)):
+        return 0
+    seen = seen if seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, dict):
+        return sum(payload_size(k, depth - 1, seen) + payload_size(v, depth - 1, seen) for k, v in value.iteritems())
+    if isinstance(value, (list, tuple, set)):
+        return sum(payload_size(v, depth - 1, seen) for v in value)
+    if hasattr(value, '__dict__'):
+        return sum(payload_size(v, depth - 1, seen) for v in vars(value).itervalues())
+    return 0
+
+
+class CallAccounting(object):
+    """
+    Call counters, latencies and payload sizes of the sessions of a relation
+    """
+    def __init__(self, relation, metrics=None):
+
+        self._relation = relation
+        self._metrics = metrics
+        self._lock = threading.Lock()
+        # (engine, method) => [calls, seconds, bytes, errors]
+        self._calls = {}
+        # sid => calls
+        self._sids = {}
+
+    @property
+    def calls(self): return sum(stats[0] for stats in self._calls.values())
+
+    def wrap(self, session, engine, nested=None):
+        """
+        SessionProxy of a session object for the engine label. Attributes
+        in nested return proxies as well (e.g. the Evernote note_store).
+        """
+        return SessionProxy(session, self, engine, nested)
+
+    def record(self, engine, method, seconds, size, error=False):
+
+        sid = current_sid()
+        with self._lock:
+            stats = self._calls.setdefault((engine, method), [0, 0.0, 0, 0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] += size
+            stats[3] += 1 if error else 0
+            self._sids[sid] = self._sids.get(sid, 0) + 1
+
+        if self._metrics is not None:
+            self._metrics.count('api_calls', engine=engine, method=method)
+            self._metrics.count('api_payload_bytes', size, engine=engine, method=method)
+            if error:
+                self._metrics.count('api_errors', engine=engine, method=method)
+            self._metrics.observe('api_call_seconds', seconds, engine=engine, method=method)
+
+    def sid_calls(self, sid):
+        return self._sids.get(sid, 0)
+
+    def report(self, logger, budget=None, sid_budget=None, top=10):
+        """
+        Log the calls per method and the sids with the most calls, returns
+        the sids exceeding sid_budget
+        """
+        logger.info(u'%s: %d remote calls' % (self._relation, self.calls))
+        for (engine, method), (calls, seconds, size, errors) in sorted(self._calls.items()):
+            logger.info(u'%s: %s.%s %d calls %.3fs (avg %.1fms) %d bytes %d errors' %
+                        (self._relation, engine, method, calls, seconds, seconds * 1000.0 / calls, size, errors))
+
+        sids = sorted([(calls, sid) for sid, calls in self._sids.items() if sid is not None], reverse=True)
+        if sids:
+            logger.info(u'%s: %d calls outside of items, %d items with %.1f calls on average, most calls: %s' %
+                        (self._relation, self._sids.get(None, 0), len(sids),
+                         sum(calls for calls, sid in sids) / float(len(sids)),
+                         u', '.join(u'%s=%d' % (sid, calls) for calls, sid in sids[:top])))
+
+        if budget is not None and self.calls > int(budget):
+            logger.warning(u'%s: %d remote calls exceed the call budget of %d' % (self._relation, self.calls, int(budget)))
+
+        exceeded = []
+        if sid_budget is not None:
+            exceeded = [sid for calls, sid in sids if calls > int(sid_budget)]
+            if exceeded:
+                logger.warning(u'%s: %d items exceed the budget of %d calls per item: %s' %
+                               (self._relation, len(exceeded), int(sid_budget), u', '.join(exceeded[:top])))
+        return exceeded
+
+
+class SessionProxy(object):
+    """
+    Transparent wrapper of a session object: public methods are timed and
+    counted, isinstance() checks see the class of the wrapped object
+    """
+    def __init__(self, target, accounting, engine, nested=None, root=None):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_accounting', accounting)
+        object.__setattr__(self, '_engine', engine)
+        object.__setattr__(self, '_nested', dict((name, None) for name in (nested or [])))
+        object.__setattr__(self, '_root', root if root is not None else self)
+
+    @property
+    def __class__(self):
+        return self._target.__class__
+
+    def _proxy_of(self, value):
+        # proxy of the session object or of one of its nested services
+        root = self._root
+        if value is root._target:
+            return root
+        if value is self._target:
+            return self
+        for name in root._nested:
+            if value is getattr(root._target, name, None):
+                return getattr(root, name)
+        return None
+
+    def _adopt(self, value):
+        """
+        Rebind the session references of returned objects to the proxies
+        """
+        if isinstance(value, (list, tuple)):
+            for item in value:
+                self._adopt(item)
+        elif hasattr(value, '__dict__') and not isinstance(value, (type, SessionProxy)):
+            for name, attribute in vars(value).items():
+                if isinstance(attribute, SessionProxy) or attribute is None:
+                    continue
+                proxy = self._proxy_of(attribute)
+                if proxy is not None:
+                    vars(value)[name] = proxy
+        return value
+
+    def _call(self, name, method):
+        accounting, engine = self._accounting, self._engine
+
+        def call(*args, **kwargs):
+            start = time.time()
+            error = True
+            result = None
+            try:
+                result = self._adopt(method(*args, **kwargs))
+                error = False
+                return result
+            finally:
+                accounting.record(engine, name, time.time() - start,
+                                  payload_size(args) + payload_size(kwargs) + payload_size(result), error)
+
+        call.__name__ = name
+        return call
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name.startswith('_'):
+            return value
+        if name in self._nested:
+            if self._nested[name] is None or self._nested[name]._target is not value:
+                self._nested[name] = SessionProxy(value, self._accounting, u'%s.%s' % (self._engine, name),
+                                                  root=self._root)
+            return self._nested[name]
+        if callable(value) and not isinstance(value, type):
+            return self._call(name, value)
+        return value
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __delattr__(self, name):
+        delattr(self._target, name)
+
+    def __nonzero__(self):
+        return bool(self._target)
+
+    def __len__(self):
+        return len(self._target)
+
+    def __iter__(self):
+        return iter(self._target)
+
+    def __getitem__(self, key):
+        return self._target[key]
+
+    def __contains__(self, key):
+        return key in self._target
+
+    def __repr__(self):
+        return repr(self._target)
+
+    def __str__(self):
+        return str(self._target)
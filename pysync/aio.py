@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Non-blocking engine protocol: AsyncSync methods return futures instead
+of results, and a SyncLoop multiplexes the listings and per-item calls
+of many relations on one bounded thread pool.
+
+asyncio is not available for the Python 2.7 runtime of PySync, so the
+futures are multiprocessing AsyncResult objects (ready(), wait(), get())
+and blocking Sync engines are driven through the SyncAdapter.
+
+With the --loop option main() runs all relations of the invocation as
+AsyncPySync on one shared SyncLoop. Checkpoints, prefetching and batch
+operations are features of the blocking PySync.execute() and are not
+used on this path (an interrupted run is resumed by PySync.resume()).
+"""
+
+import os, sys, time, logging, threading
+from pyutils import LogAdapter, get_logger
+
+from abc import ABCMeta, abstractmethod
+
+from .core import PySync
+from .executor import SyncExecutor, SyncTask
+
+
+class SyncLoop(SyncExecutor):
+    """
+    Shared pool for the engine calls of many relations. Each registered
+    engine is limited to its [workers] concurrent calls.
+    """
+    def __init__(self, size=8, logger=None):
+
+        from multiprocessing.pool import ThreadPool
+
+        SyncExecutor.__init__(self, [], logger)
+        self._size = size
+        self._pool = ThreadPool(size)
+        self._register = threading.Lock()
+
+    def register(self, engine):
+        with self._register:
+            if engine not in self._semaphores:
+                self._engines.append(engine)
+                self._semaphores[engine] = threading.BoundedSemaphore(max(engine.workers, 1))
+        return engine
+
+    def _submitted(self, task):
+        ok, result = self._call(task)
+        if not ok:
+            raise result[0], result[1], result[2]
+        return result
+
+    def submit(self, task):
+        """
+        Start a SyncTask, returns a future with the task's result
+        """
+        for engine in task.engines:
+            self.register(engine)
+        return self._pool.apply_async(self._submitted, (task,))
+
+    def run(self, relations):
+        """
+        Process AsyncPySync relations concurrently: all listings first,
+        then planning and finally all planned operations. Returns the
+        new sync maps (None for failed relations) in relation order.
+        """
+        listed = []
+        for relation in relations:
+            try:
+                listed.append(relation.list_async())
+            except Exception as e:
+                relation.logger.exception('Listing failed!')
+                listed.append(None)
+
+        pending = []
+        for relation, listing in zip(relations, listed):
+            try:
+                if listing is None:
+                    raise ValueError('listing failed')
+                for future in listing:
+                    future.get()
+                pending.append(relation.submit(relation._plan()))
+            except Exception as e:
+                relation.logger.exception('Planning failed!')
+                pending.append(None)
+
+        results = []
+        for relation, futures in zip(relations, pending):
+            try:
+                results.append(relation.collect(futures) if futures is not None else None)
+            except Exception as e:
+                relation.logger.exception('Processing failed!')
+                results.append(None)
+
+        return results
+
+
+class AsyncSync(object):
+    """
+    Engine contract with future based listing and item methods. Item
+    positions are passed explicitly instead of the blocking engine's
+    cursor. map_item() and the listed items are local and synchronous.
+    """
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def sync_map(self, last=None, since=None): return None
+
+    @abstractmethod
+    def get(self, id): return None
+
+    @abstractmethod
+    def create(self, other, id, sid=None): return None
+
+    @abstractmethod
+    def update(self, other, id, other_id, sid=None): return None
+
+    @abstractmethod
+    def delete(self, id, sid=None): return None
+
+
+class SyncAdapter(AsyncSync):
+    """
+    Run a blocking Sync engine on the threads of a SyncLoop
+    """
+    def __init__(self, engine, loop):
+        self._engine = loop.register(engine)
+        self._loop = loop
+
+    def __getattr__(self, name):
+        return getattr(self._engine, name)
+
+    def __repr__(self): return repr(self._engine)
+
+    @property
+    def engine(self): return self._engine
+
+    def sync_map(self, last=None, since=None):
+        kwargs = {'last': last}
+        if since is not None:
+            kwargs['since'] = since
+        return self._loop.submit(SyncTask(None, None, self._engine.sync_map, kwargs=kwargs,
+                                          engines=[self._engine]))
+
+    def get(self, id):
+        return self._loop.submit(SyncTask(None, None, self._engine.get,
+                                          cursors=[(self._engine, id)]))
+
+    def create(self, other, id, sid=None):
+        other = getattr(other, 'engine', other)
+        return self._loop.submit(SyncTask(sid, None, self._engine.create, (other, sid),
+                                          cursors=[(other, id)], engines=[self._engine, other]))
+
+    def update(self, other, id, other_id, sid=None):
+        other = getattr(other, 'engine', other)
+        return self._loop.submit(SyncTask(sid, None, self._engine.update, (other,), {'sid': sid},
+                                          cursors=[(self._engine, id), (other, other_id)]))
+
+    def delete(self, id, sid=None):
+        return self._loop.submit(SyncTask(sid, None, self._engine.delete, (sid,),
+                                          cursors=[(self._engine, id)]))
+
+
+class AsyncPySync(PySync):
+    """
+    PySync driven by AsyncSync engines on a (shared) SyncLoop: both
+    listings run concurrently and all planned operations are in flight
+    at the same time, bounded by the engines' [workers] limits. Batch
+    methods are not used on this path.
+    """
+    def __init__(self, left=None, right=None, opts=None, logger=None, loop=None):
+
+        PySync.__init__(self, left, right, opts, logger)
+
+        self._loop = loop
+        self._own_loop = loop is None
+        if self._own_loop:
+            self._loop = SyncLoop(max(left.workers + right.workers, 2), logger)
+
+        self._async = {}
+        for lr, engine in [('left', left), ('right', right)]:
+            self._async[lr] = engine if isinstance(engine, AsyncSync) else SyncAdapter(engine, self._loop)
+
+    def list_async(self):
+        return [self._async[lr].sync_map(**self.listing_args(lr)) for lr in ['left', 'right']]
+
+    def plan(self):
+        for future in self.list_async():
+            future.get()
+        return self._plan()
+
+    def submit(self, plan):
+        """
+        Start all write operations of the plan, returns the pending futures
+        """
+        self._begin(plan)
+
+        pending = []
+        for operation in plan:
+
+            op, sid, lr = operation['op'], operation['sid'], operation['lr']
+
+            if op in ['match', 'keep']:
+                self._add_item(sid, 'left', self._left.map_item(operation['id']))
+                self._add_item(sid, 'right', self._right.map_item(operation['source']))
+                continue
+
+            engine = self._async[lr]
+            other = self._async[self.reverse_map[lr]]
+
+            if op == 'delete':
+                pending.append((sid, None, None, engine.delete(operation['id'], sid)))
+                continue
+
+            self._add_item(sid, self.reverse_map[lr], other.map_item(operation['source']))
+            if op == 'create':
+                future = engine.create(other, operation['source'], sid)
+            else:
+                future = engine.update(other, operation['id'], operation['source'], sid)
+            pending.append((sid, lr, operation['source'], future))
+
+        return pending, plan
+
+    def collect(self, pending):
+        """
+        Wait for the submitted operations and build the new sync map in
+        plan order. The first failure is re-raised after all results have
+        been recorded.
+        """
+        pending, plan = pending
+        error = None
+        for sid, lr, source, future in pending:
+            try:
+                item = future.get()
+            except Exception as e:
+                if error is None:
+                    error = sys.exc_info()
+                continue
+            if lr is not None:
+                other = self.reverse_map[lr]
+                self._add_item(sid, lr, item)
+                self._add_digest(sid, other, getattr(self._async[other], '_digests', {}).get(source))
+            self._commit()
+        if error is not None:
+            raise error[0], error[1], error[2]
+        return self._finish(plan)
+
+    def process(self):
+        try:
+            return self.collect(self.submit(self.plan()))
+        finally:
+            if self._own_loop:
+                self._loop.close()
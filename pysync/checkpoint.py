@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, sys, json, logging
+
+from pysync.records import SyncEntry, to_layout
+
+
+class Checkpoint(object):
+    """
+    Journal of a running sync: the first line holds the plan, each
+    following line the completed operations of a task and the resulting
+    sync map entries. Lines are flushed as written and synced to disk
+    every [interval] tasks. An incomplete last line is ignored on load and
+    cut off before a resumed run appends to the journal.
+    """
+    def __init__(self, path, interval=50):
+        self._path = path
+        self._interval = max(int(interval), 1)
+        self._fp = None
+        self._pending = 0
+
+    @property
+    def path(self): return self._path
+
+    @staticmethod
+    def op_key(operation):
+        # strict unidirectional deletes have no sid
+        if operation['sid'] is not None:
+            return operation['sid']
+        return u'%s:%s:%s' % (operation['op'], operation['lr'], operation['id'])
+
+    def _write(self, data):
+        self._fp.write(json.dumps(data, ensure_ascii=True, default=to_layout) + '\n')
+        self._fp.flush()
+        self._pending += 1
+        if self._pending >= self._interval:
+            self.sync()
+
+    def sync(self):
+        if self._fp is not None and self._pending:
+            os.fsync(self._fp.fileno())
+            self._pending = 0
+
+    @staticmethod
+    def exists(path):
+        """
+        True if path holds the journal of an interrupted run
+        """
+        try:
+            with open(path, 'rb') as fp:
+                json.loads(fp.readline())
+            return True
+        except (IOError, ValueError):
+            return False
+
+    def start(self, plan):
+        # the journal of an interrupted run is never overwritten
+        if Checkpoint.exists(self._path):
+            raise IOError(u'Checkpoint %s of an interrupted run exists' % (self._path))
+        self._fp = open(self._path, 'wb')
+        self._write({'plan': plan.to_dict()})
+        self.sync()
+
+    def resume(self):
+        self._fp = open(self._path, 'r+b')
+        self._fp.seek(0, os.SEEK_END)
+        end = size = self._fp.tell()
+        # truncate to the last complete line
+        while size > 0:
+            step = min(size, 4096)
+            self._fp.seek(size - step)
+            pos = self._fp.read(step).rfind('\n')
+            if pos >= 0:
+                size += pos + 1 - step
+                break
+            size -= step
+        if size < end:
+            self._fp.truncate(size)
+        self._fp.seek(size)
+
+    def done(self, operations, entries):
+        self._write({'done': [Checkpoint.op_key(operation) for operation in operations], 'entries': entries})
+
+    def close(self):
+        if self._fp is not None:
+            self.sync()
+            self._fp.close()
+            self._fp = None
+
+    def remove(self):
+        self.close()
+        if os.path.isfile(self._path):
+            os.remove(self._path)
+
+    @staticmethod
+    def load(path):
+        """
+        Returns (header, completed operation keys, entries by sid)
+        """
+        header, done, entries = None, set(), {}
+        with open(path, 'rb') as fp:
+            for line in fp:
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    if header is None:
+                        break
+                    # interrupted write
+                    continue
+                if header is None:
+                    header = data
+                    continue
+                done.update(data['done'])
+                entries.update((sid, SyncEntry.of(entry)) for sid, entry in data['entries'].iteritems())
+        if header is None:
+            raise ValueError(u'Empty checkpoint %s' % (path))
+        return header, done, entries
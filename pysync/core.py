@@ -4,11 +4,16 @@
 from __future__ import absolute_import
 from __future__ import print_function
 
-import os, sys, uuid, logging, logging.config, json, codecs, time, pyutils
+import os, sys, uuid, logging, logging.config, json, codecs, time, shutil, pyutils
 
 # sys.path = ['/usr/local/lib/python2.7/dist-packages'] + sys.path
 from pyutils import Options, LogAdapter, strflocal, get_logger, log_level
 
+from pysync import mapfile
+from pysync.records import SyncEntry, SyncItem
+from pysync.log import SyncLogger
+from pysync.metrics import Metrics
+
 # sync engine declarations
 
 class PySync(object):
@@ -20,15 +25,26 @@ class PySync(object):
         else:
             self._logger = logger
 
-        self._adapter = LogAdapter(self._logger, {'package': 'pysync'})
+        self._adapter = SyncLogger(self._logger, 'pysync', opts.get('log_sample'))
 
-        self.logger.debug(u'Initalizing PySync with %s and %s ...' % (left, right))
+        self.logger.debug(u'Initalizing PySync with %s and %s ...', left, right)
 
         self._opts = opts
         self._left = left
         self._right = right
         self._sync = opts['sync']
+        self._listing = {}
         self._new_sync = None
+        self._executor = None
+        self._checkpoint = None
+        # SyncStore of relations with map_store=sqlite
+        self._store = opts.get('store')
+
+        # phase timers and task histograms of the relation run
+        self._metrics = opts.get('metrics') or Metrics()
+        for engine in [left, right]:
+            if engine is not None:
+                engine.metrics = self._metrics
 
     @property
     def reverse_map(self): return {'left': 'right', 'right': 'left'}
@@ -82,21 +98,27 @@ class PySync(object):
 
         sync = self.sync if self._new_sync is None else self._new_sync
 
-        if sid not in sync:
-            sync[sid] = {}
+        # stored entries are copies: always write back
+        entry = sync.get(sid) or SyncEntry()
 
         if item is not None:
 
-            key = item.get('key')
+            item = SyncItem.of(item)
 
-            if key is not None:
-                if 'key' not in sync[sid]:
-                    sync[sid]['key'] = key
-                del(item['key'])
+            if item.key is not None:
+                if entry.key is None:
+                    entry.key = item.key
+                # don't modify the engine's item
+                item = item.copy(key=None)
 
-        sync[sid][lr] = item
+        entry[lr] = item
+        sync[sid] = entry
         #self.logger.debug(u'%s: %-5s %s %s' % (sid, lr, key, item))
 
+    def _commit(self):
+        if self._store is not None:
+            self._store.commit()
+
     def update(self, update):
 
         if update.lower() in self.reverse_map:
@@ -109,14 +131,19 @@ class PySync(object):
         if left_right:
 
             engine = self._opts[self.reverse_map.get(left_right)]
-            self.logger.debug(u'Running update for %s on the %s side ...' % (engine, self.reverse_map.get(left_right)))
+            self.logger.debug(u'Running update for %s on the %s side ...', engine, self.reverse_map.get(left_right))
+
+            if self._store is not None:
+                count = self._store.force_update(left_right)
+                self.logger.debug(u'Forced update of %d items at %s', count, engine)
+                return self._sync
 
             for sid in self._sync['map']:
 
                 id = self._sync['map'][sid][left_right]['id']
 
-                self.logger.debug(u'%s: Force update of [%s] at %s' % (id, self._sync['map'][sid]['key'], engine))
-                self.logger.debug(u'%s: %s' % (id, self._sync['map'][sid][left_right]))
+                self.logger.debug(u'%s: Force update of [%s] at %s', id, self._sync['map'][sid]['key'], engine)
+                self.logger.debug(u'%s: %s', id, self._sync['map'][sid][left_right])
 
                 self._sync['map'][sid][left_right]['time'] = 0L
 
@@ -138,7 +165,7 @@ class PySync(object):
         if left_right:
 
             engine = self._opts[left_right]
-            self.logger.debug(u'Running reset for %s on the %s side ...' % (engine, left_right))
+            self.logger.debug(u'Running reset for %s on the %s side ...', engine, left_right)
 
             if left_right == 'left':
                 sync = self._left
@@ -150,16 +177,18 @@ class PySync(object):
             for sid in self._sync['map']:
 
                 id = self._sync['map'][sid][left_right]['id']
-                self.logger.debug(u'%s: Found [%s] at %s in sync map' % (id, self._sync['map'][sid]['key'], engine))
+                self.logger.debug(u'%s: Found [%s] at %s in sync map', id, self._sync['map'][sid]['key'], engine)
 
                 if id in sync:
                     # item exists
                     item = sync[id]
-                    # self.logger.debug(u'%s: Item deleted at %s' % (id, sync))
+                    # self.logger.debug(u'%s: Item deleted at %s', id, sync)
                     sync.delete(sid)
                 else:
-                    self.logger.debug(u'%s: Skip missing item at %s' % (id, sync))
+                    self.logger.debug(u'%s: Skip missing item at %s', id, sync)
 
+            if self._store is not None:
+                self._store.clear()
             self._sync['map'] = None
 
         else:
@@ -169,6 +198,8 @@ class PySync(object):
         return self._sync
 
     def last_map(self, left_right):
+        if self._store is not None:
+            return self._store.last_map(left_right)
         if self._sync.get('map'):
             last_map = {}
             for sid in self._sync['map']:
@@ -177,178 +208,488 @@ class PySync(object):
             return last_map
         return None
 
-    def process(self):
+    def listing_args(self, lr):
+        """
+        Keyword arguments for the sync_map() listing of the lr engine
+        """
+        engine = self._left if lr == 'left' else self._right
+        args = {'last': self.last_map(lr) if engine.need_last_map else None}
+
+        # watermark of the next run, stored only when this run completes
+        now = int(time.time() * 1000)
+        self._listing[lr] = now
+
+        if self.sync is not None and engine.incremental_listing and not self._opts.get('full_listing'):
+            # list changes since the listing of the last completed run, with
+            # a full listing at least every [full_listing] hours
+            full = self._sync.get('full', {}).get(lr, 0)
+            listed = (self._sync.get('listed') or {}).get(lr)
+            if listed and now - full < float(engine.options.get('full_listing', 24)) * 3600000:
+                overlap = int(engine.options.get('incremental_overlap', 300)) * 1000
+                args['since'] = listed - overlap
+                self.logger.debug(u'Listing changes at %s since %s', engine, strflocal(args['since']))
+
+        return args
+
+    def _listed(self):
+        """
+        Restore unchanged items of incremental listings from the sync map
+        """
+        now = int(time.time() * 1000)
+        for lr, engine in [('left', self._left), ('right', self._right)]:
+            if engine.incremental:
+                if self.sync:
+                    items = []
+                    for sid, entry in self.sync.iteritems():
+                        if entry.get(lr):
+                            items.append(SyncItem.of(entry[lr]).copy(key=entry.get('key')))
+                    engine.restore(items)
+            else:
+                self._sync.setdefault('full', {})[lr] = now
+
+    def plan(self):
+        """
+        Compare the engine listings with the sync map and return the
+        resulting SyncPlan without modifying any backend
+        """
+        with self._metrics.phase('listing_left'):
+            left_map = self._left.sync_map(**self.listing_args('left'))
+        with self._metrics.phase('listing_right'):
+            right_map = self._right.sync_map(**self.listing_args('right'))
+
+        with self._metrics.phase('diff'):
+            return self._plan()
+
+    @property
+    def checkpoint_file(self):
+        if self._opts.get('map') and self._opts.get('checkpoint', True) not in [False, 'false', 'off', 'no', '0']:
+            return os.path.splitext(os.path.expanduser(self._opts['map']))[0] + '.ckp'
+        return None
+
+    def resume(self):
+        """
+        Continue an interrupted run: the listings are reloaded and the
+        operations of the checkpointed plan not yet completed are executed
+        """
+        from pysync.plan import SyncPlan
+        from pysync.checkpoint import Checkpoint
+
+        header, done, entries = Checkpoint.load(self.checkpoint_file)
+        plan = SyncPlan.from_dict(header['plan'])
+        self.logger.info(u'Resuming %s sync: %d of %d operations completed' %
+                         ('initial' if plan.initial else 'incremental', len(done), len(plan)))
+
+        with self._metrics.phase('listing_left'):
+            self._left.sync_map(**self.listing_args('left'))
+        with self._metrics.phase('listing_right'):
+            self._right.sync_map(**self.listing_args('right'))
+        self._listed()
+
+        return self.execute(plan, (done, entries))
+
+    def _unchanged(self, sid, engine, id, sync):
+        """
+        Compare the content fingerprint of a changed item with the sync map
+        """
+        if sync.get('digest') is None or not engine.fetch_digests:
+            return False
+        if engine.digest(id) == sync['digest']:
+            self.logger.item(sid, u'%s: Timestamp changed at %s but content unchanged', sid, engine)
+            engine._count('unchanged')
+            # no get() follows: release the item loaded for the fingerprint
+            engine._fetched.pop(id, None)
+            return True
+        return False
+
+    def _plan(self):
+
+        from pysync.plan import SyncPlan
 
         left = self._left
         right = self._right
 
-        left_last = self.last_map('left') if left.need_last_map else None
-        right_last = self.last_map('right') if right.need_last_map else None
-
-        left_map = left.sync_map(last=left_last)
-        right_map = right.sync_map(last=right_last)
+        self._listed()
 
         if self.sync is None:
             """
             Initial sync: create sync_map
             """
+            plan = SyncPlan(True, self.direction, listed=dict(self._listing))
             found = {}
-            self.sync = {}
-            self._new_sync = None
 
-            self.logger.debug(u'Initalizing [%s] sync map ...' % (self.direction))
-            self.logger.debug(u'Checking left side: %s' % (self.left))
+            self.logger.debug(u'Initalizing [%s] sync map ...', self.direction)
+            self.logger.debug(u'Checking left side: %s', self.left)
             for key in left:
 
                 sid = str(uuid.uuid1())
-                self._add_item(sid, 'left', left.map_item(key))
 
                 # find items by key
                 guid = right.find_key(left[key]['key'])
                 if guid:
                     found[guid] = True
-                    self.logger.debug(u'Found matching item [%s] at %s' % (left[key]['key'], self.right))
-                    self._add_item(sid, 'right', right.map_item(guid))
+                    self.logger.debug(u'Found matching item [%s] at %s', left[key]['key'], self.right)
+                    plan.add('match', sid, None, key, guid)
                 else:
                     # create missing item on right side
-                    self.logger.debug(u'Create missing item [%s] at %s' % (left[key]['key'], self.right))
-                    item = right.create(left, sid)
-                    self._add_item(sid, 'right', item)
+                    self.logger.debug(u'Create missing item [%s] at %s', left[key]['key'], self.right)
+                    plan.add('create', sid, 'right', None, key)
 
             if self.bidirectional:
 
-                self.logger.debug(u'Checking right side: %s' % (self.right))
+                self.logger.debug(u'Checking right side: %s', self.right)
                 for key in right:
 
                     if key not in found:
                         # new key on the right side
                         sid = str(uuid.uuid1())
-                        self.logger.debug(u'Create missing item [%s] at %s' % (right[key]['key'], self.left))
-                        self._add_item(sid, 'right', right.map_item(key))
-                        item = left.create(right, sid)
-                        self._add_item(sid, 'left', item)
-
-            # return self._sync
+                        self.logger.debug(u'Create missing item [%s] at %s', right[key]['key'], self.left)
+                        plan.add('create', sid, 'left', None, key)
 
-        else:
-            """
-            Update existing sync map
-            """
-            self._new_sync = {}
+            return plan
 
-            self.logger.debug(u'Processing [%s] sync map ...' % (self.direction))
+        """
+        Update existing sync map
+        """
+        plan = SyncPlan(False, self.direction, listed=dict(self._listing))
+        processed = {'left': set(), 'right': set()}
 
-            for sid in self.sync:
+        self.logger.debug(u'Processing [%s] sync map ...', self.direction)
 
-                lid = self.sync[sid]['left']['id']
-                rid = self.sync[sid]['right']['id']
+        for sid, entry in self.sync.iteritems():
 
-                self.logger.debug(u'%s: %s' % (sid, self.sync[sid]['key']) )
-                self.logger.debug(u'%s: %s %s' % (sid, self._left, self.sync[sid]['left']))
-                self.logger.debug(u'%s: %s %s' % (sid, self._right, self.sync[sid]['right']))
+            lid = entry['left']['id']
+            rid = entry['right']['id']
 
-                if lid in left:
-                    # left item exitst
-                    litem = left[lid]
-                else:
-                    # item deleted on left side
-                    # => delete right item
-                    if rid in right:
-                        self.logger.debug(u'%s: Item deleted at %s' % (sid, self.left))
-                        right.delete(sid)
-                    continue
+            self.logger.item(sid, u'%s: %s', sid, entry['key'])
+            self.logger.item(sid, u'%s: %s %s', sid, self._left, entry['left'])
+            self.logger.item(sid, u'%s: %s %s', sid, self._right, entry['right'])
 
+            if lid in left:
+                # left item exitst
+                litem = left[lid]
+            else:
+                # item deleted on left side
+                # => delete right item
                 if rid in right:
-                    # right item exitst
-                    ritem = right[rid]
+                    self.logger.item(sid, u'%s: Item deleted at %s', sid, self.left)
+                    plan.add('delete', sid, 'right', rid)
+                    processed['right'].add(rid)
+                continue
+
+            if rid in right:
+                # right item exitst
+                ritem = right[rid]
+            else:
+                if self.bidirectional:
+                    # item deleted on right side
+                    # => delete left item
+                    if lid in left:
+                        self.logger.item(sid, u'%s: Item deleted at %s', sid, self.right)
+                        plan.add('delete', sid, 'left', lid)
+                        processed['left'].add(lid)
+                continue
+
+            # both items exists: compare and update sync map
+            # ltime =  self.sync[sid]['left']['time']
+            # rtime =  self.sync[sid]['right']['time']
+
+            lsync = entry['left']
+            rsync = entry['right']
+
+            lchanged = left.changed(lsync) and not self._unchanged(sid, left, lid, lsync)
+            rchanged = right.changed(rsync) and not self._unchanged(sid, right, rid, rsync)
+
+            if lchanged:
+                self.logger.item(sid, u'%s: Item changed at left %s', sid, self.left)
+                if rchanged:
+                    self.logger.item(sid, u'%s: Item also changed at right %s', sid, self.right)
+                    if litem['time'] < ritem['time']:
+                        self.logger.item(sid, u'%s: Item newer at right %s ', sid, self.right)
+                        if self.bidirectional:
+                            self.logger.item(sid, u'%s: Updating left item at %s', sid, self.left)
+                            plan.add('update', sid, 'left', lid, rid)
+                        else:
+                            self.logger.item(sid, u'%s: Undo changes for right item at %s', sid, self.right)
+                            plan.add('undo', sid, 'right', rid, lid)
+                    else:
+                        self.logger.item(sid, u'%s: Item newer at left %s ', sid, self.left)
+                        self.logger.item(sid, u'%s: Updating right item at %s', sid, self.right)
+                        plan.add('update', sid, 'right', rid, lid)
                 else:
+                    self.logger.item(sid, u'%s: Updating right item at %s', sid, self.right)
+                    plan.add('update', sid, 'right', rid, lid)
+            else:
+                if rchanged:
+                    self.logger.item(sid, u'%s: Item changed at right %s', sid, self.right)
                     if self.bidirectional:
-                        # item deleted on right side
-                        # => delete left item
-                        if lid in left:
-                            self.logger.debug(u'%s: Item deleted at %s' % (sid, self.right))
-                            left.delete(sid)
-                    continue
-
-                # both items exists: compare and update sync map
-                # ltime =  self.sync[sid]['left']['time']
-                # rtime =  self.sync[sid]['right']['time']
-
-                lsync = self.sync[sid]['left']
-                rsync = self.sync[sid]['right']
-
-                if left.changed(lsync):
-                    self.logger.debug(u'%s: Item changed at left %s' % (sid, self.left))
-                    if right.changed(rsync):
-                        self.logger.debug(u'%s: Item also changed at right %s' % (sid, self.right))
-                        if litem['time'] < ritem['time']:
-                            self.logger.debug(u'%s: Item newer at right %s ' % (sid, self.right))
-                            if self.bidirectional:
-                                self.logger.debug(u'%s: Updating left item at %s' % (sid, self.left))
-                                litem = left.update(right, sid=sid)
-                            else:
-                                self.logger.debug(u'%s: Undo changes for right item at %s' % (sid, self.right))
-                                ritem = right.update(left, sid=sid)
-                        else:
-                            self.logger.debug(u'%s: Item newer at left %s ' % (sid, self.left))
-                            self.logger.debug(u'%s: Updating right item at %s' % (sid, self.right))
-                            ritem  = right.update(left, sid=sid)
+                        self.logger.item(sid, u'%s: Updating left item at %s', sid, self.left)
+                        plan.add('update', sid, 'left', lid, rid)
                     else:
-                        self.logger.debug(u'%s: Updating right item at %s' % (sid, self.right))
-                        ritem = right.update(left, sid=sid)
+                        self.logger.item(sid, u'%s: Undo changes for right item at %s', sid, self.right)
+                        plan.add('undo', sid, 'right', rid, lid)
                 else:
-                    if right.changed(rsync):
-                        self.logger.debug(u'%s: Item changed at right %s' % (sid, self.right))
-                        if self.bidirectional:
-                            self.logger.debug(u'%s: Updating left item at %s' % (sid, self.left))
-                            litem = left.update(right, sid=sid)
-                        else:
-                            self.logger.debug(u'%s: Undo changes for right item at %s' % (sid, self.right))
-                            ritem = right.update(left, sid=sid)
+                    plan.add('keep', sid, None, lid, rid)
 
-                self._add_item(sid, 'left', litem)
-                self._add_item(sid, 'right', ritem)
+            processed['left'].add(lid)
+            processed['right'].add(rid)
 
-                del left[lid]
-                del right[rid]
+        self.logger.debug(u'Checking for new items at %s', self.left)
+        for key in left:
+            # new items on the left side
+            if key not in processed['left']:
+                plan.add('create', str(uuid.uuid1()), 'right', None, key)
 
-            self.logger.debug(u'Checking for new items at %s' % (self.left))
-            for key in left:
-                # new items on the left side
-                sid = str(uuid.uuid1())
-                ritem = right.create(left, sid)
+        self.logger.debug(u'Checking for new items at %s', self.right)
+        for key in right:
+            # new items on the right side
+            if key not in processed['right']:
+                if self.bidirectional:
+                    plan.add('create', str(uuid.uuid1()), 'left', None, key)
+                else:
+                    if self.unidirectional_strict:
+                        self.logger.debug(u'Deleting new item at right because of unidirectional strict: %s', right)
+                        plan.add('delete', None, 'right', key)
+                    else:
+                        self.logger.debug(u'Ignoring new item at right because auf unidirectional merge: %s', right)
 
-                self._add_item(sid, 'left', left.map_item())
-                self._add_item(sid, 'right', ritem)
+        return plan
 
-                self.logger.debug(u'%s: [%s]' % (sid, self._new_sync[sid]['key']) )
-                self.logger.debug(u'%s: %s %s' % (sid, self.left, self._new_sync[sid]['left']))
-                self.logger.debug(u'%s: %s %s' % (sid, self.right, self._new_sync[sid]['right']))
+    def _apply(self, task, result):
 
-            self.logger.debug(u'Checking for new items at %s' % (self.right))
-            for key in right:
-                # new items on the right side
-                if self.bidirectional:
-                    sid = str(uuid.uuid1())
-                    litem = left.create(right, sid)
+        if task.lr is not None:
+            other = self.reverse_map[task.lr]
+            engine = self._left if other == 'left' else self._right
+            for (sid, item), source in zip(task.results(result), task.sources):
+                self._add_item(sid, task.lr, item)
+                self.logger.item(sid, u'%s: %s %s', sid, self.left if task.lr == 'left' else self.right, item)
+                # fingerprint of the source item loaded by the translator
+                self._add_digest(sid, other, engine._digests.get(source))
+        # outcome of the sid(s) is final
+        self._commit()
 
-                    self._add_item(sid, 'right', right.map_item())
-                    self._add_item(sid, 'left', litem)
+    def _add_digest(self, sid, lr, digest):
 
-                    self.logger.debug(u'%s: [%s]' % (sid, self._new_sync[sid]['key']) )
-                    self.logger.debug(u'%s: %s %s' % (sid, self.left, self._new_sync[sid]['left']))
-                    self.logger.debug(u'%s: %s %s' % (sid, self.right, self._new_sync[sid]['right']))
-                else:
-                    if self.unidirectional_strict:
-                        self.logger.debug(u'Deleting new item at right because of unidirectional strict: %s' % (right))
-                        right.delete(None)
-                    else:
-                        self.logger.debug(u'Ignoring new item at right because auf unidirectional merge: %s' % (right))
+        sync = self.sync if self._new_sync is None else self._new_sync
+        entry = sync.get(sid) if digest is not None else None
+        if entry and entry.get(lr):
+            entry[lr]['digest'] = digest
+            sync[sid] = entry
+
+    @property
+    def prefetch_window(self): return int(self._opts.get('prefetch', 100) or 0)
+
+    def _prefetch(self, tasks):
+        """
+        Load the source and target items of the create and update tasks
+        with get_many() of both engines, the translators read them with
+        get() from the prefetched items
+        """
+        ids = {'left': [], 'right': []}
+        for task in tasks:
+            for operation in task.operations:
+                if operation['op'] in ['create', 'update', 'undo']:
+                    ids[self.reverse_map[operation['lr']]].append(operation['source'])
+                    if operation['op'] != 'create':
+                        ids[operation['lr']].append(operation['id'])
+
+        for lr, engine in [('left', self._left), ('right', self._right)]:
+            if ids[lr]:
+                with self._metrics.timer('prefetch_seconds', engine=engine.label):
+                    count = engine.prefetch(ids[lr])
+                self._metrics.count('prefetched', count, side=lr)
+                self.logger.debug(u'Prefetched %d of %d items at %s', count, len(ids[lr]), engine)
+
+    def _execute(self, tasks):
+
+        # tasks are executed in windows of [prefetch] tasks with their items loaded in advance
+        window = self.prefetch_window or len(tasks) or 1
+        error = None
+        for start in range(0, len(tasks), window):
+            chunk = tasks[start:start + window]
+            if self.prefetch_window:
+                self._prefetch(chunk)
+            try:
+                for task, result in self._executor.run(chunk):
+                    if task.elapsed is not None:
+                        op = task.operations[0]['op'] if task.operations else task.func.__name__
+                        self._metrics.observe('task_seconds', task.elapsed, op=op, batch=task.batch)
+                    self._apply(task, result)
+                    if self._checkpoint is not None:
+                        sync = self.sync if self._new_sync is None else self._new_sync
+                        sids = set(operation['sid'] for operation in task.operations) - set([None])
+                        self._checkpoint.done(task.operations, dict((sid, sync.get(sid)) for sid in sids))
+            except Exception as e:
+                if not self._executor.concurrent:
+                    raise
+                # concurrent tasks: run the remaining windows like the rest of the task list
+                if error is None:
+                    error = sys.exc_info()
+        if error is not None:
+            raise error[0], error[1], error[2]
+
+    def _batch_task(self, op, lr, operations):
+
+        from pysync.executor import SyncTask
+
+        engine = self._left if lr == 'left' else self._right
+        other = self._right if lr == 'left' else self._left
+        sids = [operation['sid'] for operation in operations]
+
+        self.logger.debug(u'Batch %s of %d items at %s', op, len(operations), engine)
+
+        if op == 'delete':
+            items = [(operation['sid'], operation['id']) for operation in operations]
+            return SyncTask(sids, None, engine.delete_many, (items,), engines=[engine],
+                            operations=operations)
+
+        if op == 'create':
+            items = [(operation['sid'], operation['source']) for operation in operations]
+            return SyncTask(sids, lr, engine.create_many, (other, items), engines=[engine, other],
+                            sources=[operation['source'] for operation in operations], operations=operations)
+
+        items = [(operation['sid'], operation['id'], operation['source']) for operation in operations]
+        return SyncTask(sids, lr, engine.update_many, (other, items), engines=[engine, other],
+                        sources=[operation['source'] for operation in operations], operations=operations)
+
+    def execute(self, plan, completed=None):
+        """
+        Apply a SyncPlan to the engines and build the new sync map.
+        completed is the (operation keys, entries) of a resumed checkpoint.
+        """
+        from pysync.executor import SyncExecutor
+        from pysync.checkpoint import Checkpoint
+
+        if completed is None and self.checkpoint_file is not None and Checkpoint.exists(self.checkpoint_file):
+            # resume() continues the interrupted run
+            raise IOError(u'Checkpoint %s of an interrupted run exists' % (self.checkpoint_file))
+
+        tasks = self._tasks(plan, completed)
+
+        if self.checkpoint_file is not None and tasks:
+            self._checkpoint = Checkpoint(self.checkpoint_file, self._opts.get('checkpoint_interval', 50))
+            if completed is not None:
+                self._checkpoint.resume()
+            else:
+                self._checkpoint.start(plan)
+
+        self._executor = SyncExecutor([self._left, self._right], self._logger)
+        try:
+            with self._metrics.phase('execute'):
+                self._execute(tasks)
+        finally:
+            self._executor.close()
+            if self._checkpoint is not None:
+                self._checkpoint.close()
+
+        return self._finish(plan)
+
+    def _begin(self, plan):
 
+        if plan.initial:
+            self.sync = self._store.begin(True) if self._store is not None else {}
+            self._new_sync = None
+        else:
+            self._new_sync = self._store.begin() if self._store is not None else {}
+
+    def _finish(self, plan):
+
+        if not plan.initial:
+            if self._store is not None:
+                self._store.finish(self._new_sync)
             self._sync['map'] = self._new_sync
 
+        # a resumed run keeps the listing times of the interrupted run
+        self._sync['listed'] = dict(plan.listed or self._listing)
+        self._commit()
         return self._sync
 
+    def _kept_item(self, sid, lr, id):
+        """
+        Sync map item of an item not written by the run. Listings without
+        fingerprints keep the digest of the last map while the item time
+        is unchanged.
+        """
+        item = (self._left if lr == 'left' else self._right).map_item(id)
+        if item is not None and item.get('digest') is None and self.sync is not None:
+            entry = self.sync.get(sid)
+            last = entry.get(lr) if entry is not None else None
+            if last is not None and last.get('digest') is not None and last.get('time') == item.get('time'):
+                item['digest'] = last['digest']
+        return item
+
+    def _tasks(self, plan, completed=None):
+
+        from pysync.executor import SyncTask
+        from pysync.checkpoint import Checkpoint
+
+        engines = {'left': self._left, 'right': self._right}
+
+        self._begin(plan)
+
+        done = set()
+        if completed is not None:
+            # entries of the operations completed before the interruption
+            done, entries = completed
+            sync = self.sync if self._new_sync is None else self._new_sync
+            for sid in entries:
+                if entries[sid] is not None:
+                    sync[sid] = entries[sid]
+            self._commit()
+
+        tasks = []
+        batches = {}
+        for operation in plan:
+
+            op, sid, lr = operation['op'], operation['sid'], operation['lr']
+
+            if Checkpoint.op_key(operation) in done:
+                continue
+
+            if op in ['match', 'keep']:
+                self._add_item(sid, 'left', self._kept_item(sid, 'left', operation['id']))
+                self._add_item(sid, 'right', self._kept_item(sid, 'right', operation['source']))
+                continue
+
+            engine = engines[lr]
+            other = engines[self.reverse_map[lr]]
+
+            if engine.batch_size > 1:
+                # group operations of the same type for the engine's *_many() methods
+                op = 'update' if op == 'undo' else op
+                if op != 'delete':
+                    self._add_item(sid, self.reverse_map[lr], other.map_item(operation['source']))
+                batch = batches.setdefault((op, lr), [])
+                batch.append(operation)
+                if len(batch) >= engine.batch_size:
+                    tasks.append(self._batch_task(op, lr, batch))
+                    batches[(op, lr)] = []
+                continue
+
+            if op == 'delete':
+                tasks.append(SyncTask(sid, None, engine.delete, (sid,), cursors=[(engine, operation['id'])],
+                                      operations=[operation]))
+
+            elif op == 'create':
+                self._add_item(sid, self.reverse_map[lr], other.map_item(operation['source']))
+                tasks.append(SyncTask(sid, lr, engine.create, (other, sid),
+                                      cursors=[(other, operation['source'])], engines=[engine, other],
+                                      sources=[operation['source']], operations=[operation]))
+
+            elif op in ['update', 'undo']:
+                self._add_item(sid, self.reverse_map[lr], other.map_item(operation['source']))
+                tasks.append(SyncTask(sid, lr, engine.update, (other,), {'sid': sid},
+                                      cursors=[(engine, operation['id']), (other, operation['source'])],
+                                      sources=[operation['source']], operations=[operation]))
+
+        for op, lr in sorted(batches):
+            if batches[(op, lr)]:
+                tasks.append(self._batch_task(op, lr, batches[(op, lr)]))
+
+        return tasks
+
+    def process(self):
+        return self.execute(self.plan())
+
 def parse_config(relation, config, _logger):
 
     from ConfigParser import ConfigParser
@@ -356,6 +697,7 @@ def parse_config(relation, config, _logger):
     from oxsync import OxTaskSync
     from ensync import EnClientSync
     from tdsync import ToodledoSync
+    from fssync import FileSync
 
     logger = LogAdapter(_logger, {'package': 'config'})
 
@@ -363,7 +705,8 @@ def parse_config(relation, config, _logger):
 
         'OxTaskSync': OxTaskSync,
         'EnClientSync': EnClientSync,
-        'ToodledoSync': ToodledoSync
+        'ToodledoSync': ToodledoSync,
+        'FileSync': FileSync
     }
 
     relation_section = 'relation' + '_' + relation
@@ -412,6 +755,9 @@ def parse_config(relation, config, _logger):
             exit(1)
 
         for engine in [left, right]:
+            if engine.get('secrets') is None:
+                # local engines without credentials
+                continue
             secrets = engine['secrets']
             path = os.path.expanduser(secrets)
             if os.path.isfile(path):
@@ -464,45 +810,121 @@ def parse_config(relation, config, _logger):
 
     return Options(left), Options(right), Options(rel)
 
+def lock_files(opts):
+    """
+    Map file, lock record and snapshot of the previous map generation
+    """
+    map_file = os.path.expanduser(opts['map'])
+    base = os.path.splitext(map_file)[0]
+    return map_file, base + '.lck', base + '.prev'
+
+def lock_record(lck_file):
+    """
+    Owner of a lock: {'pid', 'host', 'time', 'relation', 'snapshot'} or
+    {'legacy': True} for lock files with a full map copy of older versions
+    """
+    try:
+        with open(lck_file, 'rb') as fp:
+            content = fp.read(4096)
+        record = json.loads(content)
+        if isinstance(record, dict) and 'pid' in record:
+            return record
+    except (IOError, ValueError) as e:
+        pass
+    return {'legacy': True}
+
+def stale_lock(record):
+    """
+    True if the locking process is known to be gone
+    """
+    import socket, errno
+    if record.get('legacy') or record.get('host') != socket.gethostname():
+        return False
+    try:
+        os.kill(int(record['pid']), 0)
+    except OSError as e:
+        return e.errno == errno.ESRCH
+    return False
+
 def lock(relation, opts, _logger):
 
+    import socket
+
     logger = LogAdapter(_logger, {'package': 'lock'})
-    map_file = os.path.expanduser(opts['map'])
-    lck_file = os.path.splitext(map_file)[0] + '.lck'
+    map_file, lck_file, prev_file = lock_files(opts)
+
     if os.path.isfile(lck_file):
+        record = lock_record(lck_file)
+        if record.get('legacy'):
+            owner = u'an older PySync version'
+        else:
+            owner = u'process %s on %s at %s' % (record['pid'], record['host'], record['time'])
+        if stale_lock(record):
+            if opts.get('stale_lock') in ['remove', 'rollback']:
+                logger.warning(u'Relation [%s] locked by %s (no longer running): %s' % (relation, owner, opts['stale_lock']))
+                if opts['stale_lock'] == 'rollback':
+                    rollback(relation, opts, _logger)
+                else:
+                    unlock(relation, opts, _logger)
+                return lock(relation, opts, _logger)
+            logger.error('Relation [%s] locked by %s (no longer running). Remove %s to unlock synchronization' %
+                         (relation, owner, lck_file))
+        else:
+            logger.error('Relation [%s] locked by %s. Remove %s to unlock synchronization' % (relation, owner, lck_file))
+        return False
+
+    # atomic creation of the lock record
+    try:
+        fd = os.open(lck_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0644)
+    except OSError as e:
         logger.error('Relation [%s] locked. Remove %s to unlock synchronization' % (relation, lck_file))
         return False
-    if os.path.isfile(map_file):
-        with codecs.open(map_file, 'r', encoding='utf-8') as fp:
-            content = fp.read()
-        logger.debug(u'Locking relation [%s]' % (relation))
-        with codecs.open(lck_file, 'w', encoding='utf-8') as fp:
-            fp.write(content)
-    else:
-        open(lck_file, 'a').close()
+
+    # map files are replaced by rename: a hard link keeps the previous generation,
+    # SQLite stores roll back unfinished runs themselves
+    snapshot = os.path.isfile(map_file) and opts.get('map_store') != 'sqlite'
+    if snapshot:
+        if os.path.lexists(prev_file):
+            os.remove(prev_file)
+        try:
+            os.link(map_file, prev_file)
+        except (OSError, AttributeError) as e:
+            shutil.copyfile(map_file, prev_file)
+
+    record = {'pid': os.getpid(), 'host': socket.gethostname(), 'time': strflocal(),
+              'relation': relation, 'snapshot': snapshot}
+    os.write(fd, json.dumps(record))
+    os.close(fd)
+
+    logger.debug(u'Locking relation [%s]' % (relation))
     return True
 
 def rollback(relation, opts, _logger):
 
     logger = LogAdapter(_logger, {'package': 'rollback'})
-    map_file = os.path.expanduser(opts['map'])
-    lck_file = os.path.splitext(map_file)[0] + '.lck'
+    map_file, lck_file, prev_file = lock_files(opts)
     if os.path.isfile(lck_file):
-        with codecs.open(lck_file, 'r', encoding='utf-8') as fp:
-            content = fp.read()
         logger.debug(u'Rollback relation [%s]' % (relation))
-        with codecs.open(map_file, 'w', encoding='utf-8') as fp:
-            fp.write(content)
-            os.remove(lck_file)
-            return True
+        record = lock_record(lck_file)
+        if record.get('legacy'):
+            # full map copy (or empty file for an initial sync)
+            if os.path.getsize(lck_file):
+                mapfile.replace(lck_file, map_file)
+                return True
+        elif record.get('snapshot'):
+            mapfile.replace(prev_file, map_file)
+        elif os.path.isfile(map_file) and opts.get('map_store') != 'sqlite':
+            # no map before the failed initial sync
+            os.remove(map_file)
+        os.remove(lck_file)
+        return True
 
     return False
 
 def unlock(relation, opts, _logger):
 
     logger = LogAdapter(_logger, {'package': 'unlock'})
-    map_file = os.path.expanduser(opts['map'])
-    lck_file = os.path.splitext(map_file)[0] + '.lck'
+    map_file, lck_file, prev_file = lock_files(opts)
     if os.path.isfile(lck_file):
         logger.debug(u'Unlocking relation [%s]' % (relation))
         os.remove(lck_file)
@@ -514,49 +936,470 @@ def unlock(relation, opts, _logger):
 def check_sync_map(relation, direction, left, right, relation_opts, logger):
 
     remove = []
+    store = relation_opts.get('store')
 
     logger.debug(u'Checking sync map ...')
 
-    # check for incomplete sid entries without left or right entry
-    for sid in relation_opts['sync']['map']:
-        item = relation_opts['sync']['map'][sid]
-        OK = True
-        if item.get('left') is None:
-            logger.debug(u'Missing left entry for [%s]: %s' % (sid, item.get('key')))
-            OK = False
-        if item.get('right') is None:
-            logger.debug(u'Missing right entry for [%s]: %s' % (sid, item.get('key')))
-            OK = False
-        if not OK:
-            remove.append(sid)
-
-    # check for deleted entries in sync map
-    for sync in [left, right]:
-        for sid in sync._deleted:
-            if sid in relation_opts['sync']['map']:
-                item = relation_opts['sync']['map'][sid]
-                logger.debug(u'Removing deleted entry [%s]: %s' % (sid, item.get('key')))
+    if store is not None:
+
+        deleted = set()
+        for sync in [left, right]:
+            deleted.update(sync._deleted)
+        removed = store.check(deleted)
+        if removed:
+            logger.error(u'Repairing sync map ...')
+            for sid, key in removed:
+                logger.error(u'Removing [%s]: %s' % (sid, key))
+        remove = [sid for sid, key in removed]
+
+    else:
+
+        # check for incomplete sid entries without left or right entry
+        for sid in relation_opts['sync']['map']:
+            item = relation_opts['sync']['map'][sid]
+            OK = True
+            if item.get('left') is None:
+                logger.debug(u'Missing left entry for [%s]: %s' % (sid, item.get('key')))
+                OK = False
+            if item.get('right') is None:
+                logger.debug(u'Missing right entry for [%s]: %s' % (sid, item.get('key')))
+                OK = False
+            if not OK:
                 remove.append(sid)
 
-    if remove:
-        logger.error(u'Repairing sync map ...')
-        for sid in set(remove):
-            if sid in relation_opts['sync']['map']:
-                logger.error(u'Removing [%s]: %s' % (sid, relation_opts['sync']['map'][sid].get('key')))
-                del(relation_opts['sync']['map'][sid])
+        # check for deleted entries in sync map
+        for sync in [left, right]:
+            for sid in sync._deleted:
+                if sid in relation_opts['sync']['map']:
+                    item = relation_opts['sync']['map'][sid]
+                    logger.debug(u'Removing deleted entry [%s]: %s' % (sid, item.get('key')))
+                    remove.append(sid)
+
+        if remove:
+            logger.error(u'Repairing sync map ...')
+            for sid in set(remove):
+                if sid in relation_opts['sync']['map']:
+                    logger.error(u'Removing [%s]: %s' % (sid, relation_opts['sync']['map'][sid].get('key')))
+                    del(relation_opts['sync']['map'][sid])
+
+    count = store.count() if store is not None else len(relation_opts['sync']['map'])
 
     relation_opts['sync']['relation'] = relation
     relation_opts['sync']['direction'] = direction
-    relation_opts['sync']['count'] = len(relation_opts['sync']['map'])
+    relation_opts['sync']['count'] = count
     relation_opts['sync']['time'] = strflocal()
     relation_opts['sync']['utc'] = int(time.time() * 1000)
     relation_opts['sync']['left'] = left.options.signature
     relation_opts['sync']['right'] = right.options.signature
 
-    with codecs.open(relation_opts['map'], 'w', encoding='utf-8') as fp:
-        json.dump(relation_opts['sync'], fp, indent=4, ensure_ascii=False, encoding='utf-8')
+    if store is not None:
+        store.save(relation_opts['sync'])
+    else:
+        mapfile.dump(relation_opts['sync'], relation_opts['map'],
+                     relation_opts.get('map_format') or 'json', relation_opts.get('map_compression'))
+
+    return count, len(remove)
+
+def sync_relation(relation, config, opts, _logger):
+    """
+    Process a relation, with the metrics option the timings and counters
+    of the run are exported to the metrics directory
+    """
+    logger = LogAdapter(_logger, {'package': 'main'})
+
+    metrics = Metrics(relation)
+    ok = False
+    try:
+        ok = _sync_relation(relation, config, opts, _logger, metrics)
+    finally:
+        metrics.finish(ok)
+        logger.info(u'%s: %.1fs %s' % (relation, metrics.duration,
+                                       u' '.join(u'%s=%.2fs' % (name, seconds)
+                                                 for name, seconds in sorted(metrics.phases().items()))))
+        if opts.metrics:
+            aggregate = str(opts.metrics_aggregate or '').lower() not in ['', 'false', 'off', 'no', '0', 'none']
+            try:
+                metrics.export(opts.metrics, aggregate)
+            except Exception as e:
+                logger.exception(u'Error exporting metrics of [%s] to %s' % (relation, opts.metrics))
+    return ok
+
+def _sync_relation(relation, config, opts, _logger, metrics):
+
+    logger = LogAdapter(_logger, {'package': 'main'})
+
+    try:
+        left_opts, right_opts, relation_opts = parse_config(relation, config, _logger)
+    except Exception as e:
+        logger.exception('Error parsing configuration options. Skipping sync for [%s]' % (relation))
+        return False
+
+    relation_opts['metrics'] = metrics
+
+    if not opts.profile:
+        return _run_relation(relation, opts, left_opts, right_opts, relation_opts, _logger, metrics)
+
+    # profile files next to the map file
+    from pysync.profiling import Profiler
+    profiler = Profiler(relation, os.path.splitext(relation_opts['map'])[0],
+                        opts.profile_top or 30, opts.profile_memory)
+    metrics.memory = profiler.memory
+    try:
+        return profiler.runcall(_run_relation, relation, opts, left_opts, right_opts, relation_opts, _logger, metrics)
+    finally:
+        metrics.memory = None
+        try:
+            profiler.dump(logger)
+        except Exception as e:
+            logger.exception(u'Error writing profile of [%s]' % (relation))
+
+def _run_relation(relation, opts, left_opts, right_opts, relation_opts, _logger, metrics):
+
+    logger = LogAdapter(_logger, {'package': 'main'})
 
-    return len(relation_opts['sync']['map']), len(remove)
+    if lock(relation, relation_opts, _logger):
+
+        # initialise web service sessions via @staticmethod session()
+        # and initialize sync engine classes
+        try:
+            with metrics.phase('session'):
+                label = left_opts.get('label')
+                session_lockfile = left_opts.get('session_lockfile', True)
+                left_session = left_opts['class'].session(left_opts, _logger)
+                label = right_opts.get('label')
+                session_lockfile = right_opts.get('session_lockfile', True)
+                right_session = right_opts['class'].session(right_opts, _logger)
+        except Exception as e:
+            # TODO: check exception type, unlock() only in case of an temp. network error etc.
+            logger.exception('Session initialization for [%s] failed! Skipping sync for [%s]' % (label, relation))
+            if not session_lockfile:
+                unlock(relation, relation_opts, _logger)
+            return False
+
+        accounting = None
+        if opts.accounting or str(relation_opts.get('call_accounting', '')).lower() in ['true', 'on', 'yes', '1']:
+            # count remote calls of the engine sessions
+            from pysync.accounting import CallAccounting
+            accounting = CallAccounting(relation, metrics)
+            left_session = accounting.wrap(left_session, left_opts.get('label') or 'left',
+                                           left_opts['class'].session_services)
+            right_session = accounting.wrap(right_session, right_opts.get('label') or 'right',
+                                            right_opts['class'].session_services)
+
+        # initialize sync map
+        relation_opts['sync'] = {'map': None}
+
+        store = None
+        if relation_opts.get('map_store') == 'sqlite':
+            from pysync.store import SyncStore
+            store = relation_opts['store'] = SyncStore(relation_opts['map'], _logger)
+
+        if (store is not None and store.initialized) or (store is None and os.path.isfile(relation_opts['map'])):
+
+            ####################
+            # incremental sync #
+            ####################
+
+            with metrics.phase('map_load'):
+                if store is not None:
+                    relation_opts['sync'] = store.load()
+                else:
+                    relation_opts['sync'], format, compression = mapfile.load(relation_opts['map'], with_format=True)
+                    if not relation_opts.get('map_format'):
+                        # keep the format of a converted map file
+                        relation_opts['map_format'] = format
+                        relation_opts['map_compression'] = compression
+
+            logger.info(u'%s: starting incremental sync for %d items' % (relation, len(relation_opts['sync'].get('map'))))
+
+            # merge signature from map file
+            left_opts.update({'signature': relation_opts['sync']['left']})
+            right_opts.update({'signature': relation_opts['sync']['right']})
+
+            try:
+                with metrics.phase('engine_init'):
+                    engine_lockfile = left_opts.get('engine_lockfile', True)
+                    left = left_opts['class'](left_session, left_opts, logger=_logger)
+                    engine_lockfile = right_opts.get('engine_lockfile', True)
+                    right = right_opts['class'](right_session, right_opts, logger=_logger)
+            except Exception as e:
+                # TODO: check exception type, unlock() only in case of an temp. network error etc.
+                logger.exception('Engine initialization for [%s] failed! Skipping sync for [%s]' % (label, relation))
+                if not engine_lockfile:
+                    unlock(relation, relation_opts, _logger)
+                return False
+
+            if opts['update']:
+                # forced updates need the full listing of both sides
+                relation_opts['full_listing'] = True
+                try:
+                    pysync = PySync(left, right, relation_opts, _logger)
+                    relation_opts['sync'] = pysync.update(opts['update'])
+                except Exception as e:
+                    logger.exception('Unexpected error when processing update option! Skipping sync for [%s]' % relation)
+                    unlock(relation, relation_opts, _logger)
+                    return False
+
+            if opts.reset and not opts.plan:
+                try:
+                    pysync = PySync(left, right, relation_opts, _logger)
+                    relation_opts['sync'] = pysync.reset(opts.reset)
+                except Exception as e:
+                    logger.exception('Unexpected error when processing reset option!')
+                    check_sync_map(relation, pysync.direction, left, right, relation_opts, logger)
+                    return False
+
+            if opts.rebuild:
+                relation_opts['sync'] = {'map': None}
+                if store is not None:
+                    store.clear()
+
+        else:
+
+            ################
+            # initial sync #
+            ################
+
+            logger.info(u'%s: Starting initial sync' % (relation))
+
+            for opt in ['update', 'reset', 'rebuild']:
+                if opts.get(opt):
+                    logger.warning('Ignoring option [%s] for initial sync' % (opt))
+
+            try:
+                with metrics.phase('engine_init'):
+                    left = left_opts['class'](left_session, left_opts, logger=_logger)
+                    right = right_opts['class'](right_session, right_opts, logger=_logger)
+            except Exception as e:
+                # TODO: check exception type, unlock() only in case of an temp. network error etc.
+                logger.exception('Engine initialization for [%s] failed! Skipping sync for [%s]' % (label, relation))
+                # unlock(relation, relation_opts, _logger)
+                return False
+
+        if opts.plan:
+            # dry-run: report planned operations and leave map and backends untouched
+            try:
+                pysync = PySync(left, right, relation_opts, _logger)
+                plan = pysync.plan()
+            except Exception as e:
+                logger.exception('Unexpected error when planning sync for [%s]' % (relation))
+                plan = None
+            if plan is not None:
+                plan.dump(os.path.splitext(relation_opts['map'])[0] + '.plan.json')
+                print(u'[%s] %s' % (relation, plan.summary(left, right)))
+            unlock(relation, relation_opts, _logger)
+            if accounting is not None:
+                accounting.report(logger)
+            left_opts['class'].end_session(logger)
+            right_opts['class'].end_session(logger)
+            return plan is not None
+
+        from pysync.checkpoint import Checkpoint
+        try:
+            pysync = driver(left, right, relation_opts, _logger)
+            checkpoint = pysync.checkpoint_file
+            if checkpoint is not None and Checkpoint.exists(checkpoint):
+                logger.warning(u'%s: Resuming interrupted run from checkpoint %s' % (relation, checkpoint))
+                relation_opts['sync'] = pysync.resume()
+            else:
+                relation_opts['sync'] = pysync.process()
+        except Exception as e:
+            logger.exception('Unexpected error when processing sync map!')
+            check_sync_map(relation, pysync.direction, left, right, relation_opts, logger)
+            return False
+
+        # check/modify sync map by backend engine
+        with metrics.phase('commit_sync'):
+            relation_opts = left.commit_sync('left', relation_opts, logger)
+            relation_opts = right.commit_sync('right', relation_opts, logger)
+        with metrics.phase('check_sync_map'):
+            count, errors = check_sync_map(relation, pysync.direction, left, right, relation_opts, logger)
+        if checkpoint is not None and os.path.isfile(checkpoint):
+            os.remove(checkpoint)
+        unlock(relation, relation_opts, logger)
+        logger.info(u'%s: %s %s' % (relation, left.label, left._changes))
+        logger.info(u'%s: %s %s' % (relation, right.label, right._changes))
+        logger.info(u'%s: finished %s sync for %d items with %d errors' % (relation, pysync.direction, count, errors))
+
+        for lr, engine in [('left', left), ('right', right)]:
+            for change, value in engine._changes.items():
+                metrics.count('changes', value, side=lr, change=change)
+        metrics.count('items', count)
+        metrics.count('errors', errors)
+
+        if accounting is not None:
+            accounting.report(logger, relation_opts.get('call_budget'), relation_opts.get('sid_call_budget'))
+
+        with metrics.phase('end_session'):
+            left_opts['class'].end_session(logger)
+            right_opts['class'].end_session(logger)
+
+        if store is not None:
+            store.close()
+
+        return True
+
+    return False
+
+class RelationLogHandler(logging.Handler):
+    """
+    Collect log records of a relation running in a worker and prepare
+    them for replay (and pickling) in the main process
+    """
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+        self._formatter = logging.Formatter()
+
+    def emit(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._formatter.formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+def relation_resources(relation, config, opts, _logger):
+    """
+    Backend resources used by a relation: relations sharing a map file,
+    an Open-Xchange/Toodledo folder or an Evernote notebook must not run
+    concurrently
+    """
+    resources = set()
+    try:
+        left_opts, right_opts, relation_opts = parse_config(relation, config, _logger)
+    except Exception as e:
+        return resources
+
+    resources.add(('map', relation_opts['map']))
+    for engine in [left_opts, right_opts]:
+        name = engine['class'].__name__
+        for option in ['folder', 'archive', 'notebook']:
+            if engine.get(option):
+                resources.add((name, engine[option]))
+        if opts.pool == 'thread' or opts.loop:
+            # sessions are class level singletons
+            resources.add((name, None))
+    return resources
+
+def relation_groups(relations, config, opts, _logger):
+    """
+    Partition relations into groups of relations with shared resources,
+    relations within a group are processed sequentially
+    """
+    groups = []
+    for relation in relations:
+        resources = relation_resources(relation, config, opts, _logger)
+        group = {'relations': [relation], 'resources': resources}
+        for other in list(groups):
+            if other['resources'] & resources:
+                groups.remove(other)
+                group['relations'] = other['relations'] + group['relations']
+                group['resources'] |= other['resources']
+        groups.append(group)
+
+    return [sorted(group['relations'], key=relations.index) for group in groups]
+
+# worker configuration, inherited by forked worker processes
+_worker = {}
+
+def driver(left, right, relation_opts, _logger):
+    """
+    PySync for a relation run: AsyncPySync on the shared SyncLoop of the
+    invocation with the --loop option, the blocking PySync otherwise
+    """
+    loop = _worker.get('loop')
+    if loop is not None:
+        from pysync.aio import AsyncPySync
+        return AsyncPySync(left, right, relation_opts, _logger, loop=loop)
+    return PySync(left, right, relation_opts, _logger)
+
+def sync_group(relations):
+
+    results = []
+    for relation in relations:
+        _logger = logging.Logger(_worker['logger'].name, _worker['logger'].getEffectiveLevel())
+        handler = RelationLogHandler()
+        _logger.addHandler(handler)
+        try:
+            ok = sync_relation(relation, _worker['config'], _worker['opts'], _logger)
+        except Exception as e:
+            LogAdapter(_logger, {'package': 'main'}).exception('Unexpected error processing [%s]' % (relation))
+            ok = False
+        results.append((relation, ok, handler.records))
+    return results
+
+def sync_relations(relations, config, opts):
+
+    logger = LogAdapter(opts.logger, {'package': 'main'})
+
+    if opts.loop:
+        # engine calls of all relations multiplexed on one thread pool
+        from pysync.aio import SyncLoop
+        _worker['loop'] = SyncLoop(int(opts.loop), opts.logger)
+        logger.info(u'Processing %d relations on a shared loop of %d threads' % (len(relations), int(opts.loop)))
+        try:
+            _sync_relations(relations, config, opts, 'thread')
+        finally:
+            _worker.pop('loop').close()
+        return
+
+    _sync_relations(relations, config, opts, opts.pool)
+
+def _sync_relations(relations, config, opts, pool_type):
+
+    logger = LogAdapter(opts.logger, {'package': 'main'})
+
+    workers = int(opts.workers or 1)
+    if workers < 2 or len(relations) < 2:
+        for relation in relations:
+            sync_relation(relation, config, opts, opts.logger)
+        return
+
+    if pool_type not in ['process', 'thread']:
+        logger.critical('Invalid worker pool [%s]' % (pool_type))
+        exit(1)
+
+    groups = relation_groups(relations, config, opts, opts.logger)
+    logger.info(u'Processing %d relations in %d groups with %d %s workers' %
+                (len(relations), len(groups), workers, pool_type))
+    for group in groups:
+        if len(group) > 1:
+            logger.debug(u'Serializing relations %s with shared resources' % (group))
+
+    _worker.update({'config': config, 'opts': opts, 'logger': opts.logger})
+
+    if pool_type == 'thread':
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(min(workers, len(groups)))
+    else:
+        from multiprocessing import Pool
+        pool = Pool(min(workers, len(groups)), maxtasksperchild=1)
+
+    try:
+        pending = {}
+        for group in groups:
+            result = pool.apply_async(sync_group, (group,))
+            for relation in group:
+                pending[relation] = result
+
+        # replay log records in order of the relations list
+        done = {}
+        for relation in relations:
+            if relation not in done:
+                try:
+                    for name, ok, records in pending[relation].get():
+                        done[name] = records
+                except Exception as e:
+                    logger.exception('Worker for [%s] failed!' % (relation))
+                    for name in pending:
+                        if pending[name] is pending[relation]:
+                            done[name] = []
+            for record in done.pop(relation, []):
+                opts.logger.handle(record)
+    finally:
+        pool.close()
+        pool.join()
 
 def main():
 
@@ -566,7 +1409,9 @@ def main():
 
     options = {
         'secrets': '~/.pysync.secrets',
-        'loglevel_requests': 'ERROR'
+        'loglevel_requests': 'ERROR',
+        'workers': 1,
+        'pool': 'process'
         # 'loglevel': 'INFO'
     }
 
@@ -578,6 +1423,20 @@ def main():
     parser.add_argument('--rebuild', action='store_true', help='rebuild map file')
     parser.add_argument('--reset', type=str, help='delete entries and recreate from left/right')
     parser.add_argument('--update', type=str, help='force update on left/right side')
+    parser.add_argument('--plan', action='store_true', help='show planned operations without syncing')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue interrupted runs from their checkpoint (always done, kept for compatibility)')
+    parser.add_argument('-w', '--workers', type=int, help='number of relations processed in parallel')
+    parser.add_argument('--pool', type=str, choices=['process', 'thread'], help='worker pool type')
+    parser.add_argument('--loop', type=int, metavar='SIZE',
+                        help='run the relations on one shared loop of SIZE threads (thread workers)')
+    parser.add_argument('--metrics', type=str, help='write run metrics of each relation to this directory')
+    parser.add_argument('--metrics-aggregate', action='store_true',
+                        help='accumulate the metrics of the runs in the metrics directory')
+    parser.add_argument('--accounting', action='store_true', help='count and time the remote calls of the engines')
+    parser.add_argument('--profile', action='store_true', help='write a cProfile profile of each relation next to the map file')
+    parser.add_argument('--profile-top', type=int, help='number of functions in the profile summary (default: 30)')
+    parser.add_argument('--profile-memory', action='store_true', help='add the peak memory of each phase to the profile')
 
     parser.add_argument('-l', '--loglevel', type=str,
                         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
@@ -610,124 +1469,7 @@ def main():
 
 # endregion
 
-    for relation in relations:
-
-        try:
-            left_opts, right_opts, relation_opts = parse_config(relation, config, opts.logger)
-        except Exception as e:
-            logger.exception('Error parsing configuration options. Skipping sync for [%s]' % (relation))
-            continue
-
-        if lock(relation, relation_opts, opts.logger):
-
-            # initialise web service sessions via @staticmethod session()
-            # and initialize sync engine classes
-            try:
-                label = left_opts.get('label')
-                session_lockfile = left_opts.get('session_lockfile', True)
-                left_session = left_opts['class'].session(left_opts, opts.logger)
-                label = right_opts.get('label')
-                session_lockfile = right_opts.get('session_lockfile', True)
-                right_session = right_opts['class'].session(right_opts, opts.logger)
-            except Exception as e:
-                # TODO: check exception type, unlock() only in case of an temp. network error etc.
-                logger.exception('Session initialization for [%s] failed! Skipping sync for [%s]' % (label, relation))
-                if not session_lockfile:
-                    unlock(relation, relation_opts, opts.logger)
-                continue
-
-            # initialize sync map
-            relation_opts['sync'] = {'map': None}
-
-            if os.path.isfile(relation_opts['map']):
-
-                ####################
-                # incremental sync #
-                ####################
-
-                with codecs.open(relation_opts['map'], 'r', encoding='utf-8') as fp:
-                    relation_opts['sync'] = json.load(fp)
-
-                logger.info(u'%s: starting incremental sync for %d items' % (relation, len(relation_opts['sync'].get('map'))))
-
-                # merge signature from map file
-                left_opts.update({'signature': relation_opts['sync']['left']})
-                right_opts.update({'signature': relation_opts['sync']['right']})
-
-                try:
-                    engine_lockfile = left_opts.get('engine_lockfile', True)
-                    left = left_opts['class'](left_session, left_opts, logger=opts.logger)
-                    engine_lockfile = right_opts.get('engine_lockfile', True)
-                    right = right_opts['class'](right_session, right_opts, logger=opts.logger)
-                except Exception as e:
-                    # TODO: check exception type, unlock() only in case of an temp. network error etc.
-                    logger.exception('Engine initialization for [%s] failed! Skipping sync for [%s]' % (label, relation))
-                    if not engine_lockfile:
-                        unlock(relation, relation_opts, opts.logger)
-                    continue
-
-                if opts['update']:
-                    try:
-                        pysync = PySync(left, right, relation_opts, opts.logger)
-                        relation_opts['sync'] = pysync.update(opts['update'])
-                    except Exception as e:
-                        logger.exception('Unexpected error when processing update option! Skipping sync for [%s]' % relation)
-                        unlock(relation, relation_opts, opts.logger)
-                        continue
-
-                if opts.reset:
-                    try:
-                        pysync = PySync(left, right, relation_opts, opts.logger)
-                        relation_opts['sync'] = pysync.reset(opts.reset)
-                    except Exception as e:
-                        logger.exception('Unexpected error when processing reset option!')
-                        check_sync_map(relation, pysync.direction, left, right, relation_opts, logger)
-                        continue
-
-                if opts.rebuild:
-                    relation_opts['sync'] = {'map': None}
-
-            else:
-
-                ################
-                # initial sync #
-                ################
-
-                logger.info(u'%s: Starting initial sync' % (relation))
-
-                for opt in ['update', 'reset', 'rebuild']:
-                    if opts.get(opt):
-                        logger.warning('Ignoring option [%s] for initial sync' % (opt))
-
-                try:
-                    left = left_opts['class'](left_session, left_opts, logger=opts.logger)
-                    right = right_opts['class'](right_session, right_opts, logger=opts.logger)
-                except Exception as e:
-                    # TODO: check exception type, unlock() only in case of an temp. network error etc.
-                    logger.exception('Engine initialization for [%s] failed! Skipping sync for [%s]' % (label, relation))
-                    # unlock(relation, relation_opts, opts.logger)
-                    continue
-
-            try:
-                pysync = PySync(left, right, relation_opts, opts.logger)
-                relation_opts['sync'] = pysync.process()
-            except Exception as e:
-                logger.exception('Unexpected error when processing sync map!')
-                check_sync_map(relation, pysync.direction, left, right, relation_opts, logger)
-                continue
-
-            # check/modify sync map by backend engine
-            relation_opts = left.commit_sync('left', relation_opts, logger)
-            relation_opts = right.commit_sync('right', relation_opts, logger)
-            count, errors = check_sync_map(relation, pysync.direction, left, right, relation_opts, logger)
-            unlock(relation, relation_opts, logger)
-            logger.info(u'%s: %s %s' % (relation, left.label, left._changes))
-            logger.info(u'%s: %s %s' % (relation, right.label, right._changes))
-            logger.info(u'%s: finished %s sync for %d items with %d errors' % (relation, pysync.direction, count, errors))
-
-
-            left_opts['class'].end_session(logger)
-            right_opts['class'].end_session(logger)
+    sync_relations(relations, config, opts)
 
 # region __Main__
 
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, sys, time, logging, threading
+from pyutils import LogAdapter, get_logger
+from .log import SyncLogger
+from .accounting import sid_scope
+
+
+class SyncTask(object):
+    """
+    A per-sid (or batch) engine call: func(*args, **kwargs) with the item
+    cursors of the involved engines set in the executing thread
+    """
+    def __init__(self, sid, lr, func, args=(), kwargs=None, cursors=None, engines=None, sources=None,
+                 operations=None):
+        # sid is a list for batch tasks returning a list of results
+        self.sid = sid
+        self.lr = lr
+        # source item ids of create and update tasks
+        self.sources = sources or [None] * (len(sid) if isinstance(sid, list) else 1)
+        # SyncPlan operations performed by the task
+        self.operations = operations or []
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.cursors = cursors or []
+        self.engines = engines or [engine for engine, key in self.cursors]
+        # seconds spent in func
+        self.elapsed = None
+
+    @property
+    def batch(self): return isinstance(self.sid, list)
+
+    def results(self, result):
+        if self.batch:
+            if result is None:
+                return zip(self.sid, [None] * len(self.sid))
+            return zip(self.sid, result)
+        return [(self.sid, result)]
+
+    def __repr__(self):
+        return u'%s: %s %s' % (self.sid, self.lr, self.func.__name__)
+
+
+class SyncExecutor(object):
+    """
+    Run independent per-sid tasks on a bounded thread pool. Each engine
+    limits the number of concurrent tasks using it by its [workers]
+    option, the default of 1 runs all tasks inline and in order.
+    """
+    def __init__(self, engines, logger=None):
+
+        if logger is None:
+            self._logger = get_logger('pysync', logging.DEBUG)
+        else:
+            self._logger = logger
+
+        self._adapter = SyncLogger(self._logger, 'executor')
+
+        # engines are locked in this order to avoid deadlocks
+        self._engines = list(engines)
+        self._semaphores = {}
+        for engine in self._engines:
+            self._semaphores[engine] = threading.BoundedSemaphore(max(engine.workers, 1))
+
+        self._size = max([engine.workers for engine in self._engines] + [1])
+        self._pool = None
+        if self._size > 1:
+            from multiprocessing.pool import ThreadPool
+            self._pool = ThreadPool(self._size)
+            self.logger.debug(u'Executing tasks with %d threads %s',
+                              self._size, dict((str(e), e.workers) for e in self._engines))
+
+    @property
+    def logger(self): return self._adapter
+
+    @property
+    def concurrent(self): return self._pool is not None
+
+    def _run(self, task):
+        for engine, key in task.cursors:
+            engine._key = key
+        start = time.time()
+        try:
+            # remote calls of batch tasks are not attributed to a sid
+            with sid_scope(None if task.batch else task.sid):
+                return task.func(*task.args, **task.kwargs)
+        finally:
+            task.elapsed = time.time() - start
+
+    def _call(self, task):
+        engines = [engine for engine in self._engines if engine in task.engines]
+        for engine in engines:
+            self._semaphores[engine].acquire()
+        try:
+            return True, self._run(task)
+        except Exception as e:
+            return False, sys.exc_info()
+        finally:
+            for engine in reversed(engines):
+                self._semaphores[engine].release()
+
+    def run(self, tasks):
+        """
+        Execute tasks and yield (task, result) in the order of the task
+        list. The first exception is re-raised after the results of all
+        successful tasks have been passed to the caller.
+        """
+        if self._pool is None:
+            for task in tasks:
+                yield task, self._run(task)
+            return
+
+        pending = [(task, self._pool.apply_async(self._call, (task,))) for task in tasks]
+        error = None
+        for task, result in pending:
+            ok, result = result.get()
+            if ok:
+                yield task, result
+            elif error is None:
+                error = result
+        if error is not None:
+            raise error[0], error[1], error[2]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
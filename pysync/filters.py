@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Listing filters of the sync engines. The engine option filter_expr is a
+Python expression on the listed item, e.g.
+
+    filter_expr = item.title.startswith('@') and item.status != 3
+
+It is parsed and validated once at engine init and compiled into a
+predicate. Only a restricted subset of expressions is accepted: literals,
+boolean operators, comparisons, arithmetic, subscripts, attributes (no
+dunder names), the names item and self (the engine) and calls of a few
+builtins and string/dict methods.
+
+Alternatively filter_module names a plugin module (dotted name on the
+Python path or a .py file) with a function check_filter(item).
+
+Deprecated: expressions outside of the subset (comprehensions, getattr,
+keyword arguments, ...) are evaluated unrestricted as in earlier
+releases, with a warning at engine init. This fallback will be removed
+with the next release.
+"""
+
+import os, sys, ast, imp, importlib
+
+BUILTINS = {'len': len, 'str': str, 'unicode': unicode, 'int': int, 'long': long, 'float': float,
+            'bool': bool, 'any': any, 'all': all, 'min': min, 'max': max, 'abs': abs,
+            'True': True, 'False': False, 'None': None}
+
+NAMES = set(['item', 'self']) | set(BUILTINS)
+
+METHODS = set(['startswith', 'endswith', 'lower', 'upper', 'strip', 'lstrip', 'rstrip', 'split',
+               'find', 'count', 'get', 'keys', 'values', 'items', 'isdigit', 'tag_names'])
+
+NODES = (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+         ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+         ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot,
+         ast.IfExp, ast.Name, ast.Load, ast.Attribute, ast.Subscript, ast.Index, ast.Slice, ast.Call,
+         ast.Str, ast.Num, ast.List, ast.Tuple, ast.Set, ast.Dict)
+
+
+def validate(tree):
+    """
+    Raise ValueError for nodes outside of the filter expression language
+    """
+    for node in ast.walk(tree):
+        if not isinstance(node, NODES):
+            raise ValueError(u'%s not allowed' % (node.__class__.__name__))
+        if isinstance(node, ast.Name) and node.id not in NAMES:
+            raise ValueError(u'Unknown name [%s]' % (node.id))
+        if isinstance(node, ast.Attribute) and node.attr.startswith('__'):
+            raise ValueError(u'Attribute [%s] not allowed' % (node.attr))
+        if isinstance(node, ast.Call):
+            if node.keywords or node.starargs or node.kwargs:
+                raise ValueError(u'Keyword and star arguments not allowed')
+            if isinstance(node.func, ast.Attribute):
+                if node.func.attr not in METHODS:
+                    raise ValueError(u'Method [%s] not allowed' % (node.func.attr))
+            elif not (isinstance(node.func, ast.Name) and node.func.id in BUILTINS):
+                raise ValueError(u'Call not allowed')
+    return tree
+
+
+def compile_expr(expr, engine=None):
+    """
+    Predicate of the filter expression expr, raises ValueError for
+    invalid expressions
+    """
+    try:
+        tree = ast.parse(expr.strip(), '<filter_expr>', 'eval')
+    except SyntaxError as e:
+        raise ValueError(u'Syntax error: %s' % (e))
+    code = compile(validate(tree), '<filter_expr>', 'eval')
+    scope = dict(BUILTINS, __builtins__={})
+
+    def check_filter(item):
+        return bool(eval(code, scope, {'item': item, 'self': engine}))
+
+    return check_filter
+
+
+def compile_legacy(expr, engine=None):
+    """
+    Predicate with the unrestricted eval() of earlier releases in the
+    scope of pysync.sync (deprecated), None for syntax errors
+    """
+    try:
+        code = compile(expr.strip(), '<filter_expr>', 'eval')
+    except SyntaxError:
+        return None
+    scope = vars(sys.modules['pysync.sync'])
+
+    def check_filter(item):
+        return eval(code, scope, {'item': item, 'self': engine})
+
+    return check_filter
+
+
+def load_module(name):
+    """
+    Filter plugin: module name or path of a .py file with check_filter()
+    """
+    if name.endswith('.py'):
+        path = os.path.expanduser(name)
+        module = imp.load_source('pysync_filter_' + os.path.splitext(os.path.basename(path))[0], path)
+    else:
+        module = importlib.import_module(name)
+    if not callable(getattr(module, 'check_filter', None)):
+        raise ValueError(u'Missing check_filter() in filter module [%s]' % (name))
+    return module
+
+
+def compile_filter(expr=None, module=None, engine=None):
+    """
+    Predicate of the filter options (None without filter): filter_expr
+    takes precedence over filter_module, which may be a module object or
+    a name for load_module()
+    """
+    if expr:
+        return compile_expr(expr, engine)
+    if module:
+        if isinstance(module, basestring):
+            module = load_module(module)
+        return module.check_filter
+    return None
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Logging facade for the sync hot paths. Messages take their arguments
+separately and are formatted only if the level is enabled:
+
+    self.logger.debug(u'%s: %s %s', sid, engine, item)
+
+DEBUG messages of single items can be sampled with the log_sample option
+of a relation or engine: log_sample = 100 (or 0.01) logs about one item
+in 100. Items are selected by a hash of the sid or item id, all messages
+of a selected item are logged.
+"""
+
+import logging, zlib
+from pyutils import LogAdapter
+
+
+def sample_rate(value):
+    """
+    Sample rate N (one in N items) from N or a fraction
+    """
+    if value is None or value == '':
+        return 1
+    value = float(value)
+    if value <= 0:
+        return 1
+    if value < 1:
+        value = 1.0 / value
+    return max(int(round(value)), 1)
+
+
+class SyncLogger(object):
+    """
+    LogAdapter with deferred formatting and per item sampling of DEBUG
+    messages. bind(key) returns a logger for the messages of one item.
+    """
+    def __init__(self, logger, package, sample=None, key=None):
+
+        self._logger = logger
+        self._package = package
+        self._adapter = LogAdapter(logger, {'package': package})
+        self._sample = sample_rate(sample)
+        self._key = key
+
+    @property
+    def adapter(self): return self._adapter
+
+    @property
+    def sample(self): return self._sample
+
+    def bind(self, key):
+        logger = SyncLogger.__new__(SyncLogger)
+        logger.__dict__.update(self.__dict__)
+        logger._key = key
+        return logger
+
+    def sampled(self, key):
+        if self._sample == 1 or key is None:
+            return True
+        return zlib.crc32(unicode(key).encode('utf-8')) % self._sample == 0
+
+    def isEnabledFor(self, level):
+        return self._logger.isEnabledFor(level)
+
+    @property
+    def debugging(self):
+        """
+        True if DEBUG messages of the bound item are logged
+        """
+        return self._logger.isEnabledFor(logging.DEBUG) and self.sampled(self._key)
+
+    def log(self, level, msg, *args, **kwargs):
+        if self._logger.isEnabledFor(level):
+            if level == logging.DEBUG and not self.sampled(self._key):
+                return
+            self._adapter.log(level, msg % args if args else msg, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self.log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self.log(logging.WARNING, msg, *args, **kwargs)
+
+    warn = warning
+
+    def error(self, msg, *args, **kwargs):
+        self.log(logging.ERROR, msg, *args, **kwargs)
+
+    def exception(self, msg, *args, **kwargs):
+        kwargs['exc_info'] = 1
+        self.log(logging.ERROR, msg, *args, **kwargs)
+
+    def critical(self, msg, *args, **kwargs):
+        self.log(logging.CRITICAL, msg, *args, **kwargs)
+
+    def item(self, key, msg, *args):
+        """
+        DEBUG message of a single item, sampled by its sid or id
+        """
+        if self._logger.isEnabledFor(logging.DEBUG) and self.sampled(key):
+            self._adapter.debug(msg % args if args else msg)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Sync map file serializers. The relation options [map_format] and
+[map_compression] select the format for writing, load() detects the
+format of an existing file from its leading bytes:
+
+    json        indented JSON (default, human readable)
+    compact     JSON without whitespace
+    pickle      cPickle protocol 2 (fastest load/store with Python 2)
+    msgpack     MessagePack, requires the msgpack package
+
+Each format can be compressed with gzip or bz2.
+"""
+
+import os, sys, json, gzip, bz2, logging
+import cPickle as pickle
+
+from pysync.records import map_to_layout, map_from_layout
+
+FORMATS = ['json', 'compact', 'pickle', 'msgpack']
+COMPRESSION = [None, 'gzip', 'bz2']
+
+
+class MapFileError(Exception):
+    pass
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise MapFileError(u'Map format [msgpack] requires the msgpack package')
+    return msgpack
+
+
+def _decoded(value):
+    # msgpack returns byte strings, the sync map is unicode as with JSON
+    if isinstance(value, str):
+        return value.decode('utf-8')
+    if isinstance(value, dict):
+        return dict((_decoded(k), _decoded(v)) for k, v in value.iteritems())
+    if isinstance(value, list):
+        return [_decoded(v) for v in value]
+    return value
+
+
+def encode(data, format='json'):
+
+    if format in [None, 'json']:
+        return json.dumps(data, indent=4, ensure_ascii=False, encoding='utf-8').encode('utf-8')
+    if format == 'compact':
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False, encoding='utf-8').encode('utf-8')
+    if format == 'pickle':
+        return pickle.dumps(data, 2)
+    if format == 'msgpack':
+        return _msgpack().packb(data, use_bin_type=False)
+    raise MapFileError(u'Unknown map format [%s]' % (format))
+
+
+def decode(content, format='json'):
+
+    if format in [None, 'json', 'compact']:
+        return json.loads(content.decode('utf-8'))
+    if format == 'pickle':
+        return pickle.loads(content)
+    if format == 'msgpack':
+        return _decoded(_msgpack().unpackb(content))
+    raise MapFileError(u'Unknown map format [%s]' % (format))
+
+
+def detect_compression(content):
+
+    if content.startswith('\x1f\x8b'):
+        return 'gzip'
+    if content.startswith('BZh'):
+        return 'bz2'
+    return None
+
+
+def detect(content):
+    """
+    Format of an uncompressed map from its leading bytes
+    """
+    if content[:1] == '\x80' and content[1:2] in ['\x02', '\x03', '\x04']:
+        return 'pickle'
+    head = content.lstrip()
+    if head[:1] == '{':
+        return 'json' if head[1:2] in ['\n', '\r', ' '] else 'compact'
+    if content[:1] and (0x80 <= ord(content[0]) <= 0x8f or content[0] in ['\xde', '\xdf']):
+        return 'msgpack'
+    raise MapFileError(u'Unknown map file format')
+
+
+def compress(content, compression=None):
+
+    if compression is None:
+        return content
+    if compression == 'gzip':
+        import StringIO
+        buf = StringIO.StringIO()
+        with gzip.GzipFile(fileobj=buf, mode='wb', mtime=0) as fp:
+            fp.write(content)
+        return buf.getvalue()
+    if compression == 'bz2':
+        return bz2.compress(content)
+    raise MapFileError(u'Unknown map compression [%s]' % (compression))
+
+
+def decompress(content, compression=None):
+
+    if compression is None:
+        return content
+    if compression == 'gzip':
+        return gzip.zlib.decompress(content, 16 + gzip.zlib.MAX_WBITS)
+    if compression == 'bz2':
+        return bz2.decompress(content)
+    raise MapFileError(u'Unknown map compression [%s]' % (compression))
+
+
+def load(path, with_format=False):
+    """
+    Read a sync map file in any supported format. Returns the map or
+    (map, format, compression) with with_format=True.
+    """
+    with open(os.path.expanduser(path), 'rb') as fp:
+        content = fp.read()
+    compression = detect_compression(content)
+    content = decompress(content, compression)
+    format = detect(content)
+    data = map_from_layout(decode(content, format))
+    if with_format:
+        return data, format, compression
+    return data
+
+
+def replace(source, target):
+    """
+    Atomic rename of source to target (target is replaced)
+    """
+    try:
+        os.rename(source, target)
+    except OSError:
+        # Windows: rename doesn't replace existing files
+        if not os.path.exists(target):
+            raise
+        os.remove(target)
+        os.rename(source, target)
+
+
+def dump(data, path, format='json', compression=None):
+    """
+    Write a map file: the new content is written to a temporary file
+    and renamed, the previous file stays complete until the rename
+    """
+    if compression in ['none', '']:
+        compression = None
+    content = compress(encode(map_to_layout(data), format), compression)
+    path = os.path.expanduser(path)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as fp:
+        fp.write(content)
+        fp.flush()
+        os.fsync(fp.fileno())
+    replace(tmp, path)
+    return len(content)
+
+
+def main():
+    """
+    pysync-map: convert a sync map file to another format
+    """
+    from argparse import ArgumentParser
+    from pysync import __version__, __author__
+
+    parser = ArgumentParser(description='PySync map file converter Rev. %s (c) %s' % (__version__, __author__))
+    parser.add_argument('input', type=str, help='sync map file')
+    parser.add_argument('output', type=str, nargs='?', help='converted map file (default: replace input)')
+    parser.add_argument('-f', '--format', type=str, choices=FORMATS, default='json', help='output format')
+    parser.add_argument('-z', '--compression', type=str, choices=['none', 'gzip', 'bz2'], default='none',
+                        help='output compression')
+    parser.add_argument('-i', '--info', action='store_true', help='show format of the input file only')
+
+    args = parser.parse_args()
+
+    data, format, compression = load(args.input, with_format=True)
+    count = len(data.get('map') or {})
+    print(u'%s: %s%s, %d entries' % (args.input, format, ' + ' + compression if compression else '', count))
+    if args.info:
+        return
+
+    output = args.output or args.input
+    size = dump(data, output, args.format, args.compression)
+    print(u'%s: %s%s, %d bytes' % (output, args.format,
+                                   ' + ' + args.compression if args.compression != 'none' else '', size))
+
+
+if __name__ == '__main__':
+
+    main()
+    exit(0)
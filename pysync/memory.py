@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+In-memory sync engine for tests and benchmarks. A MemoryStore plays the
+backend: items with title, body and modification time, deletions are
+recorded for incremental listings. populate() and churn() generate items
+and changes with configurable rates, ratios and key collisions. The
+put_many() and delete_many() requests of the store back the batch
+operations of the engine (relation option batch_size).
+"""
+
+import os, sys, time, random, logging, threading
+
+from .sync import Sync
+from .update import ThisFromThat
+from .records import SyncItem
+from .registry import register_translator
+
+
+class MemoryItem(object):
+
+    __slots__ = ('id', 'title', 'body', 'time')
+
+    def __init__(self, id, title, body=u'', time=0L):
+        self.id = id
+        self.title = title
+        self.body = body
+        self.time = time
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def copy(self):
+        return MemoryItem(self.id, self.title, self.body, self.time)
+
+
+class MemoryStore(object):
+    """
+    Backend of MemorySync engines: items by id and a modification clock
+    """
+    def __init__(self, prefix='m', seed=None):
+        self._prefix = prefix
+        self._random = random.Random(seed)
+        self._ids = 0
+        self._clock = 0L
+        # engines write from the threads of the executor
+        self._lock = threading.RLock()
+        self.items = {}
+        # deleted ids by deletion time
+        self.deleted = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def tick(self):
+        # unique modification times close to the wall clock (incremental listings)
+        with self._lock:
+            self._clock = max(self._clock + 1, long(time.time() * 1000))
+            return self._clock
+
+    def add(self, title, body=u''):
+        with self._lock:
+            self._ids += 1
+            item = MemoryItem(u'%s%d' % (self._prefix, self._ids), title, body, self.tick())
+            self.items[item.id] = item
+            return item
+
+    def put(self, item):
+        item = item.copy()
+        with self._lock:
+            if item.id is None:
+                # new item
+                self._ids += 1
+                item.id = u'%s%d' % (self._prefix, self._ids)
+            item.time = self.tick()
+            self.items[item.id] = item
+        return item
+
+    def delete(self, id):
+        with self._lock:
+            if self.items.pop(id, None) is not None:
+                self.deleted[id] = self.tick()
+
+    def put_many(self, items):
+        """
+        Store items in one request, returns the stored items with the
+        exception in place of a rejected item
+        """
+        result = []
+        for item in items:
+            try:
+                result.append(self.put(item))
+            except Exception as e:
+                result.append(e)
+        return result
+
+    def delete_many(self, ids):
+        """
+        Delete items in one request, returns None or the exception per id
+        """
+        result = []
+        for id in ids:
+            try:
+                result.append(self.delete(id))
+            except Exception as e:
+                result.append(e)
+        return result
+
+    def populate(self, count, key_collisions=0.0, start=0):
+        """
+        Add count items titled 'Item <n>' (n from start), a fraction of
+        key_collisions reuses the title of another item
+        """
+        for n in range(start, start + count):
+            if key_collisions and n > start and self._random.random() < key_collisions:
+                n = self._random.randrange(start, n)
+            self.add(u'Item %d' % (n), u'Body of item %d' % (n))
+        return self
+
+    def churn(self, change_rate=0.1, delete_ratio=0.0, create_ratio=0.0):
+        """
+        Modify change_rate, delete delete_ratio and create create_ratio
+        items (fractions of the current item count). Returns the numbers
+        of (changed, deleted, created) items.
+        """
+        count = len(self.items)
+        ids = sorted(self.items)
+        changed = self._random.sample(ids, int(count * change_rate))
+        for id in changed:
+            item = self.items[id]
+            item.body = u'%s.' % (item.body)
+            item.time = self.tick()
+        deleted = self._random.sample(ids, int(count * delete_ratio))
+        for id in deleted:
+            self.delete(id)
+        created = int(count * create_ratio)
+        for n in range(created):
+            self.add(u'New item %s%d' % (self._prefix, self._ids + 1))
+        return len(changed), len(deleted), created
+
+
+class MemoryFromMemory(ThisFromThat):
+
+    def __init__(self, engine, other):
+        ThisFromThat.__init__(self, engine, other, 'memory')
+
+    def update(self, other, that=None, this=None, sid=None):
+
+        that, this = ThisFromThat.update(self, other, that, this, sid)
+
+        self.assign(this, 'title', that.title)
+        self.assign(this, 'body', that.body)
+
+        if self.skip():
+            return this
+        return self._engine.put(this)
+
+
+class MemorySync(Sync):
+    """
+    Sync engine on a MemoryStore, options: label, key (default: title)
+    and the options of Sync
+    """
+    api_calls = {'get': 1, 'create': 1, 'update': 1, 'delete': 1}
+    api_latency = 0.0
+
+    supports_digests = True
+
+    @staticmethod
+    def session(options, _logger):
+        return MemoryStore(options.get('prefix', 'm'), options.get('seed'))
+
+    def __init__(self, store, options, logger=None):
+
+        self._key_attribute = options.get('key', 'title')
+        Sync.__init__(self, options, logger, 'memory')
+        self._store = store
+        if self.signature is None:
+            self.options.update({'signature': {'label': options.get('label')}})
+
+    @property
+    def store(self): return self._store
+
+    @property
+    def need_last_map(self): return False
+
+    @property
+    def supports_since(self): return True
+
+    def sync_map(self, last=None, since=None):
+
+        self._reset_items()
+        for item in self._store.items.itervalues():
+            if since is None or item.time >= since:
+                if self._check_filter(item):
+                    self._add_item(item.id, self.map_item(item))
+        if since is not None and self.supports_since:
+            self._tombstones.update(id for id, time in self._store.deleted.iteritems() if time >= since)
+            self._since = since
+        return {'items': self.items}
+
+    def map_item(self, ref=None):
+        if isinstance(ref, MemoryItem):
+            return self._with_digest(SyncItem(ref.id, ref[self._key_attribute], ref.time), ref)
+        return Sync.map_item(self, ref)
+
+    def projection(self, ref):
+        return {'title': ref.title, 'body': ref.body}
+
+    def get(self):
+        item = self._prefetched()
+        if item is None:
+            item = self._store.items.get(self.key)
+        return item.copy() if item is not None else None
+
+    def create(self, other, sid=None):
+        that = other.get()
+        if that:
+            this = self._store.add(that.title)
+            return self.update(other, that, this.copy(), sid=sid)
+        return None
+
+    def put(self, item):
+        # items translated for a batch are stored by _put_many()
+        batch = getattr(self._cursor, 'batch', None)
+        if batch is not None:
+            batch.append(item)
+            return item
+        return self._store.put(item)
+
+    def _put_many(self, other, items):
+        """
+        Translate (sid, id, other id) items, new items without id, and
+        store them with one put_many() request
+        """
+        result, slots = [], []
+        batch = self._cursor.batch = []
+        try:
+            for sid, id, other_id in items:
+                self._key = id
+                other._key = other_id
+                count = len(batch)
+                item = None
+                try:
+                    if id is None:
+                        that = other.get()
+                        if that:
+                            item = self.update(other, that, MemoryItem(None, that.title), sid=sid)
+                    else:
+                        item = self.update(other, sid=sid)
+                except Exception as e:
+                    self.logger.exception(u'%s: Error translating [%s] from %s' % (self.class_name, other_id, other.class_name))
+                result.append(item)
+                slots.append(count if len(batch) > count else None)
+        finally:
+            self._cursor.batch = None
+
+        stored = self._store.put_many(batch) if batch else []
+        for n, slot in enumerate(slots):
+            if slot is None or result[n] is None:
+                continue
+            if isinstance(stored[slot], Exception):
+                self.logger.error(u'%s: Error storing [%s]: %s' % (self.class_name, items[n][2], stored[slot]))
+                result[n] = None
+            else:
+                result[n] = self.map_item(stored[slot])
+        return result
+
+    def create_many(self, other, items):
+        return self._put_many(other, [(sid, None, id) for sid, id in items])
+
+    def update_many(self, other, items):
+        return self._put_many(other, items)
+
+    def delete(self, sid=None):
+        self._store.delete(self.key)
+        Sync.delete(self, sid)
+
+    def delete_many(self, items):
+        errors = self._store.delete_many([id for sid, id in items])
+        for (sid, id), error in zip(items, errors):
+            if error is not None:
+                self.logger.error(u'%s: Error deleting [%s]: %s' % (self.class_name, id, error))
+                continue
+            self._key = id
+            Sync.delete(self, sid)
+
+    def changed(self, sync):
+        return Sync.changed(self, sync)
+
+
+register_translator(MemorySync, MemorySync, MemoryFromMemory)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Phase timers, counters and histograms of a relation run. With the metrics
+option (--metrics DIR) each run writes a JSON summary <relation>.json and
+a Prometheus textfile pysync_<relation>.prom to DIR. With metrics_aggregate
+the totals of the previous summary are carried forward, so the counters
+and histograms of the textfile accumulate over the runs of a daemon or
+cron job.
+"""
+
+import os, sys, time, json, threading
+from contextlib import contextmanager
+
+
+class Histogram(object):
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(buckets or Histogram.BUCKETS)
+        # cumulative counts per upper bound
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other):
+        if other.buckets != self.buckets:
+            raise ValueError(u'Histogram buckets differ')
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def to_dict(self):
+        return {'buckets': list(self.buckets), 'counts': self.counts, 'count': self.count, 'sum': self.sum}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data['buckets'])
+        histogram.counts = list(data['counts'])
+        histogram.count = data['count']
+        histogram.sum = data['sum']
+        return histogram
+
+
+class Metrics(object):
+    """
+    Metrics of one relation run (or the totals of several runs). Counters
+    and histograms are keyed by name and labels, updates are thread safe.
+    """
+    def __init__(self, relation=None):
+
+        self._relation = relation
+        self._lock = threading.Lock()
+        self._runs = 1
+        self._started = time.time()
+        self._finished = None
+        self._success = None
+        self._phases = {}
+        self._counters = {}
+        self._histograms = {}
+        # MemoryTracker of --profile-memory
+        self.memory = None
+
+    @property
+    def relation(self): return self._relation
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time a phase of the run, repeated phases are summed up
+        """
+        start = time.time()
+        if self.memory is not None:
+            self.memory.start(name)
+        try:
+            yield
+        finally:
+            if self.memory is not None:
+                self.memory.stop(name)
+            with self._lock:
+                self._phases[name] = self._phases.get(name, 0.0) + time.time() - start
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Observe the duration of a block in the histogram name
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(name, time.time() - start, **labels)
+
+    def count(self, name, value=1, **labels):
+        key = Metrics._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = Metrics._key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(value)
+
+    def phases(self): return dict(self._phases)
+
+    def counter(self, name, **labels):
+        return self._counters.get(Metrics._key(name, labels), 0)
+
+    def histogram(self, name, **labels):
+        return self._histograms.get(Metrics._key(name, labels))
+
+    def finish(self, success):
+        self._finished = time.time()
+        self._success = bool(success)
+
+    @property
+    def duration(self):
+        return (self._finished or time.time()) - self._started
+
+    def merge(self, other):
+        """
+        Add the runs, phases, counters and histograms of other
+        """
+        self._runs += other._runs
+        for name, seconds in other._phases.items():
+            self._phases[name] = self._phases.get(name, 0.0) + seconds
+        for key, value in other._counters.items():
+            self._counters[key] = self._counters.get(key, 0) + value
+        for key, histogram in other._histograms.items():
+            if key in self._histograms:
+                self._histograms[key].merge(histogram)
+            else:
+                self._histograms[key] = Histogram.from_dict(histogram.to_dict())
+        return self
+
+    def to_dict(self):
+        return {'relation': self._relation, 'runs': self._runs, 'started': self._started,
+                'finished': self._finished, 'success': self._success, 'duration': self.duration,
+                'phases': self._phases,
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in sorted(self._counters.items())],
+                'histograms': [dict(histogram.to_dict(), name=name, labels=dict(labels))
+                               for (name, labels), histogram in sorted(self._histograms.items())]}
+
+    @classmethod
+    def from_dict(cls, data):
+        metrics = cls(data.get('relation'))
+        metrics._runs = data.get('runs', 1)
+        metrics._started = data.get('started')
+        metrics._finished = data.get('finished')
+        metrics._success = data.get('success')
+        metrics._phases = dict(data.get('phases', {}))
+        for counter in data.get('counters', []):
+            metrics._counters[Metrics._key(counter['name'], counter['labels'])] = counter['value']
+        for histogram in data.get('histograms', []):
+            metrics._histograms[Metrics._key(histogram['name'], histogram['labels'])] = \
+                Histogram.from_dict(histogram)
+        return metrics
+
+    @staticmethod
+    def _labels(labels):
+        return u'{%s}' % (u','.join(u'%s="%s"' % (name, unicode(value).replace('\\', '\\\\').replace('"', '\\"'))
+                                    for name, value in sorted(labels.items())))
+
+    def prometheus(self, total=None):
+        """
+        Prometheus text format: the phases of this run as gauges, counters
+        and histograms from total (default: this run)
+        """
+        total = total or self
+        relation = {'relation': self._relation}
+        lines = []
+
+        def metric(name, kind, help, samples):
+            lines.append(u'# HELP pysync_%s %s' % (name, help))
+            lines.append(u'# TYPE pysync_%s %s' % (name, kind))
+            for suffix, labels, value in samples:
+                lines.append(u'pysync_%s%s%s %s' % (name, suffix, Metrics._labels(dict(relation, **labels)),
+                                                    repr(float(value))))
+
+        metric('last_run_timestamp_seconds', 'gauge', 'Start time of the last run',
+               [('', {}, self._started)])
+        metric('last_run_duration_seconds', 'gauge', 'Duration of the last run',
+               [('', {}, self.duration)])
+        metric('last_run_success', 'gauge', 'Result of the last run',
+               [('', {}, 1 if self._success else 0)])
+        metric('phase_seconds', 'gauge', 'Duration of the phases of the last run',
+               [('', {'phase': name}, seconds) for name, seconds in sorted(self._phases.items())])
+        metric('runs_total', 'counter', 'Number of runs', [('', {}, total._runs)])
+        metric('phase_seconds_total', 'counter', 'Total duration of the phases',
+               [('', {'phase': name}, seconds) for name, seconds in sorted(total._phases.items())])
+
+        counters = {}
+        for (name, labels), value in total._counters.items():
+            counters.setdefault(name, []).append(('', dict(labels), value))
+        for name in sorted(counters):
+            metric(name + '_total', 'counter', name.replace('_', ' ').capitalize(), sorted(counters[name]))
+
+        histograms = {}
+        for (name, labels), histogram in total._histograms.items():
+            histograms.setdefault(name, []).append((dict(labels), histogram))
+        for name in sorted(histograms):
+            samples = []
+            for labels, histogram in sorted(histograms[name]):
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    samples.append(('_bucket', dict(labels, le=repr(float(bound))), count))
+                samples.append(('_bucket', dict(labels, le='+Inf'), histogram.count))
+                samples.append(('_sum', labels, histogram.sum))
+                samples.append(('_count', labels, histogram.count))
+            metric(name, 'histogram', name.replace('_', ' ').capitalize(), samples)
+
+        return u'\n'.join(lines) + u'\n'
+
+    def export(self, path, aggregate=False):
+        """
+        Write the JSON summary and the Prometheus textfile of the relation
+        to the directory path. Returns the totals.
+        """
+        from pysync.mapfile import replace
+
+        path = os.path.expanduser(path)
+        summary = os.path.join(path, u'%s.json' % (self._relation))
+
+        total = Metrics.from_dict(self.to_dict())
+        if aggregate and os.path.isfile(summary):
+            try:
+                with open(summary, 'rb') as fp:
+                    total.merge(Metrics.from_dict(json.load(fp)['total']))
+            except (ValueError, KeyError):
+                # unreadable summary: start again
+                pass
+
+        for name, content in [(summary, json.dumps({'last': self.to_dict(), 'total': total.to_dict()}, indent=4)),
+                              (os.path.join(path, u'pysync_%s.prom' % (self._relation)),
+                               self.prometheus(total).encode('utf-8'))]:
+            with open(name + '.tmp', 'wb') as fp:
+                fp.write(content)
+            replace(name + '.tmp', name)
+
+        return total
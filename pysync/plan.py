@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, sys, time, json, codecs, math
+
+
+class SyncPlan(object):
+    """
+    Operations computed by PySync.plan() from the engine listings and the
+    stored sync map, applied by PySync.execute(). Each operation is a
+    plain dict and the plan can be stored as JSON:
+
+        op      match, keep, create, update, undo or delete
+        sid     sync map entry (None for strict unidirectional deletes)
+        lr      side the operation writes to (or None for match/keep)
+        id      item id on the lr side (left id for match/keep)
+        source  item id on the other side
+    """
+
+    OPERATIONS = ['match', 'keep', 'create', 'update', 'undo', 'delete']
+
+    # operations performing backend writes
+    WRITES = ['create', 'update', 'undo', 'delete']
+
+    def __init__(self, initial=False, direction=None, operations=None, listed=None):
+        self.initial = initial
+        self.direction = direction
+        self.operations = operations or []
+        # start times of the engine listings by side (incremental watermarks)
+        self.listed = listed or {}
+
+    def __len__(self): return len(self.operations)
+
+    def __iter__(self): return iter(self.operations)
+
+    def add(self, op, sid, lr=None, id=None, source=None):
+        self.operations.append({'op': op, 'sid': sid, 'lr': lr, 'id': id, 'source': source})
+
+    @property
+    def writes(self):
+        return [operation for operation in self.operations if operation['op'] in self.WRITES]
+
+    def counts(self):
+        counts = {'left': {}, 'right': {}, None: {}}
+        for operation in self.operations:
+            side = counts[operation['lr']]
+            side[operation['op']] = side.get(operation['op'], 0) + 1
+        return counts
+
+    def estimate(self, left, right):
+        """
+        Estimated number of API calls and time per engine, based on the
+        api_calls and api_latency declarations of the engine classes
+        """
+        engines = {'left': left, 'right': right}
+        reverse = {'left': 'right', 'right': 'left'}
+        calls = {'left': 0, 'right': 0}
+
+        for operation in self.writes:
+            lr = operation['lr']
+            op = 'update' if operation['op'] == 'undo' else operation['op']
+            calls[lr] += engines[lr].api_calls.get(op, 1)
+            if op in ['create', 'update']:
+                # load the source item
+                calls[reverse[lr]] += engines[reverse[lr]].api_calls.get('get', 1)
+
+        estimate = {}
+        for lr in ['left', 'right']:
+            estimate[lr] = {'engine': engines[lr].label,
+                            'calls': int(math.ceil(calls[lr])),
+                            'time': calls[lr] * engines[lr].api_latency}
+        return estimate
+
+    def summary(self, left, right):
+        counts = self.counts()
+        estimate = self.estimate(left, right)
+        lines = [u'%s %s sync: %d operations, %d writes' %
+                 ('Initial' if self.initial else 'Incremental', self.direction, len(self), len(self.writes))]
+        for op in ['match', 'keep']:
+            if counts[None].get(op):
+                lines.append(u'  %-8s %6d' % (op, counts[None][op]))
+        for lr in ['left', 'right']:
+            lines.append(u'  %s [%s]: %d API calls, ~%.1fs' %
+                         (lr, estimate[lr]['engine'], estimate[lr]['calls'], estimate[lr]['time']))
+            for op in self.WRITES:
+                if counts[lr].get(op):
+                    lines.append(u'    %-6s %6d' % (op, counts[lr][op]))
+        return u'\n'.join(lines)
+
+    def to_dict(self):
+        return {'initial': self.initial, 'direction': self.direction, 'operations': self.operations,
+                'listed': self.listed}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('initial', False), data.get('direction'), data.get('operations'), data.get('listed'))
+
+    def dump(self, path):
+        with codecs.open(path, 'w', encoding='utf-8') as fp:
+            json.dump(self.to_dict(), fp, indent=4, ensure_ascii=False, encoding='utf-8')
+
+    @classmethod
+    def load(cls, path):
+        with codecs.open(path, 'r', encoding='utf-8') as fp:
+            return cls.from_dict(json.load(fp))
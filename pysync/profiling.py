@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Profiling of relation runs with --profile. The run is executed under
+cProfile, the statistics are written to <map>.prof (for pstats, snakeviz
+etc.) and the top functions by cumulative time to <map>.prof.txt. Only
+the thread running the relation is profiled, executor worker threads
+(workers > 1) are not included.
+
+With --profile-memory the peak memory of each phase of the run is added
+to the summary: allocations traced by tracemalloc where available,
+otherwise the growth of the peak RSS of the process.
+"""
+
+import os, sys, time, resource, cProfile, pstats
+from StringIO import StringIO
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+class MemoryTracker(object):
+    """
+    Peak memory per phase, started and stopped by Metrics.phase()
+    """
+    def __init__(self):
+        self._peaks = {}
+        self._start = {}
+        self._tracing = False
+        if tracemalloc is not None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+
+    @property
+    def method(self): return 'tracemalloc' if tracemalloc is not None else 'rss'
+
+    @staticmethod
+    def _rss():
+        # ru_maxrss is KB on Linux, bytes on OS X
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == 'darwin' else rss * 1024
+
+    def start(self, name):
+        if tracemalloc is not None:
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.clear_traces()
+            self._start[name] = tracemalloc.get_traced_memory()[0]
+        else:
+            self._start[name] = MemoryTracker._rss()
+
+    def stop(self, name):
+        if tracemalloc is not None:
+            peak = tracemalloc.get_traced_memory()[1] - self._start.pop(name, 0)
+        else:
+            peak = MemoryTracker._rss() - self._start.pop(name, 0)
+        self._peaks[name] = max(self._peaks.get(name, 0), peak)
+
+    def peaks(self): return dict(self._peaks)
+
+    def close(self):
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+
+class Profiler(object):
+    """
+    cProfile (and optional memory tracking) of a relation run, results
+    are written to path.prof and path.prof.txt
+    """
+    def __init__(self, relation, path, top=30, memory=False):
+        self._relation = relation
+        self._path = os.path.expanduser(path)
+        self._top = int(top)
+        self._profile = cProfile.Profile()
+        self._memory = MemoryTracker() if memory else None
+        self._elapsed = 0.0
+
+    @property
+    def memory(self): return self._memory
+
+    @property
+    def files(self): return self._path + '.prof', self._path + '.prof.txt'
+
+    def runcall(self, func, *args, **kwargs):
+        start = time.time()
+        try:
+            return self._profile.runcall(func, *args, **kwargs)
+        finally:
+            self._elapsed = time.time() - start
+            if self._memory is not None:
+                self._memory.close()
+
+    def summary(self):
+        stream = StringIO()
+        stream.write('Profile of [%s]: %.3fs\n\n' % (self._relation, self._elapsed))
+        if self._memory is not None:
+            stream.write('Peak memory per phase (%s):\n' % (self._memory.method))
+            for name, peak in sorted(self._memory.peaks().items(), key=lambda item: -item[1]):
+                stream.write('  %-20s %10.1f KB\n' % (name, peak / 1024.0))
+            stream.write('\n')
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats('cumulative').print_stats(self._top)
+        return stream.getvalue()
+
+    def dump(self, logger=None):
+        """
+        Write the statistics and the summary, returns the file names
+        """
+        prof, text = self.files
+        self._profile.dump_stats(prof)
+        with open(text, 'w') as fp:
+            fp.write(self.summary())
+        if logger is not None:
+            logger.info(u'%s: profile written to %s and %s' % (self._relation, prof, text))
+        return prof, text
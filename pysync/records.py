@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compact records for engine items and sync map entries. Both support the
+dict access of the JSON map layout (item['time'], entry.get('left'), ...)
+and convert to and from it with to_dict() and from_dict():
+
+    entry   {'key': ..., 'left': {item}, 'right': {item}}
+    item    {'id': ..., 'key': ..., 'time': ..., 'extra': ..., 'digest': ...}
+
+Item keys are omitted inside entries, extra and digest if not set.
+"""
+
+_keys = {}
+
+
+def intern_key(key):
+    """
+    Shared instance of an item key (intern() doesn't support unicode)
+    """
+    if key is None:
+        return None
+    return _keys.setdefault(key, key)
+
+
+class _Record(object):
+
+    __slots__ = ()
+
+    def __getitem__(self, name):
+        if name not in self.__slots__:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __setitem__(self, name, value):
+        if name not in self.__slots__:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def __delitem__(self, name):
+        self[name] = None
+
+    def __contains__(self, name):
+        return name in self.__slots__ and getattr(self, name) is not None
+
+    def get(self, name, default=None):
+        value = getattr(self, name, None) if name in self.__slots__ else None
+        return default if value is None else value
+
+    def keys(self):
+        return [name for name in self.__slots__ if getattr(self, name) is not None]
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, _Record):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(**dict((str(name), value) for name, value in state.items()))
+
+
+class SyncItem(_Record):
+
+    __slots__ = ('id', 'key', 'time', 'extra', 'digest')
+
+    def __init__(self, id=None, key=None, time=0, extra=None, digest=None):
+        self.id = id
+        self.key = intern_key(key)
+        self.time = int(time or 0)
+        self.extra = extra
+        self.digest = digest
+
+    def __setitem__(self, name, value):
+        if name == 'key':
+            value = intern_key(value)
+        elif name == 'time':
+            value = int(value or 0)
+        _Record.__setitem__(self, name, value)
+
+    def copy(self, **kwargs):
+        item = SyncItem(self.id, self.key, self.time, self.extra, self.digest)
+        for name in kwargs:
+            item[name] = kwargs[name]
+        return item
+
+    def to_dict(self):
+        data = {'id': self.id, 'time': self.time}
+        for name in ['key', 'extra', 'digest']:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        if data is None or isinstance(data, SyncItem):
+            return data
+        return cls(data.get('id'), data.get('key'), data.get('time'), data.get('extra'), data.get('digest'))
+
+    of = from_dict
+
+
+class SyncEntry(_Record):
+
+    __slots__ = ('key', 'left', 'right')
+
+    def __init__(self, key=None, left=None, right=None):
+        self.key = intern_key(key)
+        self.left = SyncItem.of(left)
+        self.right = SyncItem.of(right)
+
+    def __setitem__(self, name, value):
+        if name == 'key':
+            value = intern_key(value)
+        elif name in ['left', 'right']:
+            value = SyncItem.of(value)
+        _Record.__setitem__(self, name, value)
+
+    def keys(self):
+        # sides are part of the layout even if missing
+        return (['key'] if self.key is not None else []) + ['left', 'right']
+
+    def to_dict(self):
+        data = {'left': self.left.to_dict() if self.left is not None else None,
+                'right': self.right.to_dict() if self.right is not None else None}
+        if self.key is not None:
+            data['key'] = self.key
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        if data is None or isinstance(data, SyncEntry):
+            return data
+        return cls(data.get('key'), data.get('left'), data.get('right'))
+
+    of = from_dict
+
+
+def to_layout(value):
+    """
+    json.dumps(default=...) hook for records
+    """
+    if isinstance(value, _Record):
+        return value.to_dict()
+    raise TypeError(repr(value) + ' is not JSON serializable')
+
+
+def map_to_layout(sync):
+    """
+    Sync map with records in the JSON layout
+    """
+    if sync.get('map') is None:
+        return sync
+    data = dict(sync)
+    data['map'] = dict((sid, entry.to_dict() if isinstance(entry, _Record) else entry)
+                       for sid, entry in sync['map'].iteritems())
+    return data
+
+
+def map_from_layout(sync):
+    """
+    Sync map from the JSON layout with SyncEntry records
+    """
+    if sync.get('map') is not None:
+        sync['map'] = dict((sid, SyncEntry.of(entry) if isinstance(entry, dict) else entry)
+                           for sid, entry in sync['map'].iteritems())
+    return sync
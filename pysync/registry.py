@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Registry of the ThisFromThat translators by (target engine, source
+engine) class. Lookups follow the class hierarchy of both engines and
+are cached per class pair, engines keep the translator instances for
+the items of a relation (see Sync.translator()).
+
+Engines of other packages register their translators with
+
+    from pysync import register_translator
+    register_translator(MySync, OxTaskSync, MySyncFromOxTask)
+"""
+
+import threading
+
+_lock = threading.Lock()
+_translators = {}
+_cache = {}
+_defaults = []
+
+
+def register_translator(engine, other, translator):
+    """
+    Use the translator class for updates of engine items from other
+    engine items (engine and other are Sync classes)
+    """
+    with _lock:
+        _translators[(engine, other)] = translator
+        _cache.clear()
+
+
+def unregister_translator(engine, other):
+    with _lock:
+        _translators.pop((engine, other), None)
+        _cache.clear()
+
+
+def _register_defaults():
+    # deferred: the engine packages import pysync
+    from oxsync import OxTaskSync, OxTaskFromEvernote, OxTaskFromToodldo, OxTaskFromFile
+    from tdsync import ToodledoSync, ToodledoFromOxTask, ToodledoFromEvernote, ToodledoFromFile
+    from ensync import EnClientSync, EvernoteFromOxTask, EvernoteFromToodledo, EvernoteFromFile
+    from fssync import FileSync, FileFromFile, FileFromOxTask, FileFromToodledo, FileFromEvernote
+
+    for engine, other, translator in [
+            (ToodledoSync, OxTaskSync, ToodledoFromOxTask),
+            (ToodledoSync, EnClientSync, ToodledoFromEvernote),
+            (ToodledoSync, FileSync, ToodledoFromFile),
+            (EnClientSync, OxTaskSync, EvernoteFromOxTask),
+            (EnClientSync, ToodledoSync, EvernoteFromToodledo),
+            (EnClientSync, FileSync, EvernoteFromFile),
+            (OxTaskSync, EnClientSync, OxTaskFromEvernote),
+            (OxTaskSync, ToodledoSync, OxTaskFromToodldo),
+            (OxTaskSync, FileSync, OxTaskFromFile),
+            (FileSync, FileSync, FileFromFile),
+            (FileSync, OxTaskSync, FileFromOxTask),
+            (FileSync, ToodledoSync, FileFromToodledo),
+            (FileSync, EnClientSync, FileFromEvernote)]:
+        # explicit registrations take precedence
+        _translators.setdefault((engine, other), translator)
+
+
+def translator_class(engine, other):
+    """
+    Translator class for updates of engine from other (None if not
+    supported), the most specific registration of the engine classes wins
+    """
+    key = (engine.__class__, other.__class__)
+    if key in _cache:
+        return _cache[key]
+
+    with _lock:
+        if not _defaults:
+            _register_defaults()
+            _defaults.append(True)
+        translator = None
+        for engine_class in key[0].__mro__:
+            for other_class in key[1].__mro__:
+                translator = _translators.get((engine_class, other_class))
+                if translator is not None:
+                    break
+            if translator is not None:
+                break
+        _cache[key] = translator
+    return translator
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+SQLite sync map store, selected with the relation option map_store=sqlite.
+The map file is a database with the sync map entries and the metadata of
+the last run. Entries are stored per generation: a run writes the new map
+as the next generation, committed per sid, and the previous generation is
+dropped when the run finishes. The entries committed by an interrupted
+run are folded into the current map when the store is opened again.
+"""
+
+import os, sys, json, sqlite3, logging
+from collections import MutableMapping
+
+from pysync.records import SyncEntry, SyncItem, to_layout
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)',
+    'CREATE TABLE IF NOT EXISTS entries (sid TEXT NOT NULL, generation INTEGER NOT NULL, key TEXT, '
+    'left_id TEXT, right_id TEXT, left TEXT, right TEXT, PRIMARY KEY (sid, generation))',
+    'CREATE INDEX IF NOT EXISTS entries_left ON entries (left_id, generation)',
+    'CREATE INDEX IF NOT EXISTS entries_right ON entries (right_id, generation)'
+]
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, encoding='utf-8', default=to_layout) if value is not None else None
+
+
+def _loads(value):
+    return json.loads(value) if value is not None else None
+
+
+def _id(item):
+    return unicode(item['id']) if item and item.get('id') is not None else None
+
+
+class SyncEntries(MutableMapping):
+    """
+    Dict view of one generation of sync map entries. Entries are copies:
+    modified entries must be stored again with entries[sid] = entry.
+    """
+    def __init__(self, store, generation):
+        self._store = store
+        self._generation = generation
+
+    @property
+    def generation(self): return self._generation
+
+    def _execute(self, sql, args=()):
+        return self._store.db.execute(sql, args)
+
+    def __getitem__(self, sid):
+        row = self._execute('SELECT key, left, right FROM entries WHERE sid = ? AND generation = ?',
+                            (sid, self._generation)).fetchone()
+        if row is None:
+            raise KeyError(sid)
+        return self._entry(row)
+
+    @staticmethod
+    def _entry(row):
+        return SyncEntry(row[0], _loads(row[1]), _loads(row[2]))
+
+    def __setitem__(self, sid, entry):
+        self._execute('INSERT OR REPLACE INTO entries (sid, generation, key, left_id, right_id, left, right) '
+                      'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                      (sid, self._generation, entry.get('key'), _id(entry.get('left')), _id(entry.get('right')),
+                       _dumps(entry.get('left')), _dumps(entry.get('right'))))
+
+    def __delitem__(self, sid):
+        if self._execute('DELETE FROM entries WHERE sid = ? AND generation = ?',
+                         (sid, self._generation)).rowcount == 0:
+            raise KeyError(sid)
+
+    def __contains__(self, sid):
+        return self._execute('SELECT 1 FROM entries WHERE sid = ? AND generation = ?',
+                             (sid, self._generation)).fetchone() is not None
+
+    def __iter__(self):
+        for row in self._execute('SELECT sid FROM entries WHERE generation = ?', (self._generation,)).fetchall():
+            yield row[0]
+
+    def __len__(self):
+        return self._execute('SELECT COUNT(*) FROM entries WHERE generation = ?', (self._generation,)).fetchone()[0]
+
+    def iteritems(self):
+        for row in self._execute('SELECT sid, key, left, right FROM entries WHERE generation = ?',
+                                 (self._generation,)):
+            yield row[0], self._entry(row[1:])
+
+    def find(self, lr, id):
+        """
+        Sid of the entry with item id on the left or right side
+        """
+        row = self._execute('SELECT sid FROM entries WHERE %s_id = ? AND generation = ?' % (lr),
+                            (unicode(id), self._generation)).fetchone()
+        return row[0] if row is not None else None
+
+    def side(self, lr):
+        """
+        Items of the left or right side by item id (PySync.last_map)
+        """
+        items = {}
+        for row in self._execute('SELECT %s FROM entries WHERE generation = ? AND %s IS NOT NULL' % (lr, lr),
+                                 (self._generation,)):
+            item = SyncItem.of(_loads(row[0]))
+            items[item.id] = item
+        return items
+
+    def to_dict(self):
+        return dict(self.iteritems())
+
+
+class SyncStore(object):
+    """
+    SQLite database with the sync map entries and metadata of a relation
+    """
+    def __init__(self, path, logger=None):
+
+        self._path = os.path.expanduser(path)
+        self._logger = logger or logging.getLogger('pysync')
+        self._db = sqlite3.connect(self._path)
+        self._db.text_factory = unicode
+        self._db.execute('PRAGMA synchronous = NORMAL')
+        for sql in SCHEMA:
+            self._db.execute(sql)
+        self.recover()
+
+    @property
+    def path(self): return self._path
+
+    @property
+    def db(self): return self._db
+
+    def get_meta(self, name, default=None):
+        row = self._db.execute('SELECT value FROM meta WHERE name = ?', (name,)).fetchone()
+        return _loads(row[0]) if row is not None else default
+
+    def set_meta(self, name, value):
+        self._db.execute('INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)', (name, _dumps(value)))
+
+    @property
+    def generation(self): return self.get_meta('generation', 0)
+
+    @property
+    def initialized(self): return self.generation > 0
+
+    @property
+    def entries(self): return SyncEntries(self, self.generation) if self.initialized else None
+
+    def load(self):
+        """
+        Sync map as used by PySync: metadata with the entries view in 'map'
+        """
+        sync = {}
+        for name, value in self._db.execute('SELECT name, value FROM meta WHERE name != ?', ('generation',)):
+            sync[name] = _loads(value)
+        sync['map'] = self.entries
+        return sync
+
+    def save(self, sync):
+        """
+        Store the metadata of a sync map and commit
+        """
+        for name in sync:
+            if name not in ['map', 'generation']:
+                self.set_meta(name, sync[name])
+        self.commit()
+
+    def recover(self):
+        """
+        Fold the entries committed by an unfinished run into the current
+        generation, returns the number of recovered entries. Sides missing
+        in an entry of the unfinished run are kept from the current map,
+        incomplete new pairs are dropped.
+        """
+        generation = self.generation
+        rows = self._db.execute('SELECT sid, key, left_id, right_id, left, right FROM entries '
+                                'WHERE generation > ? ORDER BY generation', (generation,)).fetchall()
+        recovered = 0
+        if rows and generation > 0:
+            for sid, key, left_id, right_id, left, right in rows:
+                current = self._db.execute('SELECT key, left_id, right_id, left, right FROM entries '
+                                           'WHERE sid = ? AND generation = ?', (sid, generation)).fetchone()
+                if current is not None:
+                    key = key if key is not None else current[0]
+                    if left is None:
+                        left_id, left = current[1], current[3]
+                    if right is None:
+                        right_id, right = current[2], current[4]
+                if left is None or right is None:
+                    # pair not completed by the run
+                    continue
+                recovered += 1
+                self._db.execute('INSERT OR REPLACE INTO entries (sid, generation, key, left_id, right_id, left, right) '
+                                 'VALUES (?, ?, ?, ?, ?, ?, ?)', (sid, generation, key, left_id, right_id, left, right))
+            self._logger.warning(u'Recovered %d sync map entries of an unfinished run from %s' % (recovered, self._path))
+        self._db.execute('DELETE FROM entries WHERE generation > ?', (generation,))
+        self._db.commit()
+        return recovered
+
+    def begin(self, initial=False):
+        """
+        Entries view for the map of a new run. The new generation of an
+        initial sync is current at once, otherwise it replaces the last
+        map with finish().
+        """
+        self.recover()
+        generation = self.generation + 1
+        if initial:
+            self._db.execute('DELETE FROM entries')
+            self.set_meta('generation', generation)
+        self.commit()
+        return SyncEntries(self, generation)
+
+    def finish(self, entries):
+        self.set_meta('generation', entries.generation)
+        self._db.execute('DELETE FROM entries WHERE generation < ?', (entries.generation,))
+        self.commit()
+        return entries
+
+    def commit(self):
+        self._db.commit()
+
+    def last_map(self, lr):
+        entries = self.entries
+        return entries.side(lr) if entries is not None else None
+
+    def force_update(self, lr):
+        """
+        Reset the timestamps of one side to force updates on the next run
+        """
+        generation = self.generation
+        rows = self._db.execute('SELECT sid, %s FROM entries WHERE generation = ? AND %s IS NOT NULL' % (lr, lr),
+                                (generation,)).fetchall()
+        updates = []
+        for sid, value in rows:
+            item = _loads(value)
+            item['time'] = 0L
+            updates.append((_dumps(item), sid, generation))
+        self._db.executemany('UPDATE entries SET %s = ? WHERE sid = ? AND generation = ?' % (lr), updates)
+        self.commit()
+        return len(updates)
+
+    def clear(self):
+        self._db.execute('DELETE FROM entries')
+        self.set_meta('generation', 0)
+        self.commit()
+
+    def check(self, deleted):
+        """
+        Remove incomplete entries and the entries of deleted items,
+        returns the removed (sid, key) pairs
+        """
+        generation = self.generation
+        removed = self._db.execute('SELECT sid, key FROM entries WHERE generation = ? AND '
+                                   '(left IS NULL OR right IS NULL)', (generation,)).fetchall()
+        self._db.execute('DELETE FROM entries WHERE generation = ? AND (left IS NULL OR right IS NULL)',
+                         (generation,))
+        for sid in deleted:
+            row = self._db.execute('SELECT sid, key FROM entries WHERE sid = ? AND generation = ?',
+                                   (sid, generation)).fetchone()
+            if row is not None:
+                removed.append(row)
+                self._db.execute('DELETE FROM entries WHERE sid = ? AND generation = ?', (sid, generation))
+        self.commit()
+        return removed
+
+    def count(self):
+        entries = self.entries
+        return len(entries) if entries is not None else 0
+
+    def close(self):
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
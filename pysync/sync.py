@@ -1,11 +1,16 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import os, sys, time, logging, json
+import os, sys, time, logging, json, threading, hashlib
 from pyutils import LogAdapter, get_logger, strflocal, utf8
 
 from abc import ABCMeta, abstractmethod, abstractproperty
 
+from .records import SyncItem, to_layout
+from .log import SyncLogger
+from .filters import compile_filter, compile_legacy
+from .registry import translator_class
+
 class SyncError(Exception):
     pass
 
@@ -19,6 +24,21 @@ class Sync(object):
 
     __metaclass__ = ABCMeta
 
+    # engine provides projection() for content fingerprints
+    supports_digests = False
+
+    # session attributes with remote calls of their own, see SessionProxy
+    session_services = []
+
+    # estimated API calls per operation and seconds per call, see SyncPlan.estimate()
+    api_calls = {'get': 1, 'create': 2, 'update': 2, 'delete': 1}
+    api_latency = 0.25
+
+    # engine ignored filter_expr/filter_module in earlier releases: filters
+    # apply only with the [apply_filter] option, unlisted items are deleted
+    # on the other side
+    filter_opt_in = False
+
     def __init__(self, options, logger=None, package='sync'):
 
         if logger is None:
@@ -26,20 +46,62 @@ class Sync(object):
         else:
             self._logger = logger
 
-        self._adapter = LogAdapter(self._logger, {'package': package})
+        self._adapter = SyncLogger(self._logger, package, options.get('log_sample'))
 
         self._options = options
+
+        # item cursor and counters are shared with executor threads
+        self._cursor = threading.local()
+        self._lock = threading.RLock()
+
         self._key = None
         self._items = {}
 
+        # key index for find_key(): normalized key => item id
+        self._index = {}
+        self._duplicates = {}
+        self._key_normalize = options.get('key_normalize', 'none')
+        self._key_duplicates = options.get('key_duplicates', 'first')
+
+        if int(options.get('batch_size', 1)) > 1 and not self.supports_batches:
+            self.logger.warning(u'%s: No batch operations, ignoring batch_size', options.get('label'))
+
+        if options.get('api_latency') is not None:
+            self.api_latency = float(options['api_latency'])
+
+        # listing filter, compiled once: None without filter
         self._filter_expr = options.get('filter_expr')
         self._filter_module = options.get('filter_module')
+        try:
+            self._filter = compile_filter(self._filter_expr, self._filter_module, self)
+        except (ValueError, ImportError, IOError) as e:
+            self._filter = compile_legacy(self._filter_expr, self) if self._filter_expr else None
+            if self._filter is None:
+                raise SyncInitError(u'Invalid filter for [%s]: %s' % (options.get('label'), e))
+            self.logger.warning(u'%s: Deprecated filter expression [%s] (%s), evaluated unrestricted '
+                                u'until the next release' % (options.get('label'), self._filter_expr, e))
+        if self._filter is not None and self.filter_opt_in and not self.flag('apply_filter'):
+            self.logger.warning(u'%s: Ignoring filter, set apply_filter to enable it', options.get('label'))
+            self._filter = None
+
+        # incremental listings: sync_map(since=...) sets _since and the
+        # ids of items deleted since then
+        self._since = None
+        self._tombstones = set()
+        self._incremental = self.flag('incremental')
+
+        # content fingerprints and items fetched ahead of get()
+        self._digests = {}
+        self._fetched = {}
 
         self._deleted = {}
         self._modified = {}
         self._created = {}
 
-        self._changes = {'deleted': 0, 'created': 0, 'modified': 0}
+        self._changes = {'deleted': 0, 'created': 0, 'modified': 0, 'unchanged': 0, 'skipped': 0}
+
+        # Metrics of the relation run, set by PySync
+        self._metrics = None
 
     def __repr__(self): return self.label
 
@@ -63,6 +125,54 @@ class Sync(object):
     @property
     def items(self): return self._items
 
+    def flag(self, name, default=False):
+        value = self._options.get(name, default)
+        if isinstance(value, basestring):
+            return value.lower() not in ['false', 'off', 'no', '0', 'none', 'null', '']
+        return bool(value)
+
+    @property
+    def workers(self): return int(self._options.get('workers', 1))
+
+    @property
+    def metrics(self): return self._metrics
+
+    @metrics.setter
+    def metrics(self, value): self._metrics = value
+
+    @property
+    def supports_since(self): return False
+
+    @property
+    def fetch_digests(self): return self.supports_digests and self.flag('fingerprints', True)
+
+    @property
+    def incremental_listing(self): return self._incremental and self.supports_since
+
+    @property
+    def incremental(self): return self._since is not None
+
+    @property
+    def tombstones(self): return self._tombstones
+
+    @property
+    def supports_batches(self):
+        # multi-item endpoints: create_many(), update_many() or delete_many() overridden
+        cls = self.__class__
+        return any(getattr(cls, name).__func__ is not getattr(Sync, name).__func__
+                   for name in ['create_many', 'update_many', 'delete_many'])
+
+    @property
+    def batch_size(self):
+        # the per-item fallbacks save no round trips
+        return int(self._options.get('batch_size', 1)) if self.supports_batches else 1
+
+    @property
+    def _key(self): return getattr(self._cursor, 'key', None)
+
+    @_key.setter
+    def _key(self, value): self._cursor.key = value
+
     @property
     def key(self): return self._key
 
@@ -72,46 +182,222 @@ class Sync(object):
             return utf8(self._items[self._key]['key'])
         return None
 
+    def normalize_key(self, key):
+        if key is None or self._key_normalize in [None, 'none']:
+            return key
+        if not isinstance(key, unicode):
+            key = utf8(key)
+        if self._key_normalize == 'strip':
+            return key.strip()
+        if self._key_normalize == 'lower':
+            return key.lower()
+        if self._key_normalize == 'fold':
+            return u' '.join(key.split()).lower()
+        raise SyncInitError(u'Invalid key normalization [%s]' % (self._key_normalize))
+
+    def _reset_items(self):
+        self._items = {}
+        self._index = {}
+        self._duplicates = {}
+        self._since = None
+        self._tombstones = set()
+        self._digests = {}
+        self._fetched = {}
+
+    def restore(self, items):
+        """
+        Add items not returned by an incremental listing (and not deleted)
+        from the last sync map: they are unchanged since the last run
+        """
+        count = 0
+        for item in items:
+            if item['id'] not in self._items and item['id'] not in self._tombstones:
+                item = SyncItem.of(item)
+                self._items[item['id']] = item
+                self._index_item(item['id'], item)
+                count += 1
+        self.logger.debug(u'%s: Restored %d unchanged items', self.class_name, count)
+
+    def _index_item(self, id, item):
+        key = self.normalize_key(item.get('key'))
+        other = self._index.get(key)
+        if other is None:
+            self._index[key] = id
+        elif other != id:
+            if key not in self._duplicates:
+                self._duplicates[key] = [other]
+            self._duplicates[key].append(id)
+            error = u'%s: Duplicate key [%s] for %s' % (self.class_name, key, self._duplicates[key])
+            if self._key_duplicates == 'error':
+                raise SyncError(error)
+            self.logger.warning(error)
+
     def _add_item(self, id, item):
+            item = SyncItem.of(item)
             self._items[id] = item
-            self.logger.debug(u'%s %s %s' % (self.class_name, id, item))
+            self._index_item(id, item)
+            self.logger.item(id, u'%s %s %s', self.class_name, id, item)
 
     @abstractmethod
     def map_item(self, key=None):
         if key is None: key = self._key
         item = self._items.get(key)
         if item:
-            return {'id': item['id'], 'key': item['key'], 'time': item['time']}
+            return self._with_digest(SyncItem(item['id'], item['key'], item['time']))
             #return {'id': item._id, 'key': item._key, 'time': item._time}
         else:
             return None
 
+    def _with_digest(self, item, ref=None):
+        digest = self.digest_of(ref) if ref is not None else self._digests.get(item['id'])
+        if digest is not None:
+            item['digest'] = digest
+        return item
+
+    @staticmethod
+    def fingerprint(projection):
+        if projection is None:
+            return None
+        try:
+            data = json.dumps(projection, sort_keys=True, ensure_ascii=True, default=repr)
+        except UnicodeDecodeError:
+            data = repr(sorted(projection.items()))
+        return hashlib.sha1(data).hexdigest()
+
+    def projection(self, ref):
+        """
+        The synchronized attributes of a fully loaded item (None if the
+        engine doesn't support content fingerprints)
+        """
+        return None
+
+    def digest_of(self, ref):
+        return Sync.fingerprint(self.projection(ref))
+
+    def remember(self, ref, key=None):
+        """
+        Record the fingerprint of a loaded item
+        """
+        if key is None: key = self._key
+        digest = self.digest_of(ref)
+        if digest is not None:
+            self._digests[key] = digest
+        return digest
+
+    def digest(self, key=None):
+        """
+        Fingerprint of the current content of an item. Loads the item if
+        necessary and keeps it for the next get() of the item.
+        """
+        if key is None: key = self._key
+        if key not in self._digests:
+            self._key = key
+            ref = self.get()
+            if ref is None:
+                return None
+            self._fetched[key] = ref
+            self.remember(ref, key)
+        return self._digests.get(key)
+
+    def _prefetched(self, key=None):
+        if key is None: key = self._key
+        return self._fetched.pop(key, None)
+
+    def get_many(self, ids):
+        """
+        Full items of ids as {id: item}, missing or failing items are left
+        out. Engines with multi-item endpoints override this, the default
+        calls get() for the ids on up to [workers] threads.
+        """
+        def get(id):
+            self._key = id
+            try:
+                return id, self.get()
+            except Exception as e:
+                self.logger.item(id, u'%s: Prefetch of [%s] failed: %s', self.class_name, id, e)
+                return id, None
+
+        if self.workers > 1 and len(ids) > 1:
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(min(self.workers, len(ids)))
+            try:
+                results = pool.map(get, ids)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [get(id) for id in ids]
+
+        return dict((id, item) for id, item in results if item is not None)
+
+    def prefetch(self, ids):
+        """
+        Load the items ids ahead of the get() calls of the translators,
+        returns the number of loaded items
+        """
+        ids = [id for id in ids if id not in self._fetched]
+        if not ids:
+            return 0
+        items = self.get_many(ids)
+        self._fetched.update(items)
+        return len(items)
+
     def get_item(self, key=None):
         if key is None:
             key = self._key
         return self._items.get(key)
 
+    @property
+    def duplicates(self): return self._duplicates
+
+    def _count(self, change):
+        with self._lock:
+            self._changes[change] += 1
+
     def __delitem__(self, key):
-        del self._items[key]
+        with self._lock:
+            self._delitem(key)
+
+    def _delitem(self, key):
+        item = self._items.pop(key)
+        nkey = self.normalize_key(item.get('key'))
+        if self._index.get(nkey) == key:
+            del self._index[nkey]
+            # promote the next item with the same key
+            if nkey in self._duplicates:
+                self._duplicates[nkey].remove(key)
+                if self._duplicates[nkey]:
+                    self._index[nkey] = self._duplicates[nkey][0]
+                if len(self._duplicates[nkey]) < 2:
+                    del self._duplicates[nkey]
+        elif nkey in self._duplicates and key in self._duplicates[nkey]:
+            self._duplicates[nkey].remove(key)
+            if len(self._duplicates[nkey]) < 2:
+                del self._duplicates[nkey]
 
     def __getitem__(self, key):
         self._key = key
         return self._items.get(key)
 
+    def __contains__(self, key):
+        # dict lookup instead of the linear __iter__ fallback
+        return key in self._items
+
     def __iter__(self):
         for self._key in self._items:
             #yield self._items[self._key]
             yield self._key
 
     def find_key(self, key):
-        for id in self._items:
-            if self._items[id]['key'] == key:
-                return id
-        return None
+        key = self.normalize_key(key)
+        if key in self._duplicates and self._key_duplicates == 'none':
+            # ambiguous key: don't guess
+            return None
+        return self._index.get(key)
 
     def dump_item(self, key=None):
         if key is None: key = self._key
-        return json.dumps(self._items[key], ensure_ascii=False, encoding='utf-8')
+        return json.dumps(self._items[key], ensure_ascii=False, encoding='utf-8', default=to_layout)
 
 
     @classmethod
@@ -122,61 +408,62 @@ class Sync(object):
     def commit_sync(self, lr, opts, logger):  return opts
 
     def _check_filter(self, item):
-        ok = False
-        if self._filter_expr is not None:
-            ok = eval(self._filter_expr)
-        elif self._filter_module is not None:
-            ok = self._filter_module.check_filter(item)
-        else:
-            ok = True
-        return ok
+        return self._filter is None or self._filter(item)
 
     @abstractproperty
     def need_last_map(self): return False
 
     @abstractmethod
-    def sync_map(self, last=None): return None
+    def sync_map(self, last=None, since=None): return None
 
     @abstractmethod
     def create(self, that, sid=None): return None, None
 
+    def translator(self, other):
+        """
+        ThisFromThat translator for updates from the other engine (None
+        if not supported). Instances are created once per thread and
+        reused for the items of the relation.
+        """
+        translators = getattr(self._cursor, 'translators', None)
+        if translators is None:
+            translators = self._cursor.translators = {}
+        try:
+            return translators[other]
+        except KeyError:
+            cls = translator_class(self, other)
+            translator = translators[other] = cls(self, other) if cls is not None else None
+            return translator
+
     def update(self, other, that=None, this=None, sid=None):
 
-        from pysync import OxTaskSync, EnClientSync, ToodledoSync
-        from oxsync import OxTaskFromEvernote, OxTaskFromToodldo
-        from tdsync import ToodledoFromOxTask, ToodledoFromEvernote
-        from ensync import EvernoteFromOxTask, EvernoteFromToodledo
+        translator = self.translator(other)
+        if translator is None:
+            error = u'%s: Updating from [%s] not supported' % (self.class_name, other.class_name)
+            self.logger.error(error)
+            return None
 
         if this is None:
-            self._changes['modified'] += 1
+            self._count('modified')
         else:
-            self._changes['created'] += 1
+            self._count('created')
 
+        start = time.time()
         try:
-            if isinstance(self, ToodledoSync):
-                if isinstance(other, OxTaskSync):
-                    return self.map_item(ToodledoFromOxTask(self, other).update(other, that=that, this=this, sid=sid))
-                if isinstance(other, EnClientSync):
-                    return self.map_item(ToodledoFromEvernote(self, other).update(other, that=that, this=this, sid=sid))
-
-            if isinstance(self, EnClientSync):
-                if isinstance(other, OxTaskSync):
-                    return self.map_item(EvernoteFromOxTask(self, other).update(other, that=that, this=this, sid=sid))
-                if isinstance(other, ToodledoSync):
-                    return self.map_item(EvernoteFromToodledo(self, other).update(other, that=that, this=this, sid=sid))
-
-            if isinstance(self, OxTaskSync):
-                if isinstance(other, EnClientSync):
-                    return self.map_item(OxTaskFromEvernote(self, other).update(other, that=that, this=this, sid=sid))
-                if isinstance(other, ToodledoSync):
-                    return self.map_item(OxTaskFromToodldo(self, other).update(other, that=that, this=this, sid=sid))
+            item = self.map_item(translator.update(other, that=that, this=this, sid=sid))
         except Exception as e:
             self.logger.exception('Update failed. Check stack trace for details!')
             return None
+        finally:
+            if self._metrics is not None:
+                self._metrics.observe('translate_seconds', time.time() - start, engine=self.label)
 
-        else:
-            error = u'%s: Updating from [%s] not supported' % (self.class_name, other.class_name)
-            self.logger.error(error)
+        if translator.skipped:
+            # write elided: report as skipped instead of modified
+            with self._lock:
+                self._changes['modified'] -= 1
+                self._changes['skipped'] += 1
+        return item
 
     @abstractmethod
     def get(self):
@@ -184,10 +471,58 @@ class Sync(object):
 
     @abstractmethod
     def delete(self, sid=None):
-        self.logger.debug(u'%s: Delete %s' % (self.class_name, self.dump_item()))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.item(self.key, u'%s: Delete %s', self.class_name, self.dump_item())
         if sid is not None:
-            del self._items[self.key]
-        self._changes['deleted'] += 1
+            del self[self.key]
+        self._count('deleted')
+
+    # batch operations: engines with multi-item endpoints override these,
+    # the defaults fall back to the per-item create(), update() and delete().
+    # An item failing in a batch only drops its own sid, the items done
+    # before and after it keep their map entries.
+
+    def create_many(self, other, items):
+        """
+        Create items from other: items is a list of (sid, other id),
+        returns the list of map items (None for failed creates)
+        """
+        result = []
+        for sid, id in items:
+            other._key = id
+            try:
+                result.append(self.create(other, sid))
+            except Exception as e:
+                self.logger.exception(u'%s: Error creating [%s] from %s' % (self.class_name, id, other.class_name))
+                result.append(None)
+        return result
+
+    def update_many(self, other, items):
+        """
+        Update items from other: items is a list of (sid, id, other id),
+        returns the list of map items (None for failed updates)
+        """
+        result = []
+        for sid, id, other_id in items:
+            self._key = id
+            other._key = other_id
+            try:
+                result.append(self.update(other, sid=sid))
+            except Exception as e:
+                self.logger.exception(u'%s: Error updating [%s] from %s' % (self.class_name, id, other.class_name))
+                result.append(None)
+        return result
+
+    def delete_many(self, items):
+        """
+        Delete items: items is a list of (sid, id)
+        """
+        for sid, id in items:
+            self._key = id
+            try:
+                self.delete(sid)
+            except Exception as e:
+                self.logger.exception(u'%s: Error deleting [%s]' % (self.class_name, id))
 
     @abstractmethod
     def changed(self, sync):
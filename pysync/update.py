@@ -3,6 +3,7 @@
 
 import os, sys, time, logging, json
 from pyutils import LogAdapter, get_logger, strflocal
+from .log import SyncLogger
 
 from abc import ABCMeta, abstractmethod, abstractproperty
 
@@ -14,7 +15,9 @@ class ThisFromThat(object):
         self._engine = engine
         self._other = other
         self._update = None
-        self._adapter = LogAdapter(engine._logger, {'package': package})
+        self._dirty = set()
+        self._skipped = False
+        self._adapter = SyncLogger(engine._logger, package, engine.logger.sample)
 
     @property
     def logger(self):
@@ -28,11 +31,77 @@ class ThisFromThat(object):
     def options(self):
         return self._engine.options
 
+    @property
+    def dirty(self):
+        return self._dirty
+
+    @property
+    def skipped(self):
+        return self._skipped
+
+    @staticmethod
+    def _normalized(value):
+        if value is None or value == '' or value == 'null':
+            return None
+        if isinstance(value, str):
+            return value.decode('utf-8', 'replace')
+        if isinstance(value, (int, long)) and not isinstance(value, bool):
+            return unicode(value)
+        if isinstance(value, (list, tuple)):
+            return sorted(ThisFromThat._normalized(v) for v in value)
+        return value
+
+    @staticmethod
+    def same(value, other):
+        """
+        Compare field values, ignoring None vs. empty, str vs. unicode
+        and number vs. string differences of the backend APIs
+        """
+        return ThisFromThat._normalized(value) == ThisFromThat._normalized(other)
+
+    def touch(self, field):
+        self._dirty.add(field)
+
+    def assign(self, target, field, value):
+        """
+        Set a target field and mark it dirty if the value changed. Plain
+        dicts (OxTask._data) are set by key, other targets by attribute.
+        """
+        if type(target) is dict:
+            if self.same(target.get(field), value):
+                return False
+            target[field] = value
+        else:
+            if self.same(getattr(target, field, None), value):
+                return False
+            setattr(target, field, value)
+        self._dirty.add(field)
+        return True
+
+    def skip(self):
+        """
+        True if an update of an existing item changed no target field:
+        the translator returns the unchanged item without a remote write
+        """
+        if not self._update:
+            return False
+        if self._dirty:
+            self.logger.debug(u'%s: Changed fields %s', self.class_name, sorted(self._dirty))
+            return False
+        self.logger.debug(u'%s: No changes from %s, skipping update', self.class_name, self._other.class_name)
+        self._skipped = True
+        return True
+
     def update(self, other, that=None, this=None, sid=None):
 
         from pysync import SyncError
 
         self._update = True if this is None else False
+        self._dirty = set()
+        self._skipped = False
+
+        # DEBUG messages of the item are sampled by sid
+        self._adapter = self._adapter.bind(sid)
 
         if self._update:
 
@@ -60,7 +129,11 @@ class ThisFromThat(object):
                 return None, None
 
             title = this.title if isinstance(this.title, unicode) else this.title.decode('utf-8')
-            self.logger.debug(u'%s: Updating [%s] from %s' % (self.class_name, title, other.class_name))
+            self.logger.debug(u'%s: Updating [%s] from %s', self.class_name, title, other.class_name)
+
+        # fingerprint of the source item for the sync map
+        if that is not None:
+            self._other.remember(that)
 
         # TODO: check todo, raise exception (?)
         return that, this
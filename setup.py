@@ -9,7 +9,7 @@ version = re.search(
 setup(
     name='PySync',
     version=version,
-    packages=['pysync', 'oxsync', 'ensync', 'tdsync'],
+    packages=['pysync', 'oxsync', 'ensync', 'tdsync', 'fssync'],
     url='https://github.com/bstrebel/PySync',
     license='GPL2',
     author='Bernd Strebel',
@@ -17,5 +17,6 @@ setup(
     description='Python Sync Engine',
     long_description=open('README.md').read(),
     #install_requires=['PyUtils', 'OxAPI', 'EvernoteAPI', 'ToodledoAPI'],
-    entry_points={'console_scripts': ['pysync = pysync.core:main']}
+    entry_points={'console_scripts': ['pysync = pysync.core:main',
+                                      'pysync-map = pysync.mapfile:main']}
 )
@@ -9,9 +9,11 @@ PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
 from .sync import ToodledoSync
 from .toodledo_from_ox import ToodledoFromOxTask
 from .toodledo_from_evernote import ToodledoFromEvernote
+from .toodledo_from_file import ToodledoFromFile
 __all__ = [
 
     'ToodledoSync',
     'ToodledoFromOxTask',
-    'ToodledoFromEvernote'
+    'ToodledoFromEvernote',
+    'ToodledoFromFile'
 ]
@@ -5,10 +5,20 @@ import os, sys, time, json, re, requests, logging
 from pyutils import LogAdapter, strflocal, get_logger, utf8, string
 
 from pysync import Sync, SyncError, SyncSessionError, SyncInitError
+from pysync.records import SyncItem
 from tdapi import ToodledoAPI, ToodledoTask
 
 class ToodledoSync(Sync):
 
+    # changes are cached and sent in batches by commit_sync()
+    api_calls = {'get': 0, 'create': 0.02, 'update': 0.02, 'delete': 0.02}
+    api_latency = 0.5
+
+    # filters were applied by earlier releases as well: no apply_filter needed
+    filter_opt_in = False
+
+    supports_digests = True
+
     @staticmethod
     def compare_tags(sync, map):
 
@@ -111,16 +121,25 @@ class ToodledoSync(Sync):
     # def _check_filter(self, item):
     #     return True
 
+    # task attributes synchronized by the translators
+    projection_columns = ['title', 'note', 'startdate', 'starttime', 'duedate', 'duetime', 'remind',
+                          'status', 'priority', 'star', 'completed', 'tag', 'context', 'goal', 'location']
+
+    def projection(self, ref):
+        if isinstance(ref, ToodledoTask):
+            return dict((column, getattr(ref, column, None)) for column in self.projection_columns)
+        return None
+
     def map_item(self, ref=None):
         if isinstance(ref, ToodledoTask):
             # return {'id': ref.id, 'key': ref[self._key_attribute], 'time': ref.modified * 1000}
-            return {'id': ref._id, 'key': ref[self._key_attribute], 'time': ref._time}
+            return self._with_digest(SyncItem(ref._id, ref[self._key_attribute], ref._time), ref)
         else:
             return Sync.map_item(self, ref)
 
-    def sync_map(self, last=None):
+    def sync_map(self, last=None, since=None):
 
-        self._items = {}
+        self._reset_items()
 
         for task in self._client.get_tasks(self.folder.id):
             if self._check_filter(task):
@@ -132,6 +151,9 @@ class ToodledoSync(Sync):
         return Sync.changed(self, sync)
 
     def get(self):
+        todo = self._prefetched()
+        if todo is not None:
+            return todo
         todo = self._client.get_task(self.key)
         return todo
 
@@ -142,7 +164,7 @@ class ToodledoSync(Sync):
     def create(self, other, sid=None):
         that = other.get()
         if that:
-            self.logger.debug(u'%s: Creating task [%s] from %s' % (self.class_name, utf8(that.title), other.class_name))
+            self.logger.debug(u'%s: Creating task [%s] from %s', self.class_name, utf8(that.title), other.class_name)
             todo = self._client.create_task(title=that.title, folder=self.folder.id)
             return self.update(other, that, todo, sid=sid)
         return None
@@ -166,16 +188,20 @@ class ToodledoSync(Sync):
             if self._client.tasks._created:
                 # replace uuid from created tasks with toodledo server id
                 created = self._client.tasks._created
-                for sid in opts['sync']['map']:
-                    item = opts['sync']['map'][sid][lr]
+                map = opts['sync']['map']
+                for sid in list(map):
+                    # entries of a SyncStore are copies: write back
+                    entry = map[sid]
+                    item = entry[lr]
                     uuid = item['id']
-                    if isinstance(uuid, str):
+                    if isinstance(uuid, basestring):
                         if uuid in created:
                             item['id'] = created[uuid]['id']
                             item['time'] = created[uuid]['modified'] * 1000
                         else:
                             # create failed, remove from sync_map during check
-                            opts['sync']['map'][sid][lr] = None
+                            entry[lr] = None
+                        map[sid] = entry
 
                 self._client.tasks._created = {}
         return opts
@@ -63,9 +63,8 @@ class ToodledoFromEvernote(ThisFromThat):
 
         note = note.load()
         title = utf8(note.title)
-        if title != todo.title:
-            todo.title = title
-            self.logger.debug(u'Title changed to [%s]' % (title))
+        if self.assign(todo, 'title', title):
+            self.logger.debug(u'Title changed to [%s]', title)
 
         ########################
         # process task content #
@@ -73,7 +72,7 @@ class ToodledoFromEvernote(ThisFromThat):
 
         content = ''
         if note.contentLength > maxsize:
-            self.logger.debug(u'%s: Evernote content exceeds limit of %d KB!' % (self.class_name, maxsize/1024))
+            self.logger.debug(u'%s: Evernote content exceeds limit of %d KB!', self.class_name, maxsize/1024)
             content += 'Evernote content exceeds limit of %d KB!\n' % (maxsize/1024)
         else:
             content += note.plain.strip() + '\n\n'
@@ -81,7 +80,7 @@ class ToodledoFromEvernote(ThisFromThat):
         if self.options.get('evernote_sourceURL', True):
             if note.attributes.sourceURL:
                 if not note.attributes.sourceURL.startswith(server_url):
-                    self.logger.debug(u'%s: Updating content with source URL %s' % (self.class_name, note.attributes.sourceURL))
+                    self.logger.debug(u'%s: Updating content with source URL %s', self.class_name, note.attributes.sourceURL)
                     content += 'SOURCE: %s\n\n' % (note.attributes.sourceURL)
 
         if self.options.get('evernote_link', True):
@@ -93,9 +92,7 @@ class ToodledoFromEvernote(ThisFromThat):
             content = ensync.add_evernote_link(content, note.view_url, tag)
 
         content = utf8(content) or u''
-        if content != todo.note:
-            todo.note = content
-            # self.logger.debug(u'Note changed to [%s]' % (content[:16]))
+        self.assign(todo, 'note', content)
 
         ############################
         # process other attributes #
@@ -104,25 +101,22 @@ class ToodledoFromEvernote(ThisFromThat):
         # always update reminderTime from Evernote
         attribute = self.options.get('evernote_reminderTime')
         if attribute:
-            if note.attributes.reminderTime:
-                reminderTime = note.attributes.reminderTime/1000
-                todo[attribute] = reminderTime
-                if attribute == 'duetime':
-                    todo['duedate'] = todo['duetime']
-                if attribute == 'starttime':
-                    todo['startdate'] = todo['starttime']
-            else:
-                todo[attribute] = 0
+            reminderTime = note.attributes.reminderTime/1000 if note.attributes.reminderTime else 0
+            fields = [attribute]
             if attribute == 'duetime':
-                todo['duedate'] = todo['duetime']
+                fields.append('duedate')
             if attribute == 'starttime':
-                todo['startdate'] = todo['starttime']
-            self.logger.debug(u'%s: Updating [%s] from note reminderTime [%s]' %
-                             (self.class_name, attribute, strflocal(note.attributes.reminderTime, None)))
+                fields.append('startdate')
+            for field in fields:
+                if not self.same(todo[field], reminderTime):
+                    todo[field] = reminderTime
+                    self.touch(field)
+            self.logger.debug(u'%s: Updating [%s] from note reminderTime [%s]',
+                             self.class_name, attribute, strflocal(note.attributes.reminderTime, None))
 
         # always update reminderDoneTime and task status
         completed = note.attributes.reminderDoneTime/1000 if note.attributes.reminderDoneTime else 0
-        todo.completed = completed
+        self.assign(todo, 'completed', completed)
 
         ######################
         # process categories #
@@ -130,21 +124,21 @@ class ToodledoFromEvernote(ThisFromThat):
 
         tags = []
 
-        self.logger.debug(u'%s: Updating categories from tags %s' % (self.class_name, note.categories))
+        self.logger.debug(u'%s: Updating categories from tags %s', self.class_name, note.categories)
 
         for tag in note.tags:
             if tag == tdsync.options.get('evernote_tag_star', ','):
-                todo.star = True
-                self.logger.debug(u'Set toodledo star from [%s]' % (tag))
+                self.assign(todo, 'star', True)
+                self.logger.debug(u'Set toodledo star from [%s]', tag)
             elif tag.startswith(tdsync.options.get('evernote_tag_context', ',')):
-                todo.context = tag[1:]
-                self.logger.debug(u'Set toodledo context from [%s]' % (tag))
+                self.assign(todo, 'context', tag[1:])
+                self.logger.debug(u'Set toodledo context from [%s]', tag)
             elif tag.startswith(tdsync.options.get('evernote_tag_goal', ',')):
-                todo.goal = tag[1:]
-                self.logger.debug(u'Set toodledo goal from [%s]' % (tag))
+                self.assign(todo, 'goal', tag[1:])
+                self.logger.debug(u'Set toodledo goal from [%s]', tag)
             elif tag.startswith(tdsync.options.get('evernote_tag_location', ',')):
-                todo.location = tag[1:]
-                self.logger.debug(u'Set toodledo location from [%s]' % (tag))
+                self.assign(todo, 'location', tag[1:])
+                self.logger.debug(u'Set toodledo location from [%s]', tag)
             elif tag.startswith(tdsync.options.get('evernote_tag_status', ',')):
                 if tag[1:] not in ToodledoTask.STATUS:
                     if self.status_map.get(tag[1:]) is None:
@@ -154,23 +148,23 @@ class ToodledoFromEvernote(ThisFromThat):
                         status = self.status_map.get(tag[1:])
                 else:
                     status = ToodledoTask.STATUS.index(tag[1:])
-                    self.logger.debug(u'Set toodledo status from [%s]' % (tag))
-                todo.status = status
+                    self.logger.debug(u'Set toodledo status from [%s]', tag)
+                self.assign(todo, 'status', status)
             elif tag.startswith(tdsync.options.get('evernote_tag_priority', ',')):
                 priority = ToodledoTask.PRIORITY.get(tag[1:])
                 if priority is None:
                     self.logger.warning('Change unknown priority tag [%s] to [Low]' % (tag))
                     priority = ToodledoTask.PRIORITY.get(tag[1:], 'Low')
                 else:
-                    self.logger.debug(u'Set toodledo priority [%s] from [%s]' % (priority, tag))
-                todo.priority = priority
+                    self.logger.debug(u'Set toodledo priority [%s] from [%s]', priority, tag)
+                self.assign(todo, 'priority', priority)
             else:
                 tags.append(utf8(tag))
-                self.logger.debug(u'Set toodledo tag from [%s]' % (tag))
+                self.logger.debug(u'Set toodledo tag from [%s]', tag)
 
-        todo.tag = u''
-        if len(tags) > 0:
-            todo.tag = u','.join(tags)
+        self.assign(todo, 'tag', u','.join(tags))
 
+        # unchanged tasks are not marked as modified in the Toodledo cache
+        self.skip()
         return todo
 
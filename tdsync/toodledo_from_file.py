@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, sys, time, logging
+from pyutils import strflocal, utf8
+from pysync import ThisFromThat
+
+from tdapi import ToodledoTask
+
+
+class ToodledoFromFile(ThisFromThat):
+
+    # status names of the item (Open-Xchange) to Toodledo status
+    status_map = {
+        'Not started': ToodledoTask.STATUS.index('Next'),
+        'In progress': ToodledoTask.STATUS.index('Active'),
+        'Done': ToodledoTask.STATUS.index('None'),
+        'Waiting': ToodledoTask.STATUS.index('Waiting'),
+        'Deferred': ToodledoTask.STATUS.index('Hold')
+    }
+
+    priority_map = {
+        'Low': ToodledoTask.PRIORITY['Low'],
+        'Medium': ToodledoTask.PRIORITY['Medium'],
+        'High': ToodledoTask.PRIORITY['High']
+    }
+
+    def __init__(self, engine, other):
+        ThisFromThat.__init__(self, engine, other, 'td <- fs')
+
+    def update(self, other, that=None, this=None, sid=None):
+
+        item, todo = ThisFromThat.update(self, other, that, this, sid)
+
+        DAY = 60*60 * 24
+        TD_UTC_TIME = 60*60 * 12
+
+        if self.assign(todo, 'title', item.title):
+            self.logger.debug(u'Title changed to [%s]', item.title)
+
+        self.assign(todo, 'note', item.note or u'')
+
+        # item times are ms, Toodledo dates default to 12:00 UTC
+        startdate = item.start / 1000 if item.start else 0
+        if startdate:
+            startdate = startdate - (startdate % DAY) + TD_UTC_TIME
+        if self.assign(todo, 'startdate', startdate):
+            self.logger.debug(u'Start date changed to [%s]', strflocal(startdate, None))
+
+        duedate = item.due / 1000 if item.due else 0
+        if duedate:
+            duedate = duedate - (duedate % DAY) + TD_UTC_TIME
+        if self.assign(todo, 'duedate', duedate):
+            self.logger.debug(u'Due date changed to [%s]', strflocal(duedate, None))
+
+        remind = 0
+        if item.due and item.reminder and item.due > item.reminder:
+            remind = (item.due - item.reminder) / 60000
+        self.assign(todo, 'remind', remind)
+
+        status = self.status_map.get(item.status, ToodledoTask.STATUS.index('None'))
+        if self.assign(todo, 'status', status):
+            self.logger.debug(u'Status changed to [%s]', todo.status)
+
+        priority = self.priority_map.get(item.priority, -1)
+        if self.assign(todo, 'priority', priority):
+            self.logger.debug(u'Priority changed to [%s]', todo.priority)
+
+        self.assign(todo, 'tag', u','.join(item.tags)[:250])
+
+        completed = 0
+        if item.status == 'Done':
+            # stay with previous completed date
+            completed = item.completed / 1000 if item.completed else todo.completed or int(time.time())
+        self.assign(todo, 'completed', completed)
+
+        # unchanged tasks are not marked as modified in the Toodledo cache
+        self.skip()
+        return todo
@@ -72,13 +72,11 @@ class ToodledoFromOxTask(ThisFromThat):
         # todo.note = utf8(task.note)[:32000]
 
         title = task.title
-        if title != todo.title:
-            todo.title = title
-            self.logger.debug(u'Title changed to [%s]' % (title))
+        if self.assign(todo, 'title', title):
+            self.logger.debug(u'Title changed to [%s]', title)
 
         note = task.note or u''
-        if note != todo.note:
-            todo.note = note
+        self.assign(todo, 'note', note)
 
         DAY = 60*60 * 24
         OX_UTC_TIME = 0
@@ -91,84 +89,77 @@ class ToodledoFromOxTask(ThisFromThat):
         startdate = task._start_date or 0
         if startdate:
             startdate = startdate - (startdate % DAY) + TD_UTC_TIME
-        if startdate != todo.startdate:
-            self.logger.debug(u'Start date changed to [%s]' % (strflocal(startdate, None)))
-        todo.startdate = startdate
+        if self.assign(todo, 'startdate', startdate):
+            self.logger.debug(u'Start date changed to [%s]', strflocal(startdate, None))
 
         starttime = 0
         if task.full_time is not None and task.full_time == False:
             starttime = task._start_time_utc or 0
-        if starttime != todo.starttime:
-            self.logger.debug(u'Start time changed to [%s]' % (strflocal(starttime,None)))
-        todo.starttime = starttime
+        if self.assign(todo, 'starttime', starttime):
+            self.logger.debug(u'Start time changed to [%s]', strflocal(starttime,None))
 
         duedate = task._end_date or 0
         if duedate:
             duedate = duedate - (duedate % DAY) + TD_UTC_TIME
-        if duedate != todo.duedate:
-            self.logger.debug(u'Due date changed to [%s]' % (strflocal(duedate, None)))
-        todo.duedate = duedate
+        if self.assign(todo, 'duedate', duedate):
+            self.logger.debug(u'Due date changed to [%s]', strflocal(duedate, None))
 
         duetime = 0
         if task.full_time is not None and task.full_time == False:
             duetime = task._end_time_utc or 0
-        if duetime != todo.duetime:
-            self.logger.debug(u'Due time changed to [%s]' % (strflocal(duetime, None)))
-        todo.duetime = duetime
+        if self.assign(todo, 'duetime', duetime):
+            self.logger.debug(u'Due time changed to [%s]', strflocal(duetime, None))
 
         remind = 0
         if task._end_date and task._alarm_date:
             seconds = task._end_date - task._alarm_date
             if seconds > 0:
                 remind = seconds/60
-            if remind != todo.remind:
-                self.logger.debug(u'Set reminder to %d minutes [%s]' % (remind, strflocal(task._alarm_date, None)))
-        todo.remind = remind
+        if self.assign(todo, 'remind', remind):
+            self.logger.debug(u'Set reminder to %d minutes [%s]', remind, strflocal(task._alarm_date, None))
 
         if task.status:
             status = self.status_map[task.status]
-            if status != todo.status:
-                todo.status = status
-                self.logger.debug(u'Status changed to [%s]' % (todo.status))
+            if self.assign(todo, 'status', status):
+                self.logger.debug(u'Status changed to [%s]', todo.status)
         else:
-            todo.status = 0
+            self.assign(todo, 'status', 0)
 
         if task.priority:
             priority = self.priority_map[int(task.priority)]
-            if priority != todo.priority:
-                todo.priority = priority
-                self.logger.debug(u'Priority changed to [%s]' % (todo.priority))
+            if self.assign(todo, 'priority', priority):
+                self.logger.debug(u'Priority changed to [%s]', todo.priority)
         else:
-            todo.priority = 0
+            self.assign(todo, 'priority', 0)
 
         # todo.folder = tdsync._folder.id
 
         tags = []
         for tag in task.tag_names():
             if tag == tdsync.options.get('ox_tag_star', ','):
-                todo.star = True
-                self.logger.debug(u'Set toodledo star from [%s]' % (tag))
+                self.assign(todo, 'star', True)
+                self.logger.debug(u'Set toodledo star from [%s]', tag)
             elif tag.startswith(tdsync.options.get('ox_tag_context', ',')):
-                todo.context = tag[1:]
-                self.logger.debug(u'Set toodledo context from [%s]' % (tag))
+                self.assign(todo, 'context', tag[1:])
+                self.logger.debug(u'Set toodledo context from [%s]', tag)
             elif tag.startswith(tdsync.options.get('ox_tag_goal', ',')):
-                todo.goal = tag[1:]
-                self.logger.debug(u'Set toodledo goal from [%s]' % (tag))
+                self.assign(todo, 'goal', tag[1:])
+                self.logger.debug(u'Set toodledo goal from [%s]', tag)
             elif tag.startswith(tdsync.options.get('ox_tag_location', ',')):
-                todo.location = tag[1:]
-                self.logger.debug(u'Set toodledo location from [%s]' % (tag))
+                self.assign(todo, 'location', tag[1:])
+                self.logger.debug(u'Set toodledo location from [%s]', tag)
             elif tag.startswith(tdsync.options.get('ox_tag_status', ',')):
-                todo.status = ToodledoTask.STATUS.index(tag[1:])
-                self.logger.debug(u'Set toodledo status from [%s]' % (tag))
+                self.assign(todo, 'status', ToodledoTask.STATUS.index(tag[1:]))
+                self.logger.debug(u'Set toodledo status from [%s]', tag)
             elif tag.startswith(tdsync.options.get('ox_tag_priority', ',')):
-                todo.prority = ToodledoTask.PRIORITY[tag[1:]]
-                self.logger.debug(u'Set toodledo priority from [%s]' % (tag))
+                self.assign(todo, 'priority', ToodledoTask.PRIORITY[tag[1:]])
+                self.logger.debug(u'Set toodledo priority from [%s]', tag)
             else:
                 tags.append(tag)
-                self.logger.debug(u'Set toodledo tag from [%s]' % (tag))
+                self.logger.debug(u'Set toodledo tag from [%s]', tag)
 
         if len(tags) > 0:
-            todo.tag = ','.join(tags)[:250]
+            self.assign(todo, 'tag', ','.join(tags)[:250])
 
         # check completed status and time stamp
         completed = 0
@@ -186,9 +177,12 @@ class ToodledoFromOxTask(ThisFromThat):
 
         if completed != todo.completed:
             if completed:
-                self.logger.debug(u'Set task completed at [%s]' % (strflocal(completed)))
+                self.logger.debug(u'Set task completed at [%s]', strflocal(completed))
             else:
-                self.logger.debug(u'Reset completed date according to status [%s]' % (OxTask.get_status(task.status)))
+                self.logger.debug(u'Reset completed date according to status [%s]', OxTask.get_status(task.status))
 
-        todo.completed = completed
+        self.assign(todo, 'completed', completed)
+
+        # unchanged tasks are not marked as modified in the Toodledo cache
+        self.skip()
         return todo
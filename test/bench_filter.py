@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Listing throughput of an in-memory engine without filter, with a compiled
+filter_expr and with the former eval() of the expression per item.
+
+usage: python bench_filter.py [-n 100000] [-r 3] [-e EXPR]
+"""
+import os, sys, time, logging
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pysync import MemorySync, MemoryStore
+
+EXPR = "item.title.startswith('Item 1') or len(item.body) > 20"
+
+
+class EvalSync(MemorySync):
+    """
+    Filter of previous versions: the expression source is evaluated per item
+    """
+    def _check_filter(self, item):
+        return eval(self._filter_expr)
+
+
+def listing(cls, store, expr, repeat):
+    options = {'label': 'bench', 'key_duplicates': 'first'}
+    if expr:
+        options['filter_expr'] = expr
+    engine = cls(store, options, logging.getLogger('bench'))
+    best = None
+    for n in range(repeat):
+        start = time.time()
+        engine.sync_map()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(engine.items)
+
+
+if __name__ == '__main__':
+
+    parser = ArgumentParser(description='Listing filter benchmark')
+    parser.add_argument('-n', '--count', type=int, default=100000)
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('-e', '--expr', type=str, default=EXPR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    store = MemoryStore('m', 1).populate(args.count)
+
+    print('%-10s %10s %10s %12s' % ('filter', 'items', 'time [s]', 'items/s'))
+    for name, cls, expr in [('none', MemorySync, None), ('compiled', MemorySync, args.expr),
+                            ('eval', EvalSync, args.expr)]:
+        elapsed, items = listing(cls, store, expr, args.repeat)
+        print('%-10s %10d %10.3f %12.0f' % (name, items, elapsed, args.count / elapsed))
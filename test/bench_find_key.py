@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Initial sync key matching benchmark: find_key() for every left item
+against a right engine with the same number of items. Matching time
+should grow linearly with the number of items.
+
+usage: python bench_find_key.py [count ...]
+"""
+import os, sys, time, logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pysync import Sync
+
+
+class BenchSync(Sync):
+
+    def __init__(self, count, options):
+        Sync.__init__(self, options, logging.getLogger('bench'), 'bench')
+        self._count = count
+
+    @property
+    def need_last_map(self): return False
+
+    def sync_map(self, last=None, since=None):
+        self._reset_items()
+        for n in range(self._count):
+            id = 'id-%d' % (n)
+            self._add_item(id, {'id': id, 'key': u'Task Title %d' % (n), 'time': 0L})
+        return {'items': self.items}
+
+    def map_item(self, key=None): return Sync.map_item(self, key)
+
+    def create(self, that, sid=None): return None
+
+    def get(self): return None
+
+    def delete(self, sid=None): return None
+
+    def changed(self, sync): return False
+
+
+def linear_find_key(sync, key):
+    for id in sync.items:
+        if sync.items[id]['key'] == key:
+            return id
+    return None
+
+
+def bench(count, normalize='none'):
+
+    left = BenchSync(count, {'label': 'left', 'key_normalize': normalize})
+    right = BenchSync(count, {'label': 'right', 'key_normalize': normalize})
+
+    start = time.time()
+    left.sync_map()
+    right.sync_map()
+    listing = time.time() - start
+
+    start = time.time()
+    for key in left:
+        assert right.find_key(left[key]['key']) is not None
+    indexed = time.time() - start
+
+    linear = None
+    if count <= 5000:
+        start = time.time()
+        for key in left:
+            assert linear_find_key(right, left[key]['key']) is not None
+        linear = time.time() - start
+
+    return listing, indexed, linear
+
+
+if __name__ == '__main__':
+
+    logging.basicConfig(level=logging.WARNING)
+
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 2000, 5000, 10000, 20000, 50000]
+
+    print('%10s %8s %12s %12s %12s %12s' % ('items', 'normal.', 'listing [s]', 'index [s]', 'us/item', 'linear [s]'))
+    for normalize in ['none', 'fold']:
+        for count in counts:
+            listing, indexed, linear = bench(count, normalize)
+            print('%10d %8s %12.3f %12.3f %12.2f %12s' % (count, normalize, listing, indexed,
+                                                         indexed * 1000000 / count,
+                                                         '%.3f' % linear if linear is not None else '-'))
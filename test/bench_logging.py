@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Logging overhead benchmark: PySync.process() throughput of an incremental
+run with 10% changed items at INFO, at DEBUG and at DEBUG with log_sample.
+Log records go to a stream handler on os.devnull.
+
+usage: python bench_logging.py [count ...]   (default: 1000 10000 50000)
+"""
+import os, sys, time, logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pysync import Sync, PySync
+
+
+class BenchItem(object):
+
+    def __init__(self, id, title, time):
+        self.id = id
+        self.title = title
+        self.time = time
+
+
+class BenchSync(Sync):
+
+    def __init__(self, items, options, logger):
+        Sync.__init__(self, options, logger, 'bench')
+        self._store = items
+        self._clock = 2000000000000L
+
+    @property
+    def need_last_map(self): return False
+
+    def sync_map(self, last=None, since=None):
+        self._reset_items()
+        for id, item in self._store.iteritems():
+            self._add_item(id, {'id': id, 'key': item.title, 'time': item.time})
+        return {'items': self.items}
+
+    def map_item(self, ref=None):
+        if isinstance(ref, BenchItem):
+            return {'id': ref.id, 'key': ref.title, 'time': ref.time}
+        return Sync.map_item(self, ref)
+
+    def get(self):
+        return self._store.get(self.key)
+
+    def create(self, other, sid=None):
+        that = other.get()
+        item = BenchItem(u'%s-%s' % (self.label, that.id), that.title, 0L)
+        self._store[item.id] = item
+        return self.update(other, that, item, sid=sid)
+
+    def update(self, other, that=None, this=None, sid=None):
+        if this is None:
+            self._count('modified')
+            that, this = other.get(), self.get()
+        else:
+            self._count('created')
+        this.title = that.title
+        self._clock += 1
+        this.time = self._clock
+        return self.map_item(this)
+
+    def delete(self, sid=None):
+        self._store.pop(self.key, None)
+        Sync.delete(self, sid)
+
+    def changed(self, sync): return Sync.changed(self, sync)
+
+
+def bench(count, level, sample=None):
+
+    logger = logging.getLogger('bench')
+    logger.setLevel(level)
+
+    left = BenchSync(dict((u'l%d' % (n), BenchItem(u'l%d' % (n), u'Task Title %d' % (n), 1000L))
+                          for n in range(count)), {'label': 'left', 'log_sample': sample}, logger)
+    right = BenchSync({}, {'label': 'right', 'log_sample': sample}, logger)
+
+    opts = {'sync': {'map': None}, 'left': 'left', 'right': 'right', 'unidirectional': None,
+            'log_sample': sample}
+    PySync(left, right, opts, logger).process()
+
+    for n in range(0, count, 10):
+        left._store[u'l%d' % (n)].time = 3000000000000L
+
+    start = time.time()
+    PySync(left, right, opts, logger).process()
+    return time.time() - start
+
+
+if __name__ == '__main__':
+
+    handler = logging.StreamHandler(open(os.devnull, 'w'))
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    logging.getLogger('bench').addHandler(handler)
+    logging.getLogger('bench').propagate = False
+
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]
+
+    print('%10s %14s %10s %14s' % ('sids', 'logging', 'time [s]', 'sids/s'))
+    for count in counts:
+        for name, level, sample in [('INFO', logging.INFO, None), ('DEBUG', logging.DEBUG, None),
+                                    ('DEBUG 1:100', logging.DEBUG, 100)]:
+            elapsed = bench(count, level, sample)
+            print('%10d %14s %10.3f %14d' % (count, name, elapsed, count / elapsed))
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Sync map file benchmark: store and load time and file size of the map
+serializers for synthetic maps with the given number of sids.
+
+usage: python bench_mapfile.py [count ...]   (default: 1000 10000 100000)
+       python bench_mapfile.py 1000000       (slow: several minutes)
+"""
+import os, sys, time, uuid, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pysync import mapfile
+
+
+def sync_map(count):
+
+    map = {}
+    for n in range(count):
+        sid = unicode(uuid.uuid1())
+        map[sid] = {'key': u'Task Title %d' % (n),
+                    'left': {'id': unicode(uuid.uuid4()), 'time': 1450000000000L + n,
+                             'digest': u'%040x' % (n)},
+                    'right': {'id': n + 10000000, 'time': 1450000000000L + n}}
+    return {'map': map, 'count': count, 'relation': u'bench', 'direction': u'bidirectional',
+            'left': {'label': u'left'}, 'right': {'label': u'right'}, 'utc': 1450000000000L}
+
+
+def bench(data, format, compression, path):
+
+    start = time.time()
+    size = mapfile.dump(data, path, format, compression)
+    store = time.time() - start
+
+    start = time.time()
+    loaded = mapfile.load(path)
+    load = time.time() - start
+
+    assert len(loaded['map']) == len(data['map'])
+    return size, store, load
+
+
+if __name__ == '__main__':
+
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+
+    formats = ['json', 'compact', 'pickle']
+    try:
+        import msgpack
+        formats.append('msgpack')
+    except ImportError:
+        pass
+
+    fd, path = tempfile.mkstemp(suffix='.map')
+    os.close(fd)
+
+    try:
+        print('%10s %8s %6s %12s %10s %10s' % ('sids', 'format', 'comp.', 'size [KB]', 'store [s]', 'load [s]'))
+        for count in counts:
+            data = sync_map(count)
+            for format in formats:
+                for compression in [None, 'gzip', 'bz2']:
+                    size, store, load = bench(data, format, compression, path)
+                    print('%10d %8s %6s %12d %10.3f %10.3f' % (count, format, compression or '-',
+                                                              size / 1024, store, load))
+    finally:
+        os.remove(path)
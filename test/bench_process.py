@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+PySync.process() benchmark on in-memory engines (pysync.memory) for the
+initial, incremental, unidirectional and strict unidirectional scenarios.
+Each run is forked to report its own peak memory. Results are compared
+with the stored baseline bench_process.json (--save to replace it).
+
+usage: python bench_process.py [-n 1000 10000 ...] [-s initial ...] [--save] [--check 20]
+       python bench_process.py -n 1000000   (slow: several minutes per scenario)
+"""
+import os, sys, time, json, logging, resource
+from argparse import ArgumentParser
+from multiprocessing import Process, Pipe
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pysync import PySync, MemorySync, MemoryStore
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_process.json')
+
+SCENARIOS = ['initial', 'incremental', 'unidirectional', 'strict']
+
+
+def engines(left, right, args, incremental=False):
+
+    logger = logging.getLogger('bench')
+    options = {'key_duplicates': 'first'}
+    if incremental:
+        # changed-since listings from the watermark of the first run (no overlap: all in one process)
+        options.update({'incremental': True, 'incremental_overlap': 0})
+    return (MemorySync(left, dict(options, label='left'), logger),
+            MemorySync(right, dict(options, label='right'), logger))
+
+
+def run(scenario, count, args):
+    """
+    Setup the stores and time process(): (seconds, operations, writes)
+    """
+    logger = logging.getLogger('bench')
+
+    left = MemoryStore('l', 1).populate(count, args.collisions)
+    # half of the right items match left items by key
+    right = MemoryStore('r', 2).populate(count / 2, args.collisions, count / 4)
+
+    unidirectional = {'unidirectional': 'merge', 'strict': 'strict'}.get(scenario)
+    opts = {'sync': {'map': None}, 'left': 'left', 'right': 'right', 'unidirectional': None}
+
+    if scenario != 'initial':
+        l, r = engines(left, right, args, True)
+        opts['sync'] = PySync(l, r, opts, logger).process()
+        # completed runs store the listing start times in sync['listed']
+        assert opts['sync'].get('listed')
+        left.churn(args.change_rate, args.delete_ratio, args.create_ratio)
+        right.churn(args.change_rate, args.delete_ratio, args.create_ratio)
+        opts['unidirectional'] = unidirectional
+
+    l, r = engines(left, right, args, scenario != 'initial' and not args.full_listing)
+    start = time.time()
+    pysync = PySync(l, r, opts, logger)
+    plan = pysync.plan()
+    pysync.execute(plan)
+    elapsed = time.time() - start
+
+    return elapsed, len(plan), len(plan.writes)
+
+
+def child(conn, scenario, count, args):
+    try:
+        elapsed, operations, writes = run(scenario, count, args)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+        conn.send({'time': elapsed, 'operations': operations, 'writes': writes, 'peak_mb': peak,
+                   'ops_per_s': operations / elapsed if elapsed else 0.0})
+    except Exception as e:
+        conn.send({'error': repr(e)})
+    conn.close()
+
+
+def measure(scenario, count, args):
+    parent, conn = Pipe()
+    process = Process(target=child, args=(conn, scenario, count, args))
+    process.start()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+if __name__ == '__main__':
+
+    parser = ArgumentParser(description='PySync.process() benchmark')
+    parser.add_argument('-n', '--counts', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('-s', '--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--change-rate', type=float, default=0.1)
+    parser.add_argument('--delete-ratio', type=float, default=0.01)
+    parser.add_argument('--create-ratio', type=float, default=0.01)
+    parser.add_argument('--full-listing', action='store_true', help='full listings in the incremental scenarios')
+    parser.add_argument('--collisions', type=float, default=0.0, help='fraction of duplicate keys')
+    parser.add_argument('--save', action='store_true', help='store the results as baseline')
+    parser.add_argument('--check', type=float, help='fail if a run is slower than the baseline by this percentage')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    baseline = {}
+    if os.path.isfile(BASELINE):
+        with open(BASELINE) as fp:
+            baseline = json.load(fp)
+
+    results = {}
+    slower = []
+    print('%-15s %9s %10s %10s %12s %10s %10s' %
+          ('scenario', 'items', 'ops', 'time [s]', 'ops/s', 'peak [MB]', 'baseline'))
+    for count in args.counts:
+        for scenario in args.scenarios:
+            name = '%s:%d' % (scenario, count)
+            result = results[name] = measure(scenario, count, args)
+            if 'error' in result:
+                print('%-15s %9d %s' % (scenario, count, result['error']))
+                continue
+            compare = '-'
+            if name in baseline:
+                change = (result['time'] / baseline[name]['time'] - 1.0) * 100.0
+                compare = '%+.1f%%' % (change)
+                if args.check is not None and change > args.check:
+                    slower.append(name)
+            print('%-15s %9d %10d %10.3f %12.0f %10.1f %10s' %
+                  (scenario, count, result['operations'], result['time'], result['ops_per_s'],
+                   result['peak_mb'], compare))
+
+    if args.save:
+        baseline.update((name, result) for name, result in results.items() if 'error' not in result)
+        with open(BASELINE, 'w') as fp:
+            json.dump(baseline, fp, indent=4, sort_keys=True)
+
+    if slower:
+        print('Slower than baseline: %s' % (', '.join(slower)))
+        exit(1)
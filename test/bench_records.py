@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Sync map memory benchmark: footprint per sid of the map entries and engine
+items as plain dicts and as pysync.records for synthetic maps.
+
+usage: python bench_records.py [count ...]   (default: 100000)
+"""
+import os, sys, time, uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pysync.records import SyncEntry, SyncItem
+
+
+def sizeof(value, seen):
+    """
+    Recursive sys.getsizeof, shared objects are counted once
+    """
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.iteritems():
+            size += sizeof(k, seen) + sizeof(v, seen)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            size += sizeof(v, seen)
+    elif hasattr(value, '__slots__'):
+        for name in value.__slots__:
+            size += sizeof(getattr(value, name), seen)
+    return size
+
+
+def dicts(count):
+
+    map, left, right = {}, {}, {}
+    for n in range(count):
+        sid = unicode(uuid.uuid1())
+        key = u'Task Title %d' % (n)
+        left_id, right_id = unicode(uuid.uuid4()), n + 10000000
+        map[sid] = {'key': key,
+                    'left': {'id': left_id, 'time': 1450000000000L + n, 'digest': u'%040x' % (n)},
+                    'right': {'id': right_id, 'time': 1450000000000L + n}}
+        left[left_id] = {'id': left_id, 'key': u'Task Title %d' % (n), 'time': 1450000000000L + n}
+        right[right_id] = {'id': right_id, 'key': u'Task Title %d' % (n), 'time': 1450000000000L + n}
+    return map, left, right
+
+
+def records(count):
+
+    map, left, right = {}, {}, {}
+    for n in range(count):
+        sid = unicode(uuid.uuid1())
+        key = u'Task Title %d' % (n)
+        left_id, right_id = unicode(uuid.uuid4()), n + 10000000
+        map[sid] = SyncEntry(key, SyncItem(left_id, None, 1450000000000L + n, digest=u'%040x' % (n)),
+                             SyncItem(right_id, None, 1450000000000L + n))
+        left[left_id] = SyncItem(left_id, u'Task Title %d' % (n), 1450000000000L + n)
+        right[right_id] = SyncItem(right_id, u'Task Title %d' % (n), 1450000000000L + n)
+    return map, left, right
+
+
+if __name__ == '__main__':
+
+    counts = [int(arg) for arg in sys.argv[1:]] or [100000]
+
+    print('%10s %8s %12s %12s %10s' % ('sids', 'layout', 'total [MB]', 'per sid [B]', 'build [s]'))
+    for count in counts:
+        for name, build in [('dict', dicts), ('records', records)]:
+            start = time.time()
+            data = build(count)
+            elapsed = time.time() - start
+            size = sizeof(data, set())
+            print('%10d %8s %12.1f %12d %10.3f' % (count, name, size / 1048576.0, size / count, elapsed))
+            del data
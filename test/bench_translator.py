@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Per-item translator dispatch of Sync.update(): cached instances of the
+translator registry compared with a new translator (and logger adapter)
+per item, and with the cost of a complete update of an in-memory item.
+
+usage: python bench_translator.py [-n 100000]
+"""
+import os, sys, time, logging
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pysync import MemorySync, MemoryStore
+from pysync.registry import translator_class
+
+
+def timed(func, count):
+    start = time.time()
+    for n in xrange(count):
+        func()
+    return (time.time() - start) / count * 1e6
+
+
+if __name__ == '__main__':
+
+    parser = ArgumentParser(description='Translator dispatch benchmark')
+    parser.add_argument('-n', '--count', type=int, default=100000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    logger = logging.getLogger('bench')
+    left = MemorySync(MemoryStore('l', 1).populate(1), {'label': 'left'}, logger)
+    right = MemorySync(MemoryStore('r', 2).populate(1), {'label': 'right'}, logger)
+    left.sync_map(); right.sync_map()
+    left._key = list(left.items)[0]
+    right._key = list(right.items)[0]
+
+    results = [
+        ('cached', timed(lambda: left.translator(right), args.count)),
+        ('per item', timed(lambda: translator_class(left, right)(left, right), args.count)),
+        ('update', timed(lambda: left.update(right), args.count / 10 or 1)),
+    ]
+    print('%-10s %12s' % ('dispatch', 'us/item'))
+    for name, us in results:
+        print('%-10s %12.2f' % (name, us))
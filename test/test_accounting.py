@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Remote call accounting of the engine sessions (pysync.accounting)
+
+usage: python -m unittest discover -s test -p 'test_*.py'
+"""
+import os, sys, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pysync.accounting import CallAccounting, sid_scope
+
+
+class Task(object):
+    """
+    Remote object keeping a reference to its session (OxTask)
+    """
+    def __init__(self, session, data):
+        self._session = session
+        self.data = data
+
+    def update(self):
+        return self._session.put(self.data['id'], self.data)
+
+
+class TaskSession(object):
+
+    def __init__(self):
+        self.tasks = {}
+
+    def put(self, id, data):
+        self.tasks[id] = dict(data)
+        return id
+
+    def create_task(self, data):
+        data = dict(data, id=len(self.tasks) + 1)
+        self.put(data['id'], data)
+        return Task(self, data)
+
+    def get_task(self, id):
+        return Task(self, self.tasks[id])
+
+    def get_tasks(self):
+        return [Task(self, data) for data in self.tasks.values()]
+
+
+class NoteStore(object):
+
+    def createNote(self, note):
+        return note
+
+    def updateNote(self, note):
+        return note
+
+
+class Book(object):
+    """
+    Remote object keeping a reference to a session service (EnBook)
+    """
+    def __init__(self, note_store):
+        self._note_store = note_store
+
+    def create_note(self, title):
+        return self._note_store.createNote({'title': title})
+
+    def update_note(self, note):
+        return self._note_store.updateNote(note)
+
+
+class NoteClient(object):
+
+    def __init__(self):
+        self.note_store = NoteStore()
+
+    def notebook(self, name):
+        return Book(self.note_store)
+
+
+class AccountingTest(unittest.TestCase):
+
+    def test_returned_objects(self):
+        accounting = CallAccounting('test')
+        session = accounting.wrap(TaskSession(), 'ox')
+        with sid_scope('sid'):
+            task = session.create_task({'title': u'a'})
+            task.data['title'] = u'b'
+            task.update()
+        self.assertTrue(isinstance(task, Task))
+        self.assertEqual(accounting.calls, 2)
+        self.assertEqual(accounting.sid_calls('sid'), 2)
+
+        session.get_task(1).update()
+        for task in session.get_tasks():
+            task.update()
+        self.assertEqual(accounting.calls, 6)
+        self.assertEqual(sorted(method for engine, method in accounting._calls),
+                         ['create_task', 'get_task', 'get_tasks', 'put'])
+
+    def test_nested_services(self):
+        accounting = CallAccounting('test')
+        session = accounting.wrap(NoteClient(), 'en', ['note_store'])
+        book = session.notebook('nb')
+        with sid_scope('sid'):
+            note = book.create_note(u'a')
+            book.update_note(note)
+        self.assertEqual(accounting.sid_calls('sid'), 2)
+        self.assertEqual(sorted(accounting._calls), [('en', 'notebook'), ('en.note_store', 'createNote'),
+                                                     ('en.note_store', 'updateNote')])
+
+
+if __name__ == '__main__':
+    unittest.main()
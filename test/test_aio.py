@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+AsyncPySync and the shared SyncLoop (pysync.aio) on in-memory engines
+
+usage: python -m unittest discover -s test -p 'test_*.py'
+"""
+import os, sys, logging, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pysync import PySync, AsyncPySync, SyncLoop, MemorySync, MemoryStore
+from pysync import core
+from pysync.aio import SyncAdapter
+
+logger = logging.getLogger('test_aio')
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+
+
+def engines(left, right, **options):
+    return (MemorySync(left, dict(options, label='left'), logger),
+            MemorySync(right, dict(options, label='right'), logger))
+
+
+def contents(store):
+    return sorted((item.title, item.body) for item in store.items.itervalues())
+
+
+def relation():
+    return {'sync': {'map': None}, 'left': 'left', 'right': 'right', 'unidirectional': None}
+
+
+class AsyncPySyncTest(unittest.TestCase):
+
+    def test_process(self):
+        left = MemoryStore('l', 1).populate(40)
+        right = MemoryStore('r', 2).populate(20, start=30)
+        opts = relation()
+        l, r = engines(left, right, workers=2)
+        opts['sync'] = AsyncPySync(l, r, opts, logger).process()
+        self.assertEqual(len(left), 50)
+        self.assertEqual(contents(left), contents(right))
+        self.assertEqual(len(opts['sync']['map']), 50)
+
+        left.churn(0.2, 0.05, 0.05)
+        right.churn(0.1, 0.05, 0.0)
+        l, r = engines(left, right, workers=2, incremental=True, incremental_overlap=0)
+        opts['sync'] = AsyncPySync(l, r, opts, logger).process()
+        self.assertTrue(l.incremental)
+        self.assertEqual(contents(left), contents(right))
+        self.assertEqual(len(opts['sync']['map']), len(left))
+
+        # nothing left to do for the blocking driver
+        l, r = engines(left, right)
+        plan = PySync(l, r, opts, logger).plan()
+        self.assertEqual(plan.writes, [])
+
+    def test_failure(self):
+        left = MemoryStore('l', 1).populate(10)
+        right = MemoryStore('r', 2)
+        l, r = engines(left, right)
+        calls = []
+        create = r.create
+
+        def failing(other, sid=None):
+            calls.append(sid)
+            if len(calls) == 3:
+                raise RuntimeError('create failed')
+            return create(other, sid)
+
+        r.create = failing
+        pysync = AsyncPySync(l, r, relation(), logger)
+        self.assertRaises(RuntimeError, pysync.process)
+        # the other creates are recorded in the map
+        complete = [sid for sid, entry in pysync.sync.iteritems() if entry.get('left') and entry.get('right')]
+        self.assertEqual(len(complete), 9)
+
+
+class SyncLoopTest(unittest.TestCase):
+
+    def test_shared_loop(self):
+        loop = SyncLoop(4, logger)
+        try:
+            stores = [(MemoryStore('a%d' % n, n).populate(30), MemoryStore('b%d' % n, n)) for n in range(3)]
+            relations = []
+            for left, right in stores:
+                l, r = engines(left, right)
+                relations.append(AsyncPySync(l, r, relation(), logger, loop=loop))
+            results = loop.run(relations)
+            self.assertTrue(all(result is not None for result in results))
+            for left, right in stores:
+                self.assertEqual(contents(left), contents(right))
+        finally:
+            loop.close()
+
+    def test_adapter(self):
+        loop = SyncLoop(2, logger)
+        try:
+            store = MemoryStore('m', 1).populate(3)
+            adapter = SyncAdapter(MemorySync(store, {'label': 'm'}, logger), loop)
+            adapter.sync_map().get()
+            id = sorted(store.items)[0]
+            self.assertEqual(adapter.get(id).get().title, store.items[id].title)
+        finally:
+            loop.close()
+
+    def test_driver(self):
+        left, right = MemoryStore('l', 1), MemoryStore('r', 2)
+        l, r = engines(left, right)
+        self.assertFalse(isinstance(core.driver(l, r, relation(), logger), AsyncPySync))
+        loop = core._worker['loop'] = SyncLoop(2, logger)
+        try:
+            self.assertTrue(isinstance(core.driver(l, r, relation(), logger), AsyncPySync))
+        finally:
+            core._worker.pop('loop').close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Batch operations (Sync.*_many, relation option batch_size) on in-memory engines
+
+usage: python -m unittest discover -s test -p 'test_*.py'
+"""
+import os, sys, logging, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pysync import PySync, MemorySync, MemoryStore
+
+logger = logging.getLogger('test_batches')
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+
+
+class RejectingStore(MemoryStore):
+    """
+    MemoryStore rejecting the writes of some titles and ids
+    """
+    def __init__(self, prefix='m', seed=None):
+        MemoryStore.__init__(self, prefix, seed)
+        self.rejected = set()
+        self.requests = {'put_many': 0, 'delete_many': 0}
+
+    def put(self, item):
+        if item.title in self.rejected:
+            raise ValueError(u'rejected %s' % (item.title))
+        return MemoryStore.put(self, item)
+
+    def delete(self, id):
+        if id in self.rejected:
+            raise ValueError(u'rejected %s' % (id))
+        return MemoryStore.delete(self, id)
+
+    def put_many(self, items):
+        self.requests['put_many'] += 1
+        return MemoryStore.put_many(self, items)
+
+    def delete_many(self, ids):
+        self.requests['delete_many'] += 1
+        return MemoryStore.delete_many(self, ids)
+
+
+def titles(store):
+    return sorted(item.title for item in store.items.itervalues())
+
+
+def complete(sync):
+    return [sid for sid, entry in sync['map'].iteritems() if entry.get('left') and entry.get('right')]
+
+
+def repair(sync):
+    # incomplete entries are removed by check_sync_map() after a run
+    for sid in set(sync['map']) - set(complete(sync)):
+        del sync['map'][sid]
+    return sync
+
+
+class BatchTest(unittest.TestCase):
+
+    def process(self, sync=None, unidirectional=None):
+        left = MemorySync(self.left, {'label': 'left', 'batch_size': 5}, logger)
+        right = MemorySync(self.right, {'label': 'right', 'batch_size': 5}, logger)
+        relation = {'sync': sync or {'map': None}, 'left': 'left', 'right': 'right', 'unidirectional': unidirectional}
+        return PySync(left, right, relation, logger).process(), right
+
+    def test_create_update(self):
+        self.left, self.right = MemoryStore('l', 1).populate(20), RejectingStore('r', 2)
+        self.right.rejected.update([u'Item 3', u'Item 11'])
+        sync, engine = self.process()
+        self.assertEqual(engine.batch_size, 5)
+        self.assertEqual(self.right.requests['put_many'], 4)
+        # failed creates drop their own sid only
+        self.assertEqual(len(self.right), 18)
+        self.assertEqual(len(complete(sync)), 18)
+
+        repair(sync)
+        self.right.rejected = set([u'Item 0'])
+        for item in self.left.items.values():
+            if item.title in [u'Item %d' % (n) for n in range(8)]:
+                item.body += u'.'
+                self.left.put(item)
+        sync, engine = self.process(sync)
+        # 2 creates of the rejected items, 7 updates
+        self.assertEqual(self.right.requests['put_many'], 7)
+        self.assertEqual(len(self.right), 20)
+        bodies = dict((item.title, item.body) for item in self.right.items.itervalues())
+        self.assertEqual([item.title for item in self.left.items.itervalues() if bodies[item.title] != item.body],
+                         [u'Item 0'])
+        self.assertEqual(len(complete(sync)), 19)
+
+    def test_strict_deletes(self):
+        self.left, self.right = MemoryStore('l', 1).populate(10), RejectingStore('r', 2)
+        sync, engine = self.process(unidirectional='strict')
+        self.right.populate(7, start=100)
+        rejected = [id for id, item in self.right.items.iteritems() if item.title == u'Item 103'][0]
+        self.right.rejected.add(rejected)
+        sync, engine = self.process(sync, unidirectional='strict')
+        self.assertEqual(self.right.requests['delete_many'], 2)
+        self.assertEqual(engine._changes['deleted'], 6)
+        self.assertEqual(titles(self.right), sorted(titles(self.left) + [self.right.items[rejected].title]))
+        self.assertEqual(len(complete(sync)), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
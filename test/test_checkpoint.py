@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Checkpoint journal of interrupted runs (pysync.checkpoint)
+
+usage: python -m unittest discover -s test -p 'test_*.py'
+"""
+import os, sys, shutil, tempfile, logging, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pysync import PySync, MemorySync, MemoryStore
+from pysync.checkpoint import Checkpoint
+
+logger = logging.getLogger('test_checkpoint')
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+
+
+class CrashingSync(MemorySync):
+    """
+    MemorySync failing the create call number [crash]
+    """
+    crash = None
+
+    def create(self, other, sid=None):
+        self._creates = getattr(self, '_creates', 0) + 1
+        if self._creates == self.crash:
+            raise RuntimeError('connection lost')
+        return MemorySync.create(self, other, sid)
+
+
+class CheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.map = os.path.join(self.dir, 'relation.map')
+        self.checkpoint = os.path.join(self.dir, 'relation.ckp')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, True)
+
+    def relation(self, sync=None):
+        return {'sync': sync or {'map': None}, 'left': 'left', 'right': 'right', 'unidirectional': None,
+                'map': self.map, 'checkpoint_interval': 1}
+
+    def pysync(self, left, right, sync=None, crash=None):
+        r = CrashingSync(right, {'label': 'right'}, logger)
+        r.crash = crash
+        return PySync(MemorySync(left, {'label': 'left'}, logger), r, self.relation(sync), logger)
+
+    def tear(self):
+        # crash in the middle of a journal write
+        with open(self.checkpoint, 'ab') as fp:
+            fp.write('{"done": ["1:')
+
+    def test_torn_resume(self):
+        left, right = MemoryStore('l', 1).populate(60), MemoryStore('r', 2)
+        self.assertRaises(RuntimeError, self.pysync(left, right, crash=10).process)
+        self.tear()
+        self.assertRaises(RuntimeError, self.pysync(left, right, crash=20).resume)
+        header, done, entries = Checkpoint.load(self.checkpoint)
+        self.assertEqual(len(done), len(right))
+        self.tear()
+        sync = self.pysync(left, right).resume()
+        titles = [item.title for item in right.items.itervalues()]
+        self.assertEqual(len(titles), 60)
+        self.assertEqual(len(set(titles)), 60)
+        self.assertEqual(len(sync['map']), 60)
+        os.remove(self.checkpoint)
+
+        # the next run has nothing to do
+        plan = self.pysync(left, right, sync).plan()
+        self.assertEqual(plan.writes, [])
+
+    def test_load_skips_torn_lines(self):
+        left, right = MemoryStore('l', 1).populate(20), MemoryStore('r', 2)
+        self.assertRaises(RuntimeError, self.pysync(left, right, crash=10).process)
+        with open(self.checkpoint, 'rb') as fp:
+            lines = fp.readlines()
+        # torn record of an older version in the middle of the journal
+        with open(self.checkpoint, 'wb') as fp:
+            fp.writelines(lines[:3] + ['{"done": ["1:' + lines[3]] + lines[4:])
+        header, done, entries = Checkpoint.load(self.checkpoint)
+        self.assertEqual(len(done), len(lines) - 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Expression language of the listing filters (pysync.filters)
+
+usage: python -m unittest discover -s test -p 'test_*.py'
+"""
+import os, sys, ast, logging, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pysync import SyncInitError, MemorySync, MemoryStore
+from pysync.filters import validate, compile_expr, compile_filter
+
+ALLOWED = [
+    "item.title.startswith('@') and item.status != 3",
+    "not item.title or len(item.body) > 20",
+    "item['title'].lower() in ['a', 'b'] or item.title[1:3] == 'xx'",
+    "item.priority if item.priority is not None else -1",
+    "(item.time // 1000) % 60 >= 30",
+    "any([item.title, item.body]) and u'tag' in self.label",
+    "{'a': 1}.get(item.title, 0) + max(1, 2) - abs(-3) * 2",
+]
+
+REJECTED = [
+    "__import__('os').system('true')",
+    "item.__class__",
+    "item.title.__len__()",
+    "open('/etc/passwd')",
+    "eval('1')",
+    "os.getcwd()",
+    "item.title.format(1)",
+    "item.title.startswith(prefix='x')",
+    "len(*item.tags)",
+    "(lambda: 1)()",
+    "[x for x in item.tags]",
+    "getattr(item, 'title')",
+    "(item.title)()",
+]
+
+
+logger = logging.getLogger('test_filters')
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+
+
+class Item(object):
+    def __init__(self, title, body=u'', status=None, priority=None, time=0L):
+        self.title = title
+        self.body = body
+        self.status = status
+        self.priority = priority
+        self.time = time
+        self.tags = []
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+class ValidateTest(unittest.TestCase):
+
+    def test_allowed(self):
+        for expr in ALLOWED:
+            validate(ast.parse(expr, '<filter_expr>', 'eval'))
+
+    def test_rejected(self):
+        for expr in REJECTED:
+            self.assertRaises(ValueError, validate, ast.parse(expr, '<filter_expr>', 'eval'))
+
+    def test_statements(self):
+        # only expressions are parsed
+        for expr in ["import os", "x = 1", "item.title; item.body"]:
+            self.assertRaises(ValueError, compile_expr, expr)
+
+    def test_compile(self):
+        engine = MemorySync(MemoryStore(), {'label': 'test'}, logger)
+        check = compile_expr("item.title.startswith('@') and item.status != 3", engine)
+        self.assertTrue(check(Item(u'@a', status=1)))
+        self.assertFalse(check(Item(u'@a', status=3)))
+        self.assertFalse(check(Item(u'a', status=1)))
+        self.assertTrue(compile_expr("self.label == 'test'", engine)(Item(u'a')))
+
+    def test_no_filter(self):
+        self.assertIsNone(compile_filter())
+        self.assertIsNone(compile_filter('', None))
+
+
+class EngineFilterTest(unittest.TestCase):
+
+    def test_invalid(self):
+        self.assertRaises(SyncInitError, MemorySync, MemoryStore(), {'label': 'test', 'filter_expr': 'item.title =='}, logger)
+        self.assertRaises(SyncInitError, MemorySync, MemoryStore(), {'label': 'test', 'filter_module': 'no_such_filter'}, logger)
+
+    def test_legacy(self):
+        # expressions of earlier releases outside of the subset: deprecated, unrestricted eval
+        options = {'label': 'test', 'filter_expr': "[tag for tag in item.tags if tag == 'x'] or getattr(item, 'body')"}
+        check = MemorySync(MemoryStore(), options, logger)._filter
+        self.assertTrue(check(Item(u'a', body=u'b')))
+        self.assertFalse(check(Item(u'a')))
+        item = Item(u'a')
+        item.tags = ['x']
+        self.assertTrue(check(item))
+
+    def test_opt_in(self):
+        class OptInSync(MemorySync):
+            filter_opt_in = True
+        options = {'label': 'test', 'filter_expr': "item.title.startswith('@')"}
+        self.assertIsNone(OptInSync(MemoryStore(), dict(options), logger)._filter)
+        self.assertIsNotNone(OptInSync(MemoryStore(), dict(options, apply_filter=True), logger)._filter)
+        self.assertIsNotNone(MemorySync(MemoryStore(), dict(options), logger)._filter)
+
+
+if __name__ == '__main__':
+    unittest.main()
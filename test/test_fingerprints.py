@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Content fingerprints in the sync map (Sync.digest, PySync._unchanged)
+
+usage: python -m unittest discover -s test -p 'test_*.py'
+"""
+import os, sys, logging, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pysync import PySync, MemorySync, MemoryStore
+from pysync.records import SyncItem
+
+logger = logging.getLogger('test_fingerprints')
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+
+
+class MetadataSync(MemorySync):
+    """
+    MemorySync with a metadata listing without fingerprints
+    """
+    def sync_map(self, last=None, since=None):
+        self._reset_items()
+        for item in self._store.items.itervalues():
+            self._add_item(item.id, SyncItem(item.id, item.title, item.time))
+        return {'items': self.items}
+
+
+def digests(sync):
+    return sum(1 for sid, entry in sync['map'].iteritems()
+               for lr in ['left', 'right'] if entry[lr].get('digest') is not None)
+
+
+class FingerprintTest(unittest.TestCase):
+
+    def run_sync(self, sync):
+        left = MetadataSync(self.left, {'label': 'left'}, logger)
+        right = MetadataSync(self.right, {'label': 'right'}, logger)
+        relation = {'sync': sync, 'left': 'left', 'right': 'right', 'unidirectional': None}
+        return PySync(left, right, relation, logger).process(), left
+
+    def test_kept_digests(self):
+        self.left, self.right = MemoryStore('l', 1).populate(10), MemoryStore('r', 2)
+        sync, engine = self.run_sync({'map': None})
+        self.assertEqual(digests(sync), 20)
+        for n in range(2):
+            sync, engine = self.run_sync(sync)
+            self.assertEqual(digests(sync), 20)
+
+        # timestamps changed, content unchanged
+        for item in self.left.items.values():
+            self.left.put(item)
+        sync, engine = self.run_sync(sync)
+        self.assertEqual(engine._changes['unchanged'], 10)
+        self.assertEqual(engine._changes['modified'], 0)
+        self.assertEqual(digests(sync), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()